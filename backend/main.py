@@ -18,6 +18,7 @@ from restaurant_consultant.progressive_data_extractor import ProgressiveDataExtr
 from restaurant_consultant.models import FinalRestaurantOutput, ExtractionMetadata
 from restaurant_consultant.pdf_generator_module import RestaurantReportGenerator
 from restaurant_consultant.stagehand_integration import stagehand_scraper
+from restaurant_consultant.llm_analyzer_module import close_gemini_session
 
 # Load environment variables
 load_dotenv()
@@ -53,6 +54,12 @@ app = FastAPI(
 # Initialize PDF generator
 pdf_generator = RestaurantReportGenerator()
 
+@app.on_event("shutdown")
+async def shutdown_http_sessions():
+    """Release pooled HTTP connections held by the Gemini client."""
+    await close_gemini_session()
+    logger.info("🔌 Closed shared Gemini HTTP session")
+
 # Mount static files for serving generated PDFs
 app.mount("/generated_pdfs", StaticFiles(directory=str(GENERATED_PDFS_DIR)), name="generated_pdfs")
 logger.info(f"📁 Static file serving enabled for PDFs at: {GENERATED_PDFS_DIR}")
@@ -6,10 +6,45 @@ Handles common issues like markdown wrapping, extra text, and malformed JSON.
 import json
 import logging
 import re
-from typing import Dict, List, Optional, Union, Any
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Union, Any
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so the handlers below still apply
+import orjson
 
 logger = logging.getLogger(__name__)
 
+# Sentinel distinguishing a missing key from a stored None
+_MISSING = object()
+
+# Responses longer than this only get a direct parse attempt; the regex and
+# bracket-scanning fallbacks are skipped to bound worst-case parse time.
+MAX_PARSE_CHARS = 2 * 1024 * 1024
+
+
+class _FunctionLogAdapter(logging.LoggerAdapter):
+    """Prepends the calling function's name to every message."""
+
+    def __init__(self, logger: logging.Logger, fn: str):
+        super().__init__(logger, {'fn': fn})
+        self.fn = fn
+
+    def process(self, msg, kwargs):
+        return f"[{self.fn}] {msg}", kwargs
+
+
+@lru_cache(maxsize=256)
+def _log(function_name: str) -> logging.LoggerAdapter:
+    """Return a cached logger adapter for the given calling function."""
+    return _FunctionLogAdapter(logger, function_name)
+
+
+@lru_cache(maxsize=1024)
+def _split_key_path(key_path: str) -> Tuple[str, ...]:
+    """Split a dot-separated key path once and reuse the tuple on later lookups."""
+    return tuple(key_path.split('.'))
+
+
 def parse_llm_json_output(
     raw_llm_text: str, 
     function_name: str = "unknown",
@@ -27,30 +62,40 @@ def parse_llm_json_output(
         Parsed JSON as dict/list or None if parsing fails
     """
     if not raw_llm_text or not raw_llm_text.strip():
-        logger.warning(f"🔍 [{function_name}] Empty or whitespace-only LLM response")
+        _log(function_name).warning("🔍 Empty or whitespace-only LLM response")
         return None
     
     original_text = raw_llm_text
-    logger.info(f"🔍 [{function_name}] Parsing LLM JSON response ({len(raw_llm_text)} chars)")
+    _log(function_name).info("🔍 Parsing LLM JSON response (%d chars)", len(raw_llm_text))
+    
+    if len(raw_llm_text) > MAX_PARSE_CHARS:
+        _log(function_name).error(
+            "❌ Response exceeds %d chars, attempting direct parse only", MAX_PARSE_CHARS
+        )
+        try:
+            return orjson.loads(raw_llm_text)
+        except json.JSONDecodeError as e:
+            _log(function_name).error("❌ Direct parsing of oversized response failed: %s", e)
+            return None
     
     # Strategy 1: Direct JSON parsing (for response_mime_type="application/json")
     try:
         cleaned_text = raw_llm_text.strip()
-        result = json.loads(cleaned_text)
-        logger.info(f"✅ [{function_name}] Direct JSON parsing successful")
+        result = orjson.loads(cleaned_text)
+        _log(function_name).info("✅ Direct JSON parsing successful")
         
         # Validate expected keys if provided
         if expected_keys and isinstance(result, dict):
             missing_keys = [key for key in expected_keys if key not in result]
             if missing_keys:
-                logger.warning(f"⚠️ [{function_name}] Missing expected keys: {missing_keys}")
+                _log(function_name).warning("⚠️ Missing expected keys: %s", missing_keys)
             else:
-                logger.info(f"✅ [{function_name}] All expected keys present: {expected_keys}")
+                _log(function_name).info("✅ All expected keys present: %s", expected_keys)
         
         return result
         
     except json.JSONDecodeError as e:
-        logger.info(f"🔄 [{function_name}] Direct parsing failed: {str(e)}, trying fallback strategies")
+        _log(function_name).info("🔄 Direct parsing failed: %s, trying fallback strategies", e)
     
     # Strategy 2: Strip markdown code fences
     try:
@@ -60,25 +105,25 @@ def parse_llm_json_output(
         
         if match:
             cleaned_text = match.group(1).strip()
-            logger.info(f"🔄 [{function_name}] Found JSON in markdown fences, attempting parse")
+            _log(function_name).info("🔄 Found JSON in markdown fences, attempting parse")
         else:
             # Remove leading/trailing non-JSON text
             cleaned_text = raw_llm_text.strip()
-            logger.info(f"🔄 [{function_name}] No markdown fences found, using original text")
+            _log(function_name).info("🔄 No markdown fences found, using original text")
         
-        result = json.loads(cleaned_text)
-        logger.info(f"✅ [{function_name}] Markdown fence removal successful")
+        result = orjson.loads(cleaned_text)
+        _log(function_name).info("✅ Markdown fence removal successful")
         
         # Validate expected keys
         if expected_keys and isinstance(result, dict):
             missing_keys = [key for key in expected_keys if key not in result]
             if missing_keys:
-                logger.warning(f"⚠️ [{function_name}] Missing expected keys: {missing_keys}")
+                _log(function_name).warning("⚠️ Missing expected keys: %s", missing_keys)
         
         return result
         
     except json.JSONDecodeError as e:
-        logger.info(f"🔄 [{function_name}] Markdown fence removal failed: {str(e)}, trying bracket extraction")
+        _log(function_name).info("🔄 Markdown fence removal failed: %s, trying bracket extraction", e)
     
     # Strategy 3: Extract JSON by finding first { and last } (or [ and ])
     try:
@@ -94,32 +139,32 @@ def parse_llm_json_output(
             # Likely an object
             if last_brace != -1 and last_brace > first_brace:
                 extracted_json = raw_llm_text[first_brace:last_brace + 1]
-                logger.info(f"🔄 [{function_name}] Extracted object JSON by brackets")
+                _log(function_name).info("🔄 Extracted object JSON by brackets")
             else:
                 raise ValueError("No valid object closing brace found")
         elif first_bracket != -1:
             # Likely an array
             if last_bracket != -1 and last_bracket > first_bracket:
                 extracted_json = raw_llm_text[first_bracket:last_bracket + 1]
-                logger.info(f"🔄 [{function_name}] Extracted array JSON by brackets")
+                _log(function_name).info("🔄 Extracted array JSON by brackets")
             else:
                 raise ValueError("No valid array closing bracket found")
         else:
             raise ValueError("No JSON object or array boundaries found")
         
-        result = json.loads(extracted_json)
-        logger.info(f"✅ [{function_name}] Bracket extraction successful")
+        result = orjson.loads(extracted_json)
+        _log(function_name).info("✅ Bracket extraction successful")
         
         # Validate expected keys
         if expected_keys and isinstance(result, dict):
             missing_keys = [key for key in expected_keys if key not in result]
             if missing_keys:
-                logger.warning(f"⚠️ [{function_name}] Missing expected keys: {missing_keys}")
+                _log(function_name).warning("⚠️ Missing expected keys: %s", missing_keys)
         
         return result
         
     except (json.JSONDecodeError, ValueError) as e:
-        logger.error(f"❌ [{function_name}] Bracket extraction failed: {str(e)}")
+        _log(function_name).error("❌ Bracket extraction failed: %s", e)
     
     # Strategy 4: Try to clean common issues and parse again
     try:
@@ -153,25 +198,25 @@ def parse_llm_json_output(
                 cleaned_text = cleaned_text.strip()[:-len(suffix)].strip()
                 break
         
-        result = json.loads(cleaned_text)
-        logger.info(f"✅ [{function_name}] Text cleaning strategy successful")
+        result = orjson.loads(cleaned_text)
+        _log(function_name).info("✅ Text cleaning strategy successful")
         
         # Validate expected keys
         if expected_keys and isinstance(result, dict):
             missing_keys = [key for key in expected_keys if key not in result]
             if missing_keys:
-                logger.warning(f"⚠️ [{function_name}] Missing expected keys: {missing_keys}")
+                _log(function_name).warning("⚠️ Missing expected keys: %s", missing_keys)
         
         return result
         
     except json.JSONDecodeError as e:
-        logger.error(f"❌ [{function_name}] Text cleaning strategy failed: {str(e)}")
+        _log(function_name).error("❌ Text cleaning strategy failed: %s", e)
     
     # All strategies failed - log detailed error information
-    logger.error(f"❌ [{function_name}] ALL JSON parsing strategies failed!")
-    logger.error(f"❌ [{function_name}] Original response length: {len(original_text)} characters")
-    logger.error(f"❌ [{function_name}] First 200 chars: {repr(original_text[:200])}")
-    logger.error(f"❌ [{function_name}] Last 200 chars: {repr(original_text[-200:])}")
+    _log(function_name).error("❌ ALL JSON parsing strategies failed!")
+    _log(function_name).error("❌ Original response length: %d characters", len(original_text))
+    _log(function_name).error("❌ First 200 chars: %r", original_text[:200])
+    _log(function_name).error("❌ Last 200 chars: %r", original_text[-200:])
     
     # Log response patterns for debugging
     has_braces = '{' in original_text and '}' in original_text
@@ -179,7 +224,7 @@ def parse_llm_json_output(
     has_quotes = '"' in original_text
     has_markdown = '```' in original_text
     
-    logger.error(f"❌ [{function_name}] Response analysis: braces={has_braces}, brackets={has_brackets}, quotes={has_quotes}, markdown={has_markdown}")
+    _log(function_name).error("❌ Response analysis: braces=%s, brackets=%s, quotes=%s, markdown=%s", has_braces, has_brackets, has_quotes, has_markdown)
     
     return None
 
@@ -201,17 +246,17 @@ def validate_json_structure(
         True if valid, False otherwise
     """
     if not isinstance(parsed_json, dict):
-        logger.error(f"❌ [{function_name}] Expected dict but got {type(parsed_json)}")
+        _log(function_name).error("❌ Expected dict but got %s", type(parsed_json))
         return False
     
     missing_keys = [key for key in required_keys if key not in parsed_json]
     
     if missing_keys:
-        logger.error(f"❌ [{function_name}] Missing required keys: {missing_keys}")
-        logger.error(f"❌ [{function_name}] Available keys: {list(parsed_json.keys())}")
+        _log(function_name).error("❌ Missing required keys: %s", missing_keys)
+        _log(function_name).error("❌ Available keys: %s", list(parsed_json.keys()))
         return False
     
-    logger.info(f"✅ [{function_name}] JSON structure validation passed")
+    _log(function_name).info("✅ JSON structure validation passed")
     return True
 
 
@@ -234,21 +279,19 @@ def safe_get_nested_value(
         Value at key path or default
     """
     try:
-        keys = key_path.split('.')
         current = data
         
-        for key in keys:
-            if isinstance(current, dict) and key in current:
-                current = current[key]
-            else:
-                logger.warning(f"⚠️ [{function_name}] Key path '{key_path}' not found, using default: {default}")
+        for key in _split_key_path(key_path):
+            current = current.get(key, _MISSING) if isinstance(current, dict) else _MISSING
+            if current is _MISSING:
+                _log(function_name).warning("⚠️ Key path '%s' not found, using default: %s", key_path, default)
                 return default
         
-        logger.debug(f"🔍 [{function_name}] Retrieved '{key_path}': {repr(current)}")
+        _log(function_name).debug("🔍 Retrieved '%s': %r", key_path, current)
         return current
         
     except Exception as e:
-        logger.error(f"❌ [{function_name}] Error retrieving key path '{key_path}': {str(e)}")
+        _log(function_name).error("❌ Error retrieving key path '%s': %s", key_path, e)
         return default
 
 
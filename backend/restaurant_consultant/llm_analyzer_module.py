@@ -1,20 +1,27 @@
 import json
 import asyncio
+import copy
+import contextlib
 import aiohttp
 from typing import Dict, Tuple, List, Any, Optional, Union
 import os
 from dotenv import load_dotenv
 import logging
 import re
-from bs4 import BeautifulSoup
+import string
+import lxml.html
+from lxml import etree
 import base64
+import hashlib
+import io
 from pathlib import Path
-from tenacity import retry, wait_exponential, stop_after_attempt, retry_if_exception_type
+from tenacity import retry, wait_random_exponential, stop_after_attempt, retry_if_exception_type, retry_if_exception
 import orjson
+from PIL import Image
 import google.generativeai as genai
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
+from google.api_core import exceptions as google_exceptions
 from pydantic import HttpUrl
-import httpx
 from pydantic import BaseModel, Field
 from .models import (
     FinalRestaurantOutput, 
@@ -27,9 +34,15 @@ from .json_parser_utils import parse_llm_json_output, validate_json_structure, s
 import uuid
 from datetime import datetime
 import time
-from collections import defaultdict
+from collections import OrderedDict, defaultdict, deque
 from urllib.parse import unquote
 
+# pybase64 (SIMD-accelerated) is a drop-in for base64's encoder; fall back to the stdlib
+try:
+    import pybase64 as _base64_codec
+except ImportError:
+    _base64_codec = base64
+
 load_dotenv()
 
 # Configuration
@@ -39,6 +52,75 @@ GEMINI_API_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/models"
 # FIXED: Use correct current model names from official Google docs
 GEMINI_MODEL_TEXT = "gemini-2.0-flash"  # Stable model for text
 GEMINI_MODEL_VISION = "gemini-2.0-flash"  # Supports vision
+# Lighter model for degenerate requests with little to reason over
+GEMINI_MODEL_TEXT_LITE = os.getenv("GEMINI_MODEL_TEXT_LITE", "gemini-2.0-flash-lite")
+# Opt-in Gemini Batch Mode (discounted, asynchronous) for competitor snapshots;
+# falls back to real-time requests if the batch is not done within the poll window
+GEMINI_BATCH_COMPETITORS = os.getenv("GEMINI_BATCH_COMPETITORS", "false").lower() in ("1", "true", "yes")
+GEMINI_BATCH_POLL_SECONDS = int(os.getenv("GEMINI_BATCH_POLL_SECONDS", "120"))
+# Opt-in Batch Mode for LLMA-8/9 when a queue of restaurants is analyzed together
+GEMINI_BATCH_ANALYSES = os.getenv("GEMINI_BATCH_ANALYSES", "false").lower() in ("1", "true", "yes")
+# A streamed response that sends nothing for this long is treated as stalled and retried,
+# instead of holding the caller for the full request timeout
+GEMINI_STREAM_STALL_SECONDS = int(os.getenv("GEMINI_STREAM_STALL_SECONDS", "60"))
+# Long calls still running after this many seconds get a hedged duplicate (0 disables)
+GEMINI_HEDGE_AFTER_SECONDS = float(os.getenv("GEMINI_HEDGE_AFTER_SECONDS", "90"))
+# Opt-in Gemini context caching (cachedContents) for static prompt prefixes; without it
+# the prefix is still sent first so implicit prefix caching can apply
+GEMINI_CONTEXT_CACHE = os.getenv("GEMINI_CONTEXT_CACHE", "false").lower() in ("1", "true", "yes")
+GEMINI_CONTEXT_CACHE_TTL_SECONDS = int(os.getenv("GEMINI_CONTEXT_CACHE_TTL_SECONDS", "3600"))
+# Upper bound on the supporting-screenshot quality checks; checks still running after
+# this are abandoned and their screenshots kept, so they never hold up stage 3
+SCREENSHOT_FILTER_TIMEOUT = float(os.getenv("SCREENSHOT_FILTER_TIMEOUT", "60"))
+
+# Precompiled patterns for JSON cleanup in clean_and_parse_json
+_FENCE_PATTERNS = [
+    re.compile(pattern, re.MULTILINE) for pattern in (
+        r'^```json\s*\n?',  # ```json at start
+        r'^```\s*\n?',      # ``` at start
+        r'\n?```\s*$',      # ``` at end
+        r'```$',            # ``` at very end
+        r'^```json\s*',     # ```json without newline
+        r'```\s*$',         # ``` at end without newline
+    )
+]
+
+# Fenced-block and JSON-start lookup for LLMAnalyzer JSON responses
+_JSON_FENCE_RE = re.compile(r"```json\n(.*?)\n```", re.DOTALL)
+_JSON_START_RE = re.compile(r'[{\[]')
+
+# Structural tokens for _extract_json_span: whole string literals (so braces inside
+# strings are skipped) or a single bracket
+_JSON_TOKEN_RE = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[{}\[\]]')
+
+# Precompiled patterns for menu HTML preprocessing in extract_menu_with_gemini
+_HTML_PARSER = lxml.html.HTMLParser(encoding='utf-8')
+_NON_CONTENT_XPATH = etree.XPath(
+    '//script|//style|//nav|//header|//footer|//noscript|//comment()'
+)
+_MENU_ELEMENT_XPATH = etree.XPath(
+    '//*[re:test(@class, $pattern, "i") or re:test(@id, $pattern, "i")]',
+    namespaces={'re': 'http://exslt.org/regular-expressions'},
+)
+_MENU_ATTR_PATTERN = 'menu|food|dish|price|cuisine|appetizer|entree|dessert|drink|beverage|dining'
+# One alternation so the page text is scanned once for both indicator kinds
+_PRICE_INDICATOR_RE = re.compile(
+    r'(?P<dish>(?:appetizer|entree|main|dessert|drink|wine|beer|cocktail|pasta|pizza|burger|salad|soup)[^\n]*?\$\d+)'
+    r'|(?P<price>\$\d+(?:\.\d{2})?[^\n]*)',  # Price and the rest of its line
+    re.IGNORECASE,
+)
+_FOOD_TERMS = (
+    'chicken', 'beef', 'pork', 'fish', 'salmon', 'pasta', 'pizza', 'salad', 'soup', 'burger',
+    'sandwich', 'rice', 'noodles', 'bread', 'cheese', 'sauce', 'grilled', 'fried', 'roasted',
+    'fresh', 'organic', 'wine', 'beer', 'cocktail', 'coffee', 'tea',
+)
+_FOOD_RE = re.compile('|'.join(map(re.escape, _FOOD_TERMS)), re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r'\s+')
+# Caption keyword -> screenshot analysis focus, checked in order ("menu" outranks "contact")
+_SCREENSHOT_FOCUS_KEYWORDS = {
+    "menu": "menu_impression",
+    "contact": "contact_page_analysis",
+}
 
 # Set up module-level logging with proper configuration
 logger = logging.getLogger(__name__)
@@ -58,27 +140,691 @@ except ImportError:
         handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
         logger.addHandler(handler)
 
+# Shared HTTP session for all Gemini REST calls so TCP/TLS connections and DNS
+# lookups are reused instead of being re-established per request.
+_SESSION: Optional[aiohttp.ClientSession] = None
+
+async def _get_session() -> aiohttp.ClientSession:
+    """Return the shared Gemini session, creating it on first use."""
+    global _SESSION
+    # No await between the check and the assignment, so concurrent callers on
+    # the same event loop cannot create duplicate sessions.
+    if _SESSION is None or _SESSION.closed:
+        _SESSION = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300, keepalive_timeout=60)
+        )
+    return _SESSION
+
+async def close_gemini_session() -> None:
+    """Close the shared Gemini session (call on application shutdown)."""
+    global _SESSION
+    if _SESSION is not None and not _SESSION.closed:
+        await _SESSION.close()
+    _SESSION = None
+
+# Content-addressed on-disk cache of Gemini responses, keyed on model + request body,
+# so reruns over the same restaurant/competitor data skip the API round trip.
+GEMINI_CACHE_ENABLED = os.getenv("GEMINI_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+GEMINI_CACHE_DIR = Path(os.getenv("GEMINI_CACHE_DIR", str(Path(__file__).resolve().parent.parent / ".gemini_cache")))
+GEMINI_CACHE_TTL_SECONDS = int(os.getenv("GEMINI_CACHE_TTL_SECONDS", "86400"))
+# Writes prune expired entries and then the oldest ones until the cache fits this size
+GEMINI_CACHE_MAX_BYTES = int(os.getenv("GEMINI_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+GEMINI_CACHE_PRUNE_INTERVAL_SECONDS = int(os.getenv("GEMINI_CACHE_PRUNE_INTERVAL_SECONDS", "600"))
+# Parsed LLMA-6 strategic reports are expensive (up to 300s) and keyed on normalized
+# inputs rather than the request body, so they are kept longer
+GEMINI_REPORT_CACHE_TTL_SECONDS = int(os.getenv("GEMINI_REPORT_CACHE_TTL_SECONDS", str(7 * 86400)))
+# LLMA-8/9 analyses depend only on slow-changing restaurant data, so their responses live longest
+GEMINI_ANALYSIS_CACHE_TTL_SECONDS = int(os.getenv("GEMINI_ANALYSIS_CACHE_TTL_SECONDS", str(30 * 86400)))
+# Schema-constrained responses are parsed strictly; set this to also run the lenient
+# recovery parser on malformed output (useful when diagnosing prompt/schema issues)
+GEMINI_LENIENT_JSON_PARSE = os.getenv("GEMINI_LENIENT_JSON_PARSE", "false").lower() in ("1", "true", "yes")
+# Analyzer calls raise their output budget towards 1.2x the p95 of recent response
+# lengths (truncated responses count at their cap), up to this ceiling
+GEMINI_MAX_OUTPUT_TOKENS_CEILING = int(os.getenv("GEMINI_MAX_OUTPUT_TOKENS_CEILING", "8192"))
+
+def _prompt_key(namespace: str, body: Union[bytes, bytearray]) -> str:
+    """Hash a namespace (model name or cache kind) and a request body into a cache key."""
+    hasher = hashlib.blake2b(namespace.encode(), digest_size=16)
+    hasher.update(body)
+    return hasher.hexdigest()
+
+def _template_version(*template_parts: str) -> str:
+    """Short, stable identifier for a prompt template, for use in cache keys."""
+    return hashlib.sha1("".join(template_parts).encode()).hexdigest()[:12]
+
+class _SlotTemplate:
+    """A str.format-style prompt template parsed once at import.
+    
+    The template is split into literal chunks and slot names up front, so rendering
+    is a single join instead of re-scanning the text and its {{ }} escapes per call.
+    """
+    
+    def __init__(self, template: str):
+        self.template = template
+        self._literals: List[str] = []
+        self._fields: List[str] = []
+        # Formatter.parse also splits at each {{ / }} escape, so literal runs are merged
+        pending: List[str] = []
+        for literal, field, format_spec, conversion in string.Formatter().parse(template):
+            pending.append(literal)
+            if field is None:
+                continue
+            if format_spec or conversion:
+                raise ValueError(f"Unsupported format spec in prompt slot {{{field}}}")
+            self._literals.append("".join(pending))
+            self._fields.append(field)
+            pending.clear()
+        self._trailing = "".join(pending)
+    
+    def format_map(self, values: Dict[str, Any]) -> str:
+        parts: List[str] = []
+        for literal, field in zip(self._literals, self._fields):
+            parts.append(literal)
+            parts.append(format(values[field]))
+        parts.append(self._trailing)
+        return "".join(parts)
+
+def _gemini_schema_from_example(example: Any, nullable: Tuple[str, ...] = ()) -> Dict[str, Any]:
+    """
+    Derive a Gemini response schema from an example output.
+    
+    String values in the example are treated as field descriptions; objects keep their
+    key order via propertyOrdering, and arrays take their item schema from the first
+    element (string arrays keep every example as part of the description). Fields
+    named in nullable, at any depth, accept null.
+    """
+    if isinstance(example, dict):
+        properties = {}
+        for key, value in example.items():
+            properties[key] = _gemini_schema_from_example(value, nullable)
+            if key in nullable:
+                properties[key]["nullable"] = True
+        return {
+            "type": "OBJECT",
+            "properties": properties,
+            "required": list(example),
+            "propertyOrdering": list(example),
+        }
+    if isinstance(example, list):
+        if example and all(isinstance(item, str) for item in example):
+            return {"type": "ARRAY", "items": {"type": "STRING"}, "description": " | ".join(example)}
+        return {"type": "ARRAY", "items": _gemini_schema_from_example(example[0] if example else "", nullable)}
+    if isinstance(example, bool):
+        return {"type": "BOOLEAN"}
+    if isinstance(example, int):
+        return {"type": "INTEGER"}
+    if isinstance(example, float):
+        return {"type": "NUMBER"}
+    return {"type": "STRING", "description": str(example)}
+
+def _read_cache_file(key: str, ttl: int) -> Optional[dict]:
+    cache_file = GEMINI_CACHE_DIR / f"{key}.json"
+    try:
+        if time.time() - cache_file.stat().st_mtime > ttl:
+            return None
+        return orjson.loads(cache_file.read_bytes())
+    except (OSError, orjson.JSONDecodeError):
+        return None
+
+async def _read_cached_response(key: str, ttl: int = GEMINI_CACHE_TTL_SECONDS) -> Optional[dict]:
+    """Return a cached Gemini response if present and not older than ttl seconds."""
+    return await asyncio.to_thread(_read_cache_file, key, ttl)
+
+def _is_complete_response(response_data: Optional[dict]) -> bool:
+    """True if the response has candidates and all of them finished with STOP.
+    
+    Truncated (MAX_TOKENS), SAFETY and RECITATION finishes must not be cached, or
+    the cache would keep serving the incomplete answer until the entry expires.
+    """
+    candidates = (response_data or {}).get("candidates")
+    return bool(candidates) and all(c.get("finishReason") == "STOP" for c in candidates)
+
+_last_cache_prune = 0.0
+
+def _prune_cache_dir() -> None:
+    """Drop expired entries and stale temp files, then the oldest entries over the size cap.
+    
+    Entries don't record which TTL they were written under, so only those past the
+    longest TTL count as expired; the size cap bounds everything else.
+    """
+    max_age = max(GEMINI_CACHE_TTL_SECONDS, GEMINI_REPORT_CACHE_TTL_SECONDS, GEMINI_ANALYSIS_CACHE_TTL_SECONDS)
+    now = time.time()
+    entries = []
+    for path in GEMINI_CACHE_DIR.iterdir():
+        try:
+            stat = path.stat()
+            age = now - stat.st_mtime
+            # A temp file older than an hour belongs to a write that died midway
+            if age > max_age or (path.suffix == ".tmp" and age > 3600):
+                path.unlink(missing_ok=True)
+            elif path.suffix == ".json":
+                entries.append((stat.st_mtime, stat.st_size, path))
+        except OSError:
+            continue
+    total_bytes = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total_bytes <= GEMINI_CACHE_MAX_BYTES:
+            break
+        try:
+            path.unlink(missing_ok=True)
+        except OSError:
+            continue
+        total_bytes -= size
+
+def _write_cache_file(key: str, response_data: dict) -> None:
+    global _last_cache_prune
+    tmp_file = None
+    try:
+        GEMINI_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        cache_file = GEMINI_CACHE_DIR / f"{key}.json"
+        tmp_file = cache_file.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        tmp_file.write_bytes(orjson.dumps(response_data))
+        os.replace(tmp_file, cache_file)
+        if time.time() - _last_cache_prune >= GEMINI_CACHE_PRUNE_INTERVAL_SECONDS:
+            _last_cache_prune = time.time()
+            _prune_cache_dir()
+    except (OSError, orjson.JSONEncodeError) as e:
+        # Also covers responses orjson can't serialize: the call already succeeded
+        logger.warning(f"⚠️ Could not write Gemini cache entry {key}: {e}")
+        if tmp_file is not None:
+            with contextlib.suppress(OSError):
+                tmp_file.unlink(missing_ok=True)
+
+async def _write_cached_response(key: str, response_data: dict) -> None:
+    """Persist a Gemini response atomically; cache failures are never fatal."""
+    await asyncio.to_thread(_write_cache_file, key, response_data)
+
+class _StreamedResponse:
+    """Fold streamGenerateContent SSE chunks into a generateContent-shaped response.
+    
+    Chunks are consumed as they arrive and only the text deltas plus the latest
+    candidate metadata are kept, so the full per-chunk dicts are never retained.
+    """
+    
+    def __init__(self):
+        self.metadata: Dict[str, Any] = {}
+        self.text_deltas: List[str] = []
+        self.last_candidate: Optional[dict] = None
+    
+    def add(self, chunk: dict) -> str:
+        """Fold in one chunk and return the text it contributed."""
+        candidates = chunk.pop("candidates", None)
+        self.metadata.update(chunk)
+        delta = ""
+        for candidate in (candidates or [])[:1]:
+            content = candidate.pop("content", None) or {}
+            delta = "".join(part["text"] for part in content.get("parts", []) if "text" in part)
+            if delta:
+                self.text_deltas.append(delta)
+            self.last_candidate = candidate
+        return delta
+    
+    def result(self) -> dict:
+        merged = dict(self.metadata)
+        if self.last_candidate is not None:
+            # The final chunk carries finishReason/safetyRatings; text is the concatenation
+            candidate = dict(self.last_candidate)
+            if self.text_deltas:
+                candidate["content"] = {"role": "model", "parts": [{"text": "".join(self.text_deltas)}]}
+            merged["candidates"] = [candidate]
+        return merged
+
+class _TopLevelMemberStream:
+    """Incrementally split a streamed JSON object into its completed top-level members.
+    
+    Text deltas are fed as they arrive and each member is parsed as soon as its value
+    closes, so early sections are available before generation finishes and survive a
+    response that is later truncated or malformed.
+    """
+    
+    def __init__(self):
+        self.reset()
+    
+    def reset(self) -> None:
+        """Discard all state, e.g. when a request is retried and the stream restarts."""
+        self.members: Dict[str, Any] = {}
+        self._chars: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._closed = False
+    
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """Consume a text delta and return the (key, value) members it completed."""
+        completed: List[Tuple[str, Any]] = []
+        for ch in text:
+            if self._depth == 0:
+                # Skip anything (e.g. a code fence) before the top-level object
+                if ch == '{' and not self._closed:
+                    self._depth = 1
+                continue
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in '{[':
+                self._depth += 1
+            elif ch in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    self._closed = True
+                    self._flush(completed)
+                    continue
+            elif ch == ',' and self._depth == 1:
+                self._flush(completed)
+                continue
+            self._chars.append(ch)
+        return completed
+    
+    def _flush(self, completed: List[Tuple[str, Any]]) -> None:
+        member = "".join(self._chars).strip()
+        self._chars.clear()
+        if not member:
+            return
+        try:
+            parsed = orjson.loads(f"{{{member}}}")
+        except orjson.JSONDecodeError:
+            logger.debug(f"Skipping unparseable streamed member: {member[:80]}")
+            return
+        self.members.update(parsed)
+        completed.extend(parsed.items())
+
+class TokenBucket:
+    """Async limiter enforcing Gemini requests-per-minute and tokens-per-minute budgets.
+    
+    A budget of 0 or less leaves that dimension unlimited, so setting both to 0
+    disables the limiter.
+    """
+    
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests_per_minute = max(requests_per_minute, 0)
+        self.tokens_per_minute = max(tokens_per_minute, 0)
+        self._request_capacity = float(self.requests_per_minute)
+        self._token_capacity = float(self.tokens_per_minute)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._request_capacity = min(
+            self.requests_per_minute, self._request_capacity + elapsed * self.requests_per_minute / 60
+        )
+        self._token_capacity = min(
+            self.tokens_per_minute, self._token_capacity + elapsed * self.tokens_per_minute / 60
+        )
+    
+    async def acquire(self, tokens: int) -> None:
+        """Wait until one request and the estimated tokens fit in the budget, then take them."""
+        if not self.requests_per_minute and not self.tokens_per_minute:
+            return
+        # An unlimited dimension never waits; an oversized request must not wait forever
+        requests = 1 if self.requests_per_minute else 0
+        tokens = min(tokens, self.tokens_per_minute)
+        # Waiters queue on the lock, so capacity is handed out in arrival order
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._request_capacity >= requests and self._token_capacity >= tokens:
+                    self._request_capacity -= requests
+                    self._token_capacity -= tokens
+                    return
+                await asyncio.sleep(max(
+                    (requests - self._request_capacity) * 60 / self.requests_per_minute if requests else 0,
+                    (tokens - self._token_capacity) * 60 / self.tokens_per_minute if tokens else 0
+                ))
+
+# Shared budget for all REST Gemini calls so concurrent fan-out stays under quota
+# instead of triggering 429 storms and backoff stalls
+_GEMINI_RATE_LIMITER = TokenBucket(
+    requests_per_minute=int(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "1000")),
+    tokens_per_minute=int(os.getenv("GEMINI_TOKENS_PER_MINUTE", "4000000"))
+)
+
+def _estimate_request_tokens(body: bytes, payload: dict) -> int:
+    """Rough token estimate for a request: ~4 bytes per input token plus the output cap."""
+    max_output_tokens = payload.get("generationConfig", {}).get("maxOutputTokens", 2048)
+    return len(body) // 4 + max_output_tokens
+
+# Shared timeout objects for the durations used across this module; sock_read bounds
+# the gap between reads so a stalled stream fails fast and is retried
+_TIMEOUTS = {
+    t: aiohttp.ClientTimeout(total=t, sock_read=min(t, GEMINI_STREAM_STALL_SECONDS))
+    for t in (60, 120, 300, 600)
+}
+
+# Jittered backoff so concurrent requests that fail together (e.g. a burst of 429s
+# during competitor fan-out) don't retry in lockstep
+_GEMINI_BACKOFF = wait_random_exponential(multiplier=1, min=2, max=30)
+
+def _is_retryable_gemini_error(exc: BaseException) -> bool:
+    """Retry rate limits, server errors, connection errors and timeouts; not 4xx."""
+    if isinstance(exc, aiohttp.ClientResponseError):
+        return exc.status == 429 or exc.status >= 500
+    return isinstance(exc, (aiohttp.ClientError, asyncio.TimeoutError))
+
+def _wait_gemini_retry(retry_state) -> float:
+    """Jittered exponential backoff, stretched to honor a Retry-After header."""
+    backoff = _GEMINI_BACKOFF(retry_state)
+    exc = retry_state.outcome.exception()
+    if isinstance(exc, aiohttp.ClientResponseError) and exc.headers:
+        retry_after = exc.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return max(backoff, min(float(retry_after), 60.0))
+    return backoff
+
 @retry(
-    retry=retry_if_exception_type((aiohttp.ClientError, asyncio.TimeoutError)),
-    wait=wait_exponential(multiplier=1, min=2, max=10),
-    stop=stop_after_attempt(3)
+    retry=retry_if_exception(_is_retryable_gemini_error),
+    wait=_wait_gemini_retry,
+    stop=stop_after_attempt(5)
 )
-async def make_gemini_request(session: aiohttp.ClientSession, model: str, payload: dict, timeout: int = 300) -> dict:
-    """Make a robust API request to Gemini with retries and proper error handling."""
-    url = f"{GEMINI_API_BASE_URL}/{model}:generateContent?key={GEMINI_API_KEY}"
+async def make_gemini_request(
+    session: aiohttp.ClientSession,
+    model: str,
+    payload: dict,
+    timeout: int = 300,
+    member_stream: Optional[_TopLevelMemberStream] = None
+) -> dict:
+    """Make a robust API request to Gemini with retries and proper error handling.
+    
+    If member_stream is given, response text is fed to it chunk by chunk while the
+    response is still generating (it is reset on each attempt; cache hits skip it).
+    """
+    # Stream over SSE so chunks are decoded while the rest of the body is in flight
+    url = f"{GEMINI_API_BASE_URL}/{model}:streamGenerateContent?alt=sse&key={GEMINI_API_KEY}"
     
     # Add security check: never log API keys
     safe_payload = {k: v for k, v in payload.items() if k != 'key'}
     logger.debug(f"Making Gemini API request to {model}")
     
+    # Serialize with orjson up front; aiohttp's json= path goes through stdlib json
+    body = orjson.dumps(payload)
+    
+    cache_key = _prompt_key(model, body) if GEMINI_CACHE_ENABLED else None
+    if cache_key:
+        cached = await _read_cached_response(cache_key)
+        # Entries written before incomplete finishes were excluded are ignored too
+        if cached is not None and _is_complete_response(cached):
+            logger.info(f"♻️ Gemini cache hit for {model} ({cache_key})")
+            return cached
+    
+    await _GEMINI_RATE_LIMITER.acquire(_estimate_request_tokens(body, payload))
+    
+    if member_stream is not None:
+        member_stream.reset()
+    
     async with session.post(
         url, 
-        json=payload, 
-        timeout=aiohttp.ClientTimeout(total=timeout),
+        data=body, 
+        timeout=_TIMEOUTS.get(timeout) or aiohttp.ClientTimeout(total=timeout, sock_read=GEMINI_STREAM_STALL_SECONDS),
+        headers={"Content-Type": "application/json"}
+    ) as response:
+        response.raise_for_status()
+        streamed = _StreamedResponse()
+        # An SSE event may span several data: lines and ends at a blank line; collect
+        # its pieces in a list and join/parse once per event
+        event_data: List[bytes] = []
+        async for line in response.content:
+            line = line.rstrip(b"\r\n")
+            if line.startswith(b"data:"):
+                event_data.append(line[5:])
+            elif not line and event_data:
+                delta = streamed.add(orjson.loads(b"\n".join(event_data)))
+                event_data.clear()
+                if member_stream is not None and delta:
+                    member_stream.feed(delta)
+        if event_data:  # Stream ended without a trailing blank line
+            delta = streamed.add(orjson.loads(b"\n".join(event_data)))
+            if member_stream is not None and delta:
+                member_stream.feed(delta)
+    
+    response_data = streamed.result()
+    
+    # Only cache complete answers (not blocked, empty or truncated ones)
+    if cache_key and _is_complete_response(response_data):
+        await _write_cached_response(cache_key, response_data)
+    
+    return response_data
+
+async def make_hedged_gemini_request(
+    session: aiohttp.ClientSession,
+    model: str,
+    payload: dict,
+    timeout: int = 300,
+    hedge_after: float = GEMINI_HEDGE_AFTER_SECONDS,
+    member_stream: Optional[_TopLevelMemberStream] = None
+) -> dict:
+    """
+    make_gemini_request with tail-latency hedging for long calls.
+    
+    If the first request is still running after hedge_after seconds, a duplicate is
+    started and whichever succeeds first is returned; the other is cancelled.
+    """
+    if hedge_after <= 0:
+        return await make_gemini_request(session, model, payload, timeout=timeout, member_stream=member_stream)
+    
+    # Each attempt streams into its own parser so the two responses never interleave
+    def _start() -> asyncio.Task:
+        stream = _TopLevelMemberStream() if member_stream is not None else None
+        task = asyncio.create_task(make_gemini_request(session, model, payload, timeout=timeout, member_stream=stream))
+        streams[task] = stream
+        return task
+    
+    streams: Dict[asyncio.Task, Optional[_TopLevelMemberStream]] = {}
+    pending = {_start()}
+    try:
+        done, _ = await asyncio.wait(pending, timeout=hedge_after)
+        if not done:
+            logger.info(f"⏱️ Gemini {model} request still running after {hedge_after:g}s, sending a hedged duplicate")
+            pending.add(_start())
+        
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                stream = streams[task]
+                if task.exception() is None:
+                    if member_stream is not None and stream is not None:
+                        member_stream.members = stream.members
+                    return task.result()
+        
+        # Every attempt failed: hand the caller the most complete partial stream so it
+        # can still salvage the sections that arrived, then raise the first failure
+        if member_stream is not None:
+            member_stream.members = max(
+                (stream.members for stream in streams.values() if stream is not None), key=len
+            )
+        errors = [task.exception() for task in streams]
+        raise next(error for error in errors if error is not None)
+    finally:
+        for task in streams:
+            task.cancel()
+        # Wait for the cancellations to land and retrieve every attempt's exception, so
+        # no request outlives this call and a failed loser isn't reported as unretrieved
+        await asyncio.gather(*streams, return_exceptions=True)
+
+async def make_gemini_batch_request(
+    session: aiohttp.ClientSession,
+    model: str,
+    payloads: List[dict],
+    poll_timeout: int = GEMINI_BATCH_POLL_SECONDS,
+    poll_interval: int = 5,
+    display_name: str = "competitor-snapshots"
+) -> Optional[List[Optional[dict]]]:
+    """
+    Submit payloads as one Gemini Batch Mode job and wait for the results.
+    
+    Returns one response per payload (None for entries that failed), or None if
+    the job did not finish within poll_timeout; unfinished jobs are cancelled so
+    the caller can fall back to real-time requests.
+    """
+    api_root = GEMINI_API_BASE_URL.rsplit("/models", 1)[0]
+    body = orjson.dumps({
+        "batch": {
+            "display_name": f"{display_name}-{uuid.uuid4().hex[:8]}",
+            "input_config": {"requests": {"requests": [
+                {"request": payload, "metadata": {"key": str(i)}} for i, payload in enumerate(payloads)
+            ]}}
+        }
+    })
+    
+    async with session.post(
+        f"{api_root}/models/{model}:batchGenerateContent?key={GEMINI_API_KEY}",
+        data=body,
+        timeout=_TIMEOUTS[60],
         headers={"Content-Type": "application/json"}
     ) as response:
         response.raise_for_status()
-        return await response.json()
+        batch_name = orjson.loads(await response.read())["name"]
+    logger.info(f"📦 Submitted Gemini batch {batch_name} with {len(payloads)} requests")
+    
+    deadline = time.monotonic() + poll_timeout
+    while time.monotonic() < deadline:
+        await asyncio.sleep(poll_interval)
+        async with session.get(f"{api_root}/{batch_name}?key={GEMINI_API_KEY}", timeout=_TIMEOUTS[60]) as response:
+            response.raise_for_status()
+            operation = orjson.loads(await response.read())
+        if not operation.get("done"):
+            continue
+        
+        output = operation.get("response") or operation.get("metadata", {}).get("output") or {}
+        inlined = output.get("inlinedResponses", {}).get("inlinedResponses", [])
+        results: List[Optional[dict]] = [None] * len(payloads)
+        for position, entry in enumerate(inlined):
+            index = int(entry.get("metadata", {}).get("key", position))
+            if 0 <= index < len(results):
+                results[index] = entry.get("response")
+        return results
+    
+    logger.warning(f"⏱️ Gemini batch {batch_name} not done after {poll_timeout}s, cancelling")
+    try:
+        async with session.post(f"{api_root}/{batch_name}:cancel?key={GEMINI_API_KEY}", timeout=_TIMEOUTS[60]):
+            pass
+    except aiohttp.ClientError as e:
+        logger.warning(f"⚠️ Could not cancel Gemini batch {batch_name}: {e}")
+    return None
+
+# (model, prefix version) -> (cachedContents name, monotonic expiry)
+_CACHED_CONTENTS: Dict[Tuple[str, str], Tuple[str, float]] = {}
+# (model, prefix version) -> in-flight cachedContents create shared by concurrent callers
+_CACHED_CONTENT_CREATES: Dict[Tuple[str, str], "asyncio.Future[Optional[str]]"] = {}
+# Recreate a cache this long before it expires so in-flight requests never reference a stale one
+_CACHED_CONTENT_REFRESH_MARGIN = 300
+
+async def _create_cached_content(
+    session: aiohttp.ClientSession, model: str, prefix_text: str, key: Tuple[str, str]
+) -> Optional[str]:
+    api_root = GEMINI_API_BASE_URL.rsplit("/models", 1)[0]
+    body = orjson.dumps({
+        "model": f"models/{model}",
+        "contents": [{"role": "user", "parts": [{"text": prefix_text}]}],
+        "ttl": f"{GEMINI_CONTEXT_CACHE_TTL_SECONDS}s"
+    })
+    try:
+        async with session.post(
+            f"{api_root}/cachedContents?key={GEMINI_API_KEY}",
+            data=body,
+            timeout=_TIMEOUTS[60],
+            headers={"Content-Type": "application/json"}
+        ) as response:
+            response.raise_for_status()
+            name = orjson.loads(await response.read())["name"]
+    except (aiohttp.ClientError, asyncio.TimeoutError, KeyError, orjson.JSONDecodeError) as e:
+        logger.warning(f"⚠️ Could not create Gemini context cache for {model}, sending prefix inline: {e}")
+        _CACHED_CONTENTS.pop(key, None)
+        return None
+    
+    _CACHED_CONTENTS[key] = (name, time.monotonic() + GEMINI_CONTEXT_CACHE_TTL_SECONDS)
+    logger.info(f"🗄️ Created Gemini context cache {name} for {model}")
+    return name
+
+async def get_cached_content_name(session: aiohttp.ClientSession, model: str, prefix_text: str) -> Optional[str]:
+    """
+    Return a Gemini cachedContents name holding prefix_text, creating or refreshing it as needed.
+    
+    Returns None when context caching is disabled or the cache cannot be created, in
+    which case callers should send the prefix inline.
+    """
+    if not GEMINI_CONTEXT_CACHE:
+        return None
+    key = (model, _template_version(prefix_text))
+    cached = _CACHED_CONTENTS.get(key)
+    if cached and cached[1] - time.monotonic() > _CACHED_CONTENT_REFRESH_MARGIN:
+        return cached[0]
+    
+    # Single-flight per key: concurrent callers share one create call, and a slow
+    # create for one model or prefix never holds up the others. No await between
+    # the lookup and the insert, so this needs no lock.
+    create = _CACHED_CONTENT_CREATES.get(key)
+    if create is None:
+        create = asyncio.ensure_future(_create_cached_content(session, model, prefix_text, key))
+        _CACHED_CONTENT_CREATES[key] = create
+        
+        def _end_create(task: "asyncio.Future[Optional[str]]") -> None:
+            _CACHED_CONTENT_CREATES.pop(key, None)
+            # Retrieve the exception so it isn't reported as never retrieved when
+            # every caller was cancelled before the create failed
+            if not task.cancelled():
+                task.exception()
+        
+        create.add_done_callback(_end_create)
+    # Shielded so one caller being cancelled doesn't cancel the create the others await
+    return await asyncio.shield(create)
+
+def _extract_json_span(text: str) -> str:
+    """Return the first balanced JSON object/array in text that parses, scanning it once.
+    
+    Balanced spans that aren't JSON (bracketed prose such as "[Note]") are skipped.
+    Falls back to everything from the last opener when the JSON is unbalanced (e.g.
+    a truncated response), then to the first balanced span, and to the input when
+    there is no opener.
+    """
+    depth = 0
+    start_idx = -1
+    first_span = None
+    for match in _JSON_TOKEN_RE.finditer(text):
+        token = match.group()
+        if token[0] == '"':
+            continue
+        if token in '{[':
+            if depth == 0:
+                start_idx = match.start()
+            depth += 1
+        elif depth:
+            depth -= 1
+            if depth == 0:
+                span = text[start_idx:match.end()]
+                try:
+                    orjson.loads(span)
+                    return span
+                except orjson.JSONDecodeError:
+                    first_span = first_span or span
+    if depth:
+        return text[start_idx:]
+    return first_span or text
+
+def _loads_model_json(response_text: str) -> Any:
+    """Parse a JSON-mode model response, tolerating fences or prose from older models.
+    
+    Raises json.JSONDecodeError (via orjson) when no JSON can be recovered.
+    """
+    try:
+        # JSON response mode returns bare JSON, so the happy path is a single parse
+        return orjson.loads(response_text)
+    except orjson.JSONDecodeError:
+        pass
+    match = _JSON_FENCE_RE.search(response_text)
+    if match:
+        return orjson.loads(match.group(1))
+    if not _JSON_START_RE.search(response_text):
+        raise json.JSONDecodeError("No JSON object/array found", response_text, 0)
+    # One string-aware pass finds the first balanced object/array
+    return orjson.loads(_extract_json_span(response_text))
 
 def clean_and_parse_json(raw_text: str) -> dict:
     """Robustly clean and parse JSON from Gemini responses."""
@@ -86,82 +832,160 @@ def clean_and_parse_json(raw_text: str) -> dict:
     cleaned_text = raw_text.strip()
     
     # Enhanced markdown fence removal - handle more patterns
-    fence_patterns = [
-        r'^```json\s*\n?',  # ```json at start
-        r'^```\s*\n?',      # ``` at start  
-        r'\n?```\s*$',      # ``` at end
-        r'```$',            # ``` at very end
-        r'^```json\s*',     # ```json without newline
-        r'```\s*$',         # ``` at end without newline
-    ]
-    
-    for pattern in fence_patterns:
-        cleaned_text = re.sub(pattern, '', cleaned_text, flags=re.MULTILINE)
+    for pattern in _FENCE_PATTERNS:
+        cleaned_text = pattern.sub('', cleaned_text)
     
     cleaned_text = cleaned_text.strip()
     
     # Handle cases where there might be extra text before/after JSON
-    # Look for the first '{' and last '}' to extract just the JSON part
-    if cleaned_text:
-        # Find the first '{' character (start of JSON object)
-        start_idx = cleaned_text.find('{')
-        if start_idx == -1:
-            # Try looking for '[' for JSON arrays
-            start_idx = cleaned_text.find('[')
-        
-        if start_idx != -1:
-            # Find the matching closing brace/bracket
-            if cleaned_text[start_idx] == '{':
-                # For objects, find the last '}'
-                end_idx = cleaned_text.rfind('}')
-                if end_idx != -1 and end_idx > start_idx:
-                    cleaned_text = cleaned_text[start_idx:end_idx + 1]
-            elif cleaned_text[start_idx] == '[':
-                # For arrays, find the last ']'
-                end_idx = cleaned_text.rfind(']')
-                if end_idx != -1 and end_idx > start_idx:
-                    cleaned_text = cleaned_text[start_idx:end_idx + 1]
-    
-    cleaned_text = cleaned_text.strip()
+    cleaned_text = _extract_json_span(cleaned_text).strip()
     
     if not cleaned_text:
         raise json.JSONDecodeError("Empty JSON string after cleaning", "", 0)
     
     try:
-        # Try orjson first for better handling of trailing commas
         return orjson.loads(cleaned_text)
-    except orjson.JSONDecodeError:
-        try:
-            # Fallback to standard json
-            return json.loads(cleaned_text)
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON parsing failed: {str(e)}")
-            logger.error(f"Cleaned text (first 500 chars): {cleaned_text[:500]}")
-            logger.error(f"Raw text (first 500 chars): {raw_text[:500]}")
-            
-            # Try one more time with aggressive cleaning
-            try:
-                # Remove any remaining non-JSON characters at start/end
-                cleaned_text = re.sub(r'^[^{\[]*', '', cleaned_text)  # Remove everything before { or [
-                cleaned_text = re.sub(r'[^}\]]*$', '', cleaned_text)  # Remove everything after } or ]
-                cleaned_text = cleaned_text.strip()
-                
-                if cleaned_text:
-                    return json.loads(cleaned_text)
-            except json.JSONDecodeError:
-                pass
-            
-            raise e
+    except orjson.JSONDecodeError as e:
+        logger.error(f"JSON parsing failed: {str(e)}")
+        logger.error(f"Cleaned text (first 500 chars): {cleaned_text[:500]}")
+        logger.error(f"Raw text (first 500 chars): {raw_text[:500]}")
+        raise
+
+def _json_default(value: Any) -> Any:
+    """orjson fallback: dump nested Pydantic models, stringify anything else."""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    return str(value)
+
+def _to_json(value: Any) -> str:
+    """Render a value as compact JSON for splicing into a prompt."""
+    # OPT_NON_STR_KEYS keeps str-subclass keys (e.g. FlexibleUrl screenshot URLs) working
+    return orjson.dumps(value, default=_json_default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+def _to_json_sorted(value: Any) -> bytes:
+    """Compact JSON bytes with sorted keys, stable across runs for hashing and prompts."""
+    return orjson.dumps(value, default=_json_default, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+
+def _key_target_data(target_summary: Dict[str, Any], screenshots_available_count: int) -> Dict[str, Any]:
+    """Key target restaurant data points for the LLMA-6 prompt."""
+    return {
+        "name": target_summary.get('name', 'Unknown Restaurant'),
+        "url": target_summary.get('website', 'Not available'),
+        "menu_item_count": len(target_summary.get('menu_items', [])),
+        "google_rating": target_summary.get('google_rating', 'Not available'),
+        "google_review_count": target_summary.get('total_reviews', 'Not available'),
+        "primary_cuisine_types": target_summary.get('cuisine_types', ['Not specified']),
+        "screenshots_available_count": screenshots_available_count
+    }
+
+def _rows_to_columns(rows: Dict[Any, Dict[str, Any]], key_column: str) -> Dict[str, List[Any]]:
+    """
+    Turn {row_key: {field: value}} into column form {key_column: [...], field: [...]}.
+    
+    Each field name appears once instead of once per row, which keeps repeated
+    records small in prompts; rows missing a field get None in that column.
+    """
+    fields: Dict[str, None] = {}
+    for row in rows.values():
+        fields.update(dict.fromkeys(row))
+    columns: Dict[str, List[Any]] = {key_column: list(rows)}
+    for field in fields:
+        columns[field] = [row.get(field) for row in rows.values()]
+    return columns
+
+def _drop_empty(value: Any) -> Any:
+    """Recursively drop None/empty values from dicts so they don't cost prompt tokens."""
+    if isinstance(value, dict):
+        pruned = {k: _drop_empty(v) for k, v in value.items()}
+        return {k: v for k, v in pruned.items() if v is not None and v != "" and v != [] and v != {}}
+    if isinstance(value, list):
+        return [_drop_empty(v) for v in value]
+    return value
+
+def _compress_for_prompt(value: Any, str_cap: int = 500, list_cap: int = 20) -> Any:
+    """Recursively cut long strings and lists so scraped blobs stay within a prompt budget."""
+    if isinstance(value, dict):
+        return {k: _compress_for_prompt(v, str_cap, list_cap) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_compress_for_prompt(v, str_cap, list_cap) for v in value[:list_cap]]
+    if isinstance(value, str) and len(value) > str_cap:
+        return value[:str_cap] + "…"
+    return value
+
+MAX_IMAGE_BYTES = 20 * 1024 * 1024  # Gemini Vision inline image limit
 
-def check_image_size_limits(image_data: bytes) -> bool:
+def check_image_size_limits(image_data: Union[bytes, bytearray]) -> bool:
     """Check if image meets size requirements for Gemini Vision API."""
     # FIXED: Add 20MB limit check before base64 encoding
     size_mb = len(image_data) / (1024 * 1024)
-    if size_mb > 20:
+    if len(image_data) > MAX_IMAGE_BYTES:
         logger.warning(f"Image size {size_mb:.1f}MB exceeds 20MB limit")
         return False
     return True
 
+# Leading magic bytes of the image formats screenshots arrive in
+_IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF8", "image/gif"),
+)
+_HEIC_BRANDS = (b"heic", b"heix", b"hevc", b"hevx")
+
+def _sniff_image_mime(image_data: Union[bytes, bytearray], default: str = "image/png") -> str:
+    """Infer an image's MIME type from its leading bytes, falling back to PNG."""
+    for signature, mime_type in _IMAGE_SIGNATURES:
+        if image_data.startswith(signature):
+            return mime_type
+    if image_data[:4] == b"RIFF" and image_data[8:12] == b"WEBP":
+        return "image/webp"
+    # ISO-BMFF images (iPhone uploads): 'ftyp' box at offset 4, then the major brand
+    if image_data[4:8] == b"ftyp":
+        brand = bytes(image_data[8:12])
+        if brand in _HEIC_BRANDS:
+            return "image/heic"
+        if brand in (b"mif1", b"msf1"):
+            return "image/heif"
+    return default
+
+# Gemini Vision tiles images at roughly this width; wider screenshots cost more tokens
+# and upload time without helping the qualitative analysis. Only the width is capped:
+# full-page captures are tall, and fitting their height as well would shrink the text
+# past legibility.
+VISION_MAX_WIDTH = 1568
+
+def _downscale_for_vision(image_data: Union[bytes, bytearray]) -> Union[bytes, bytearray]:
+    """Shrink a screenshot wider than VISION_MAX_WIDTH and re-encode it as JPEG.
+    
+    CPU-bound: call via asyncio.to_thread. Images already within bounds, and any
+    Pillow can't decode, are returned unchanged.
+    """
+    try:
+        with Image.open(io.BytesIO(image_data)) as img:
+            width, height = img.size
+            if width <= VISION_MAX_WIDTH:
+                return image_data
+            resized = img.resize(
+                (VISION_MAX_WIDTH, max(1, round(height * VISION_MAX_WIDTH / width))),
+                Image.Resampling.LANCZOS
+            )
+            # JPEG has no alpha channel; flatten onto white so transparent areas don't turn black
+            if resized.mode in ("RGBA", "LA", "PA") or (resized.mode == "P" and "transparency" in resized.info):
+                rgba = resized.convert("RGBA")
+                resized = Image.new("RGB", rgba.size, (255, 255, 255))
+                resized.paste(rgba, mask=rgba.getchannel("A"))
+            buffer = io.BytesIO()
+            resized.convert("RGB").save(buffer, "JPEG", quality=85, optimize=True)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not downscale screenshot, sending original: {e}")
+        return image_data
+    logger.info(f"🖼️ Downscaled screenshot for vision: {len(image_data)} → {buffer.tell()} bytes")
+    return buffer.getvalue()
+
+def _encode_image_for_gemini(image_data: Union[bytes, bytearray]) -> str:
+    """Base64-encode image bytes once for a REST inlineData payload."""
+    # b64encode reads any bytes-like buffer directly, so bytearrays aren't copied first
+    return _base64_codec.b64encode(image_data).decode('ascii')
+
 async def extract_menu_with_gemini(html_content: str) -> List[Dict]:
     """Extracts menu items, descriptions, and prices from HTML content using Gemini."""
     logger.info("Attempting to extract menu with Gemini.")
@@ -171,22 +995,47 @@ async def extract_menu_with_gemini(html_content: str) -> List[Dict]:
         """Enhanced preprocessing to find menu-specific content"""
         logger.info("🔍 Enhanced menu content preprocessing starting")
         
-        # Remove script and style tags first
-        html = re.sub(r'<script[^>]*>.*?</script>', '', html, flags=re.DOTALL | re.IGNORECASE)
-        html = re.sub(r'<style[^>]*>.*?</style>', '', html, flags=re.DOTALL | re.IGNORECASE)
+        # Parse with lxml's C parser directly (bytes + explicit encoding also accepts
+        # pages carrying an XML encoding declaration) and drop non-content nodes
+        try:
+            tree = lxml.html.document_fromstring(html.encode('utf-8'), parser=_HTML_PARSER)
+        except etree.ParserError as e:
+            logger.warning(f"⚠️ Could not parse HTML for menu preprocessing: {e}")
+            return html[:50000]
+        
+        for element in _NON_CONTENT_XPATH(tree):
+            element.drop_tree()
         
-        # Look for menu-specific indicators with broader patterns
-        menu_indicators = [
-            r'<[^>]*(?:class|id)[^>]*["\'].*?(?:menu|food|dish|item|price|cuisine|appetizer|entree|dessert|drink|beverage).*?["\'][^>]*>.*?</[^>]+>',
-            r'<[^>]*(?:menu|food|dining|restaurant).*?>.*?</[^>]+>',
-            r'\$\d+(?:\.\d{2})?.*?(?:</[^>]+>|<br|<p)',  # Price patterns
-            r'(?:appetizer|entree|main|dessert|drink|wine|beer|cocktail|pasta|pizza|burger|salad|soup).*?\$\d+',
-        ]
+        # Visible text is computed once and shared by every branch below
+        text_content = '\n'.join(tree.itertext())
+        
+        # Look for menu-specific containers by class/id, skipping ones nested in a match.
+        # menu_content is an insertion-ordered dict used as a set: pages often repeat
+        # the menu across mobile/desktop DOMs, and duplicates only burn prompt tokens.
+        menu_content = {}
+        selected = set()
+        for element in _MENU_ELEMENT_XPATH(tree, pattern=_MENU_ATTR_PATTERN):
+            if any(ancestor in selected for ancestor in element.iterancestors()):
+                continue
+            selected.add(element)
+            block = '\n'.join(
+                _WHITESPACE_RE.sub(' ', text) for chunk in element.itertext() if (text := chunk.strip())
+            )
+            if block:
+                menu_content[block] = None
+            if len(menu_content) >= 20:  # Limit to avoid too much content
+                break
         
-        menu_content = []
-        for pattern in menu_indicators:
-            matches = re.findall(pattern, html, re.IGNORECASE | re.DOTALL)
-            menu_content.extend(matches[:10])  # Limit to avoid too much content
+        # Price patterns are matched on the visible text rather than raw markup
+        indicator_counts = {'dish': 0, 'price': 0}
+        for match in _PRICE_INDICATOR_RE.finditer(text_content):
+            kind = match.lastgroup
+            indicator = _WHITESPACE_RE.sub(' ', match.group()).strip()
+            if indicator_counts[kind] < 10 and indicator not in menu_content:  # Limit to avoid too much content
+                indicator_counts[kind] += 1
+                menu_content[indicator] = None
+            if min(indicator_counts.values()) >= 10:
+                break
         
         if menu_content:
             logger.info(f"✅ Found {len(menu_content)} menu-specific content blocks")
@@ -197,25 +1046,19 @@ async def extract_menu_with_gemini(html_content: str) -> List[Dict]:
         
         # Fallback: Look for content with dollar signs and common food words
         logger.info("🔄 Falling back to price-based content detection")
-        soup = BeautifulSoup(html, 'html.parser')
-            
-        # Remove unwanted elements
-        for element in soup(['script', 'style', 'nav', 'header', 'footer']):
-            element.decompose()
-        
-        text_content = soup.get_text()
         
         # Split into lines and find lines with prices and food terms
         lines = text_content.split('\n')
         menu_lines = []
         
         for line in lines:
-            line = line.strip()
-            if len(line) > 10 and '$' in line:
-                # Check if line contains food-related terms
-                food_terms = ['chicken', 'beef', 'pork', 'fish', 'salmon', 'pasta', 'pizza', 'salad', 'soup', 'burger', 'sandwich', 'rice', 'noodles', 'bread', 'cheese', 'sauce', 'grilled', 'fried', 'roasted', 'fresh', 'organic', 'wine', 'beer', 'cocktail', 'coffee', 'tea']
-                if any(term in line.lower() for term in food_terms):
-                    menu_lines.append(line)
+            line = _WHITESPACE_RE.sub(' ', line).strip()
+            # Check if line has a price and contains food-related terms
+            if len(line) > 10 and '$' in line and _FOOD_RE.search(line):
+                menu_lines.append(line)
+        
+        # Drop repeated lines while keeping page order
+        menu_lines = list(dict.fromkeys(menu_lines))
         
         if menu_lines:
             logger.info(f"✅ Found {len(menu_lines)} potential menu lines with prices")
@@ -223,11 +1066,7 @@ async def extract_menu_with_gemini(html_content: str) -> List[Dict]:
         
         # Final fallback: use main content but truncated
         logger.info("⚠️ No specific menu content found, using main content")
-        main_content = soup.get_text()
-        if len(main_content) > 50000:
-            main_content = main_content[:50000]
-        
-        return main_content
+        return text_content[:50000]
     
     # Preprocess the HTML to reduce size and focus on menu content
     processed_html = preprocess_html_for_menu(html_content)
@@ -269,33 +1108,33 @@ async def extract_menu_with_gemini(html_content: str) -> List[Dict]:
     }
     
     try:
-        # Use async HTTP client with proper session management
-        async with aiohttp.ClientSession() as session:
-            logger.info(f"🔗 Making Gemini API request for menu extraction")
-            
-            response_data = await make_gemini_request(session, GEMINI_MODEL_TEXT, payload)
-            
-            logger.info(f"📊 Gemini response status: success")
-            logger.debug(f"🔍 Response structure: {list(response_data.keys()) if isinstance(response_data, dict) else 'Not a dict'}")
+        session = await _get_session()
+        logger.info(f"🔗 Making Gemini API request for menu extraction")
+        
+        
+        response_data = await make_gemini_request(session, GEMINI_MODEL_TEXT, payload)
+        
+        logger.info(f"📊 Gemini response status: success")
+        logger.debug(f"🔍 Response structure: {list(response_data.keys()) if isinstance(response_data, dict) else 'Not a dict'}")
+        
+        # Extract text from Google Gemini API response format
+        if 'candidates' in response_data and len(response_data['candidates']) > 0:
+            logger.info(f"✅ Found {len(response_data['candidates'])} candidates in response")
+            candidate = response_data['candidates'][0]
             
-            # Extract text from Google Gemini API response format
-            if 'candidates' in response_data and len(response_data['candidates']) > 0:
-                logger.info(f"✅ Found {len(response_data['candidates'])} candidates in response")
-                candidate = response_data['candidates'][0]
+            if 'content' in candidate and 'parts' in candidate['content']:
+                raw_text = candidate['content']['parts'][0]['text']
+                logger.info(f"📄 Raw text from Gemini: {raw_text[:200]}...")
+                logger.info(f"📏 Raw text length: {len(raw_text)}")
                 
-                if 'content' in candidate and 'parts' in candidate['content']:
-                    raw_text = candidate['content']['parts'][0]['text']
-                    logger.info(f"📄 Raw text from Gemini: {raw_text[:200]}...")
-                    logger.info(f"📏 Raw text length: {len(raw_text)}")
-                    
-                    # Clean and validate JSON
-                    menu_data = clean_and_parse_json(raw_text)
-                    logger.info(f"✅ Successfully extracted {len(menu_data)} menu items with Gemini.")
-                    return menu_data
-                else:
-                    logger.error(f"❌ Missing 'content' or 'parts' in candidate: {candidate}")
+                # Clean and validate JSON
+                menu_data = clean_and_parse_json(raw_text)
+                logger.info(f"✅ Successfully extracted {len(menu_data)} menu items with Gemini.")
+                return menu_data
             else:
-                logger.error(f"❌ No candidates found in response: {response_data}")
+                logger.error(f"❌ Missing 'content' or 'parts' in candidate: {candidate}")
+        else:
+            logger.error(f"❌ No candidates found in response: {response_data}")
         
         logger.error("❌ Unexpected response format from Gemini API")
         return []
@@ -308,7 +1147,7 @@ async def analyze_with_gemini(data: Dict) -> str:
     """Analyze restaurant data using Gemini and return XML-formatted results."""
     
     # Convert GoogleReviewData to dict if it's a Pydantic object
-    google_reviews_data = data.get('reviews', {}).get('google', {})
+    google_reviews_data = (data.get('reviews') or {}).get('google') or {}
     if hasattr(google_reviews_data, 'model_dump'):
         google_reviews_dict = google_reviews_data.model_dump()
     elif hasattr(google_reviews_data, 'dict'):
@@ -318,6 +1157,16 @@ async def analyze_with_gemini(data: Dict) -> str:
     else:
         google_reviews_dict = {}
     
+    # Precompute prompt splices once instead of re-walking nested dicts inline
+    website_data = data.get('website_data') or {}
+    contact_email = (website_data.get('contact') or {}).get('email', 'Not provided')
+    menu_items = (website_data.get('menu') or {}).get('items', [])
+    sample_items_json = _to_json(menu_items[:3])
+    competitor_lines = "\n".join(
+        f"- {comp['name']}: {comp.get('rating', 'N/A')} stars ({comp.get('review_count', 0)} reviews)"
+        for comp in data.get('competitors', {}).get('competitors', [])[:5]
+    )
+    
     prompt = f"""
             You are a restaurant business consultant providing comprehensive analysis for decision makers.
             
@@ -325,20 +1174,19 @@ async def analyze_with_gemini(data: Dict) -> str:
             
             <analysis_data>
             Restaurant: {data['restaurant_name']}
-            Website: {data.get('website_data', {}).get('url', 'Not provided')}
-            Contact: {data.get('website_data', {}).get('contact', {}).get('email', 'Not provided')}
+            Website: {website_data.get('url', 'Not provided')}
+            Contact: {contact_email}
             
             Menu Analysis:
-            - Items found: {len(data.get('website_data', {}).get('menu', {}).get('items', []))}
-            - Sample items: {str(data.get('website_data', {}).get('menu', {}).get('items', [])[:3])}
+            - Items found: {len(menu_items)}
+            - Sample items: {sample_items_json}
             
             Customer Reviews:
             - Google Rating: {google_reviews_dict.get('rating', 'N/A')} ({google_reviews_dict.get('total_reviews', 0)} reviews)
             - Sentiment Score: {google_reviews_dict.get('avg_sentiment', 'N/A')}
             
             Competitive Landscape:
-            {chr(10).join([f"- {comp['name']}: {comp.get('rating', 'N/A')} stars ({comp.get('review_count', 0)} reviews)" 
-                          for comp in data.get('competitors', {}).get('competitors', [])[:5]])}
+            {competitor_lines}
             </analysis_data>
             
             Provide strategic recommendations in this XML format:
@@ -394,14 +1242,14 @@ async def analyze_with_gemini(data: Dict) -> str:
     }
     
     try:
-        async with aiohttp.ClientSession() as session:
-            response_data = await make_gemini_request(session, GEMINI_MODEL_TEXT, payload)
-            
-            # Extract text from Google Gemini API response format
-            if 'candidates' in response_data and len(response_data['candidates']) > 0:
-                candidate = response_data['candidates'][0]
-                if 'content' in candidate and 'parts' in candidate['content']:
-                    return candidate['content']['parts'][0]['text']
+        session = await _get_session()
+        response_data = await make_gemini_request(session, GEMINI_MODEL_TEXT, payload)
+        
+        # Extract text from Google Gemini API response format
+        if 'candidates' in response_data and len(response_data['candidates']) > 0:
+            candidate = response_data['candidates'][0]
+            if 'content' in candidate and 'parts' in candidate['content']:
+                return candidate['content']['parts'][0]['text']
     except Exception as e:
         logger.error(f"❌ Analysis failed: {str(e)}")
         raise Exception(f"Gemini analysis failed: {str(e)}")
@@ -420,19 +1268,20 @@ async def analyze_target_restaurant(restaurant_data: Dict) -> Dict:
     """
     logger.info(f"🎯 Analyzing target restaurant: {restaurant_data.get('restaurant_name', 'Unknown')}")
     
-    # Prepare comprehensive data summary
-    website_data = restaurant_data.get('website_data', {})
-    reviews_data = restaurant_data.get('reviews', {}).get('google', {})
-    business_info = restaurant_data.get('business_info', {})
+    # Prepare comprehensive data summary: destructure nested sections once
+    website_data = restaurant_data.get('website_data') or {}
+    contact = website_data.get('contact') or {}
+    business_info = restaurant_data.get('business_info') or {}
     
     # Extract key metrics
-    menu_items_count = len(website_data.get('menu', {}).get('items', []))
+    menu_items_count = len((website_data.get('menu') or {}).get('items', []))
     products_count = len(website_data.get('products', []))
     services_count = len(website_data.get('services', []))
     social_links_count = len(website_data.get('social_links', []))
+    navigation_elements = (business_info.get('navigation_analysis') or {}).get('totalNavigationElements', 0)
     
     # Get reviews data and convert GoogleReviewData to dict if it's a Pydantic object
-    reviews_data = restaurant_data.get('reviews', {}).get('google', {})
+    reviews_data = (restaurant_data.get('reviews') or {}).get('google') or {}
     if hasattr(reviews_data, 'model_dump'):
         reviews_data = reviews_data.model_dump()
     elif hasattr(reviews_data, 'dict'):
@@ -442,6 +1291,9 @@ async def analyze_target_restaurant(restaurant_data: Dict) -> Dict:
     
     google_rating = reviews_data.get('rating', 0)
     google_reviews_count = reviews_data.get('total_reviews', 0)
+    has_hours = bool((reviews_data.get('opening_hours') or {}).get('weekday_text'))
+    has_photos = (reviews_data.get('photos') or {}).get('count', 0) > 0
+    verified_listing = (reviews_data.get('place_details') or {}).get('business_status') == 'OPERATIONAL'
     
     prompt = f"""
     <instructions>
@@ -454,8 +1306,8 @@ async def analyze_target_restaurant(restaurant_data: Dict) -> Dict:
     <basic_info>
         <name>{restaurant_data.get('restaurant_name', 'Unknown')}</name>
         <website>{website_data.get('url', 'Not provided')}</website>
-        <email>{website_data.get('contact', {}).get('email', 'Not provided')}</email>
-        <phone>{website_data.get('contact', {}).get('phone', 'Not provided')}</phone>
+        <email>{contact.get('email', 'Not provided')}</email>
+        <phone>{contact.get('phone', 'Not provided')}</phone>
         <address>{website_data.get('address', 'Not provided')}</address>
     </basic_info>
     
@@ -472,20 +1324,20 @@ async def analyze_target_restaurant(restaurant_data: Dict) -> Dict:
         <rating>{google_rating}</rating>
         <total_reviews>{google_reviews_count}</total_reviews>
         <avg_sentiment>{reviews_data.get('avg_sentiment', 'N/A')}</avg_sentiment>
-        <has_hours>{bool(reviews_data.get('opening_hours', {}).get('weekday_text'))}</has_hours>
-        <has_photos>{reviews_data.get('photos', {}).get('count', 0) > 0}</has_photos>
-        <verified_listing>{reviews_data.get('place_details', {}).get('business_status') == 'OPERATIONAL'}</verified_listing>
+        <has_hours>{has_hours}</has_hours>
+        <has_photos>{has_photos}</has_photos>
+        <verified_listing>{verified_listing}</verified_listing>
     </google_presence>
     
     <enhanced_business_intelligence>
-        <revenue_streams>{business_info.get('revenue_streams', [])}</revenue_streams>
-        <competitive_advantages>{business_info.get('competitive_advantages', [])}</competitive_advantages>
+        <revenue_streams>{_to_json(business_info.get('revenue_streams', []))}</revenue_streams>
+        <competitive_advantages>{_to_json(business_info.get('competitive_advantages', []))}</competitive_advantages>
         <pages_analyzed>{business_info.get('pages_analyzed', 0)}</pages_analyzed>
-        <navigation_elements>{business_info.get('navigation_analysis', {}).get('totalNavigationElements', 0)}</navigation_elements>
+        <navigation_elements>{navigation_elements}</navigation_elements>
     </enhanced_business_intelligence>
     
     <data_quality_assessment>
-        <stagehand_quality>{restaurant_data.get('data_quality_metrics', {})}</stagehand_quality>
+        <stagehand_quality>{_to_json(restaurant_data.get('data_quality_metrics', {}))}</stagehand_quality>
         <screenshots_captured>{len(website_data.get('all_screenshots', []))}</screenshots_captured>
     </data_quality_assessment>
     </target_restaurant_data>
@@ -543,53 +1395,53 @@ async def analyze_target_restaurant(restaurant_data: Dict) -> Dict:
         
         logger.info(f"🔗 Making target analysis API request")
         
-        async with aiohttp.ClientSession() as session:
-            response_data = await make_gemini_request(session, GEMINI_MODEL_TEXT, payload, timeout=300)
-            
-            if response_data.get("error"):
-                logger.error(f"❌ Target analysis API error: {response_data['error']}")
-                return {
-                    "error": f"AI analysis failed: {response_data['error']}",
-                    "restaurant_name": restaurant_data.get('restaurant_name', 'Unknown')
-                }
-            
-            # Parse response
-            analysis_content = response_data.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "")
-            if not analysis_content:
-                logger.error("❌ Empty response from target analysis API")
-                return {
-                    "error": "Empty response from AI analysis",
-                    "restaurant_name": restaurant_data.get('restaurant_name', 'Unknown')
-                }
-            
-            # Log the raw response for debugging
-            logger.debug(f"📝 Raw analysis content length: {len(analysis_content)}")
-            logger.debug(f"📝 Raw analysis content (first 100 chars): {analysis_content[:100]}")
+        session = await _get_session()
+        response_data = await make_gemini_request(session, GEMINI_MODEL_TEXT, payload, timeout=300)
+        
+        if response_data.get("error"):
+            logger.error(f"❌ Target analysis API error: {response_data['error']}")
+            return {
+                "error": f"AI analysis failed: {response_data['error']}",
+                "restaurant_name": restaurant_data.get('restaurant_name', 'Unknown')
+            }
+        
+        # Parse response
+        analysis_content = response_data.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "")
+        if not analysis_content:
+            logger.error("❌ Empty response from target analysis API")
+            return {
+                "error": "Empty response from AI analysis",
+                "restaurant_name": restaurant_data.get('restaurant_name', 'Unknown')
+            }
+        
+        # Log the raw response for debugging
+        logger.debug(f"📝 Raw analysis content length: {len(analysis_content)}")
+        logger.debug(f"📝 Raw analysis content (first 100 chars): {analysis_content[:100]}")
+        
+        # Parse JSON from response
+        try:
+            analysis_result = clean_and_parse_json(analysis_content)
+            logger.info(f"✅ Target analysis complete: {len(analysis_result.get('strengths', []))} strengths, {len(analysis_result.get('weaknesses', []))} weaknesses, {len(analysis_result.get('opportunities', []))} opportunities")
+            return {
+                "target_restaurant_analysis": analysis_result,
+                "restaurant_name": restaurant_data.get('restaurant_name', 'Unknown')
+            }
+        except json.JSONDecodeError as e:
+            logger.error(f"❌ Failed to parse target analysis JSON: {str(e)}")
+            logger.error(f"Raw response: {analysis_content[:500]}...")
             
-            # Parse JSON from response
-            try:
-                analysis_result = clean_and_parse_json(analysis_content)
-                logger.info(f"✅ Target analysis complete: {len(analysis_result.get('strengths', []))} strengths, {len(analysis_result.get('weaknesses', []))} weaknesses, {len(analysis_result.get('opportunities', []))} opportunities")
-                return {
-                    "target_restaurant_analysis": analysis_result,
-                    "restaurant_name": restaurant_data.get('restaurant_name', 'Unknown')
-                }
-            except json.JSONDecodeError as e:
-                logger.error(f"❌ Failed to parse target analysis JSON: {str(e)}")
-                logger.error(f"Raw response: {analysis_content[:500]}...")
-                
-                # Attempt to gracefully handle by creating a fallback response
-                logger.warning("🔄 Creating fallback response structure for broken JSON")
-                return {
-                    "target_restaurant_analysis": {
-                        "strengths": [{"title": "Data Available", "description": "Restaurant data was collected but AI analysis needs debugging", "estimated_impact": "Analysis in progress"}],
-                        "weaknesses": [{"title": "Analysis Processing", "description": "JSON parsing error in AI response - technical issue", "estimated_impact": "Temporary"}],
-                        "opportunities": [{"title": "System Optimization", "description": "API response format needs improvement", "estimated_impact": "Resolving"}]
-                    },
-                    "restaurant_name": restaurant_data.get('restaurant_name', 'Unknown'),
-                    "parsing_error": str(e),
-                    "raw_response_preview": analysis_content[:200]
-                }
+            # Attempt to gracefully handle by creating a fallback response
+            logger.warning("🔄 Creating fallback response structure for broken JSON")
+            return {
+                "target_restaurant_analysis": {
+                    "strengths": [{"title": "Data Available", "description": "Restaurant data was collected but AI analysis needs debugging", "estimated_impact": "Analysis in progress"}],
+                    "weaknesses": [{"title": "Analysis Processing", "description": "JSON parsing error in AI response - technical issue", "estimated_impact": "Temporary"}],
+                    "opportunities": [{"title": "System Optimization", "description": "API response format needs improvement", "estimated_impact": "Resolving"}]
+                },
+                "restaurant_name": restaurant_data.get('restaurant_name', 'Unknown'),
+                "parsing_error": str(e),
+                "raw_response_preview": analysis_content[:200]
+            }
         
     except Exception as e:
         logger.error(f"❌ Target restaurant analysis failed: {str(e)}")
@@ -600,20 +1452,7 @@ async def analyze_target_restaurant(restaurant_data: Dict) -> Dict:
             "opportunities": []
         }
 
-async def analyze_competitor_snapshot(competitor_data: Dict) -> str:
-    """
-    Stage 2: Concise analysis of a single competitor.
-    
-    Args:
-        competitor_data: Data about a single competitor
-    
-    Returns:
-        Brief textual summary of the competitor's positioning
-    """
-    competitor_name = competitor_data.get('name', 'Unknown Competitor')
-    logger.info(f"📊 Creating competitor snapshot: {competitor_name}")
-    
-    prompt = f"""
+_COMPETITOR_SNAPSHOT_PROMPT_TMPL = """
     <instructions>
     Provide a concise 2-3 sentence competitive intelligence summary for this local restaurant competitor.
     Focus on their apparent online positioning, key strengths, and any notable digital strategy elements.
@@ -621,21 +1460,21 @@ async def analyze_competitor_snapshot(competitor_data: Dict) -> str:
     
     <competitor_data>
     <name>{competitor_name}</name>
-    <google_rating>{competitor_data.get('rating', 'N/A')}</google_rating>
-    <review_count>{competitor_data.get('review_count', 0)}</review_count>
-    <address>{competitor_data.get('address', 'Not provided')}</address>
-    <phone>{competitor_data.get('phone', 'Not provided')}</phone>
-    <website>{competitor_data.get('website', 'No website')}</website>
-    <price_level>{competitor_data.get('price_level', 'Unknown')}</price_level>
-    <categories>{competitor_data.get('categories', [])}</categories>
-    <distance>{competitor_data.get('location', {}).get('distance_km', 'Unknown')} km</distance>
+    <google_rating>{rating}</google_rating>
+    <review_count>{review_count}</review_count>
+    <address>{address}</address>
+    <phone>{phone}</phone>
+    <website>{website}</website>
+    <price_level>{price_level}</price_level>
+    <categories>{categories_json}</categories>
+    <distance>{distance_km} km</distance>
     
     <digital_strategy>
-    {competitor_data.get('digital_strategy', {})}
+    {digital_strategy_json}
     </digital_strategy>
     
     <social_presence>
-    {competitor_data.get('social_presence', [])}
+    {social_presence_json}
     </social_presence>
     </competitor_data>
     
@@ -649,91 +1488,239 @@ async def analyze_competitor_snapshot(competitor_data: Dict) -> str:
     </task>
     
     Return only the summary text, no JSON or extra formatting.
-    """
+"""
+
+def _build_competitor_snapshot_payload(competitor_data: Dict) -> dict:
+    """Build the Gemini request payload for a single competitor snapshot."""
+    competitor_name = competitor_data.get('name', 'Unknown Competitor')
     
-    try:
-        payload = {
-            "contents": [{"role": "user", "parts": [{"text": prompt}]}],
-            "generationConfig": {
-                "temperature": 0.2,
-                "maxOutputTokens": 300
-            }
+    prompt = _COMPETITOR_SNAPSHOT_PROMPT_TMPL.format_map({
+        "competitor_name": competitor_name,
+        "rating": competitor_data.get('rating', 'N/A'),
+        "review_count": competitor_data.get('review_count', 0),
+        "address": competitor_data.get('address', 'Not provided'),
+        "phone": competitor_data.get('phone', 'Not provided'),
+        "website": competitor_data.get('website', 'No website'),
+        "price_level": competitor_data.get('price_level', 'Unknown'),
+        "categories_json": _to_json(competitor_data.get('categories', [])),
+        "distance_km": competitor_data.get('location', {}).get('distance_km', 'Unknown'),
+        "digital_strategy_json": _to_json(competitor_data.get('digital_strategy', {})),
+        "social_presence_json": _to_json(competitor_data.get('social_presence', [])),
+    })
+    
+    return {
+        "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+        "generationConfig": {
+            "temperature": 0.2,
+            "maxOutputTokens": 300
         }
+    }
+
+async def analyze_competitor_snapshot(competitor_data: Dict) -> str:
+    """
+    Stage 2: Concise analysis of a single competitor.
+    
+    Args:
+        competitor_data: Data about a single competitor
+    
+    Returns:
+        Brief textual summary of the competitor's positioning
+    """
+    competitor_name = competitor_data.get('name', 'Unknown Competitor')
+    logger.info(f"📊 Creating competitor snapshot: {competitor_name}")
+    
+    try:
+        payload = _build_competitor_snapshot_payload(competitor_data)
         
-        async with aiohttp.ClientSession() as session:
-            response_data = await make_gemini_request(session, GEMINI_MODEL_TEXT, payload, timeout=300)
-            
-            if 'candidates' in response_data and len(response_data['candidates']) > 0:
-                candidate = response_data['candidates'][0]
-                if 'content' in candidate and 'parts' in candidate['content']:
-                    summary = candidate['content']['parts'][0]['text'].strip()
-                    logger.info(f"✅ Competitor snapshot created for {competitor_name}")
-                    return summary
-                    
+        session = await _get_session()
+        response_data = await make_gemini_request(session, GEMINI_MODEL_TEXT, payload, timeout=300)
+        
+        if 'candidates' in response_data and len(response_data['candidates']) > 0:
+            candidate = response_data['candidates'][0]
+            if 'content' in candidate and 'parts' in candidate['content']:
+                summary = candidate['content']['parts'][0]['text'].strip()
+                logger.info(f"✅ Competitor snapshot created for {competitor_name}")
+                return summary
+        
+        logger.error(f"❌ Invalid response structure for competitor snapshot: {competitor_name}")
+        return f"{competitor_name} - Analysis unavailable due to processing error."
+                
     except Exception as e:
         logger.error(f"❌ Competitor snapshot failed for {competitor_name}: {str(e)}")
         return f"{competitor_name} - Analysis unavailable due to processing error."
 
-async def generate_strategic_recommendations(
-    target_analysis: Dict,
-    competitor_summaries: List[str],
-    restaurant_name: str,
-    supporting_screenshots: List[Dict] = None
-) -> Dict:
+async def analyze_all_competitors(competitors: List[Dict], max_concurrency: int = 10) -> List[Union[str, BaseException]]:
     """
-    Stage 3: Main strategic recommendation engine - the "consultant" prompt.
+    Run analyze_competitor_snapshot for every competitor concurrently.
+    
+    With GEMINI_BATCH_COMPETITORS enabled, snapshots are first requested as one
+    discounted Gemini batch job. Whatever is still missing is requested in a single
+    multi-competitor call, and only competitors that call leaves out fall back to
+    concurrent per-competitor requests.
     
     Args:
-        target_analysis: Results from analyze_target_restaurant
-        competitor_summaries: List of competitor summary strings
-        restaurant_name: Name of the target restaurant
-        supporting_screenshots: List of relevant screenshot data with S3 URLs
+        competitors: List of competitor data dicts
+        max_concurrency: Maximum number of in-flight Gemini requests
     
     Returns:
-        Comprehensive strategic recommendations JSON
+        One entry per competitor, in input order: the summary string, or the
+        exception raised for that competitor
     """
-    logger.info(f"🧠 Generating strategic recommendations for {restaurant_name}")
+    results: List[Optional[Union[str, BaseException]]] = [None] * len(competitors)
+    if GEMINI_BATCH_COMPETITORS and len(competitors) > 1:
+        try:
+            await _analyze_competitors_in_batch(competitors, results)
+        except Exception as e:
+            logger.warning(f"⚠️ Batch competitor analysis failed, using real-time requests: {e}")
     
-    # Format competitor information
-    competitor_text = "\n".join([f"- {summary}" for summary in competitor_summaries[:5]])
+    if sum(result is None for result in results) > 1:
+        try:
+            await _analyze_competitors_in_one_call(competitors, results)
+        except Exception as e:
+            logger.warning(f"⚠️ Combined competitor analysis failed, using per-competitor requests: {e}")
     
-    # Format screenshot evidence
-    screenshot_evidence = ""
-    if supporting_screenshots:
-        screenshot_evidence = "\n<supporting_visual_evidence>\n"
-        for i, screenshot in enumerate(supporting_screenshots[:3]):  # Limit to 3 most relevant
-            screenshot_evidence += f'<screenshot_{i+1} url="{screenshot.get("s3_url", "")}" caption="{screenshot.get("caption", "")}" analysis_focus="{screenshot.get("analysis_focus", "")}"/>\n'
-        screenshot_evidence += "</supporting_visual_evidence>\n"
+    semaphore = asyncio.Semaphore(max_concurrency)
     
-    prompt = f"""
+    async def _analyze_one(competitor_data: Dict) -> str:
+        async with semaphore:
+            return await analyze_competitor_snapshot(competitor_data)
+    
+    # Anything the batch did not produce goes through the real-time endpoint
+    pending = [i for i, result in enumerate(results) if result is None]
+    realtime = await asyncio.gather(*(_analyze_one(competitors[i]) for i in pending), return_exceptions=True)
+    for i, result in zip(pending, realtime):
+        results[i] = result
+    # Keep one entry per competitor so callers can zip results with their input
+    return [
+        result if result is not None else RuntimeError("No competitor snapshot was produced")
+        for result in results
+    ]
+
+_COMPETITOR_SNAPSHOTS_COMBINED_PROMPT = """
+    <instructions>
+    For each local restaurant competitor below, provide a concise 2-3 sentence competitive intelligence summary.
+    Focus on their apparent online positioning, key strengths, and any notable digital strategy elements.
+    </instructions>
+    
+    <task>
+    Each summary should follow this example format:
+    "[Competitor Name] appears to have [key strength] with [rating] stars from [count] reviews. 
+    Their digital presence shows [notable strengths/weaknesses]. 
+    Located [distance] away, they seem positioned as [market positioning]."
+    
+    Focus on what makes them competitive or what gaps they have that represent opportunities.
+    Return a JSON array with one object per competitor, in input order, each with "competitor_index"
+    (copied from the input) and "summary" (plain summary text).
+    </task>
+    
+    <competitors>
+"""
+
+_COMPETITOR_SNAPSHOTS_COMBINED_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {"competitor_index": {"type": "INTEGER"}, "summary": {"type": "STRING"}},
+        "required": ["competitor_index", "summary"],
+        "propertyOrdering": ["competitor_index", "summary"],
+    },
+}
+
+async def _analyze_competitors_in_one_call(competitors: List[Dict], results: List[Optional[Union[str, BaseException]]]) -> None:
+    """Fill the missing entries of results with snapshots from a single multi-competitor request."""
+    pending = [i for i, result in enumerate(results) if result is None]
+    # Indexed rather than matched by name, since competitor names can repeat
+    competitors_json = _to_json([
+        {
+            "competitor_index": i,
+            "name": competitors[i].get('name', 'Unknown Competitor'),
+            "google_rating": competitors[i].get('rating'),
+            "review_count": competitors[i].get('review_count'),
+            "address": competitors[i].get('address'),
+            "website": competitors[i].get('website'),
+            "price_level": competitors[i].get('price_level'),
+            "categories": competitors[i].get('categories'),
+            "distance_km": competitors[i].get('location', {}).get('distance_km'),
+            "digital_strategy": competitors[i].get('digital_strategy'),
+            "social_presence": competitors[i].get('social_presence'),
+        }
+        for i in pending
+    ])
+    payload = {
+        "contents": [{"role": "user", "parts": [{"text": f"{_COMPETITOR_SNAPSHOTS_COMBINED_PROMPT}{competitors_json}\n    </competitors>"}]}],
+        "generationConfig": {
+            "temperature": 0.2,
+            "maxOutputTokens": min(300 * len(pending), 8192),
+            "response_mime_type": "application/json",
+            "response_schema": _COMPETITOR_SNAPSHOTS_COMBINED_SCHEMA
+        }
+    }
+    
+    session = await _get_session()
+    response_data = await make_gemini_request(session, GEMINI_MODEL_TEXT, payload, timeout=300)
+    candidates = response_data.get("candidates") or [{}]
+    parts = candidates[0].get("content", {}).get("parts") or [{}]
+    entries = _loads_model_json(parts[0].get("text", "") or "[]")
+    
+    pending_set = set(pending)
+    for entry in entries if isinstance(entries, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        index, summary = entry.get("competitor_index"), entry.get("summary")
+        if isinstance(index, int) and index in pending_set and isinstance(summary, str) and summary.strip():
+            results[index] = summary.strip()
+            pending_set.discard(index)
+    logger.info(f"✅ Combined call produced {len(pending) - len(pending_set)}/{len(pending)} competitor snapshots")
+
+async def _analyze_competitors_in_batch(competitors: List[Dict], results: List[Optional[Union[str, BaseException]]]) -> None:
+    """Fill results with snapshots from the response cache and one Gemini batch job."""
+    payloads = [_build_competitor_snapshot_payload(c) for c in competitors]
+    cache_keys = [_prompt_key(GEMINI_MODEL_TEXT, orjson.dumps(p)) for p in payloads] if GEMINI_CACHE_ENABLED else []
+    
+    def _summary_from(response_data: Optional[dict]) -> Optional[str]:
+        candidates = (response_data or {}).get("candidates") or [{}]
+        parts = candidates[0].get("content", {}).get("parts") or [{}]
+        return parts[0].get("text", "").strip() or None
+    
+    # Cached snapshots don't need to be part of the batch
+    uncached = []
+    for i in range(len(competitors)):
+        cached = await _read_cached_response(cache_keys[i]) if cache_keys else None
+        results[i] = _summary_from(cached) if _is_complete_response(cached) else None
+        if results[i] is None:
+            uncached.append(i)
+    if not uncached:
+        return
+    
+    session = await _get_session()
+    responses = await make_gemini_batch_request(session, GEMINI_MODEL_TEXT, [payloads[i] for i in uncached])
+    if responses is None:
+        return
+    for i, response_data in zip(uncached, responses):
+        results[i] = _summary_from(response_data)
+        # Shares make_gemini_request's cache entries, so the same STOP-only rule applies
+        if results[i] is not None and cache_keys and response_data is not None and _is_complete_response(response_data):
+            await _write_cached_response(cache_keys[i], response_data)
+    logger.info(f"✅ Batch produced {sum(r is not None for r in results)}/{len(competitors)} competitor snapshots")
+
+_STRATEGIC_RECOMMENDATIONS_PROMPT = """
     <instructions>
     You are a top-tier strategy consultant specializing in local restaurant digital transformation.
     Your analysis will be used to create a compelling business report that demonstrates clear ROI and competitive advantages.
     Focus on specific competitive gaps and provide actionable recommendations with realistic revenue estimates.
     </instructions>
     
-    <context>
-    <target_restaurant_analysis>
-    {json.dumps(target_analysis, indent=2)}
-    </target_restaurant_analysis>
-    
-    <competitive_intelligence>
-    {competitor_text}
-    </competitive_intelligence>
-    {screenshot_evidence}
-    </context>
-    
     <task>
-    Generate a sales-focused strategic analysis for {restaurant_name} with these components:
+    Generate a sales-focused strategic analysis for the target restaurant with these components:
     
     1. **Executive Hook:** Create a compelling 1-2 sentence hook that quantifies potential revenue increase (10-40% range) by addressing the most critical competitive gap. Be specific about timeframe (6-12 months) and cite competitor advantages.
     
-    2. **Competitive Landscape Summary:** Compare {restaurant_name} directly to its top 3 competitors in these areas:
+    2. **Competitive Landscape Summary:** Compare the target restaurant directly to its top 3 competitors in these areas:
        - Google review volume and ratings advantage/disadvantage
        - Online ordering and digital presence gaps
        - Social media engagement and follower disparities
        - Website quality and menu accessibility issues
-       Identify the 1-2 areas where {restaurant_name} is losing customers to competitors.
+       Identify the 1-2 areas where the target restaurant is losing customers to competitors.
     
     3. **Top 3 Prioritized Opportunities:** Rank by revenue impact potential. For each:
        - Opportunity title (specific and actionable)
@@ -754,13 +1741,22 @@ async def generate_strategic_recommendations(
     6. **Engagement Questions:** 3 questions about their current challenges with POS systems, online ordering, and marketing that lead to consultation booking.
     </task>
     
+    <self_review>
+    Before emitting the final JSON, review your draft for a small business owner audience and fix any issues:
+    1. Revenue claims in the executive hook are realistic (typically 10-40% for digital improvements)
+    2. Recommendations are specific and actionable
+    3. Competitor references make sense given the competitive intelligence provided
+    4. Wording is clear, impactful, and in a professional, consultative tone
+    Output only the final, reviewed JSON - not the draft or the review notes.
+    </self_review>
+    
     <output_format>
     Return ONLY a JSON object with this exact structure:
-    {{
+    {
         "executive_hook": "Specific revenue estimate with competitive reasoning and timeframe",
         "competitive_landscape_summary": "Direct comparison highlighting 1-2 key areas where target is losing to competitors",
         "prioritized_opportunities": [
-            {{
+            {
                 "opportunity_title": "Specific actionable title",
                 "problem_description": "Problem with specific competitor references and lost revenue estimates",
                 "recommendation": "Step-by-step implementation advice",
@@ -769,14 +1765,14 @@ async def generate_strategic_recommendations(
                 "implementation_timeline": "2-4 weeks | 1-2 months | 3-6 months",
                 "difficulty_level": "Easy | Medium | Advanced",
                 "supporting_screenshot_caption": "Caption for relevant screenshot if available"
-            }}
+            }
         ],
         "premium_insights_teasers": [
-            {{
+            {
                 "title": "Premium analysis title",
                 "teaser": "Compelling one-sentence hook that makes them want to upgrade",
                 "value_proposition": "What specific ROI they'll get from this analysis"
-            }}
+            }
         ],
         "immediate_action_items": [
             "Specific actionable tip they can do today",
@@ -788,35 +1784,114 @@ async def generate_strategic_recommendations(
             "Question about current marketing/review management",
             "Question about biggest restaurant growth obstacle"
         ]
-    }}
+    }
     </output_format>
+"""
+
+_STRATEGIC_RECOMMENDATIONS_CONTEXT_TMPL = """
+    <context>
+    <target_restaurant_name>{restaurant_name}</target_restaurant_name>
+    
+    <target_restaurant_analysis>
+    {target_analysis_json}
+    </target_restaurant_analysis>
+    
+    <competitive_intelligence>
+    {competitor_text}
+    </competitive_intelligence>
+    {screenshot_evidence}
+    </context>
+"""
+
+# Stage 3 only needs the SWOT-style findings from stage 1; debug fields such as
+# raw_response_preview would just be billed as input tokens
+_STRATEGIC_INPUT_KEYS = ("restaurant_name", "error", "strengths", "weaknesses", "opportunities")
+_STRATEGIC_MAX_LIST_ITEMS = 8
+_COMPETITOR_SUMMARY_MAX_CHARS = 500
+
+def _lean_target_analysis(target_analysis: Dict) -> Dict:
+    """Whitelist the target-analysis fields stage 3 uses and cap list lengths."""
+    if not isinstance(target_analysis, dict):
+        return target_analysis
+    lean = {}
+    for key in _STRATEGIC_INPUT_KEYS:
+        value = target_analysis.get(key)
+        if value is None:
+            continue
+        lean[key] = value[:_STRATEGIC_MAX_LIST_ITEMS] if isinstance(value, list) else value
+    # analyze_target_restaurant nests the findings one level down
+    nested = target_analysis.get("target_restaurant_analysis")
+    if isinstance(nested, dict):
+        lean["target_restaurant_analysis"] = _lean_target_analysis(nested)
+    return lean
+
+async def generate_strategic_recommendations(
+    target_analysis: Dict,
+    competitor_summaries: List[str],
+    restaurant_name: str,
+    supporting_screenshots: List[Dict] = None
+) -> Dict:
+    """
+    Stage 3: Main strategic recommendation engine - the "consultant" prompt.
+    
+    Args:
+        target_analysis: Results from analyze_target_restaurant
+        competitor_summaries: List of competitor summary strings
+        restaurant_name: Name of the target restaurant
+        supporting_screenshots: List of relevant screenshot data with S3 URLs
+    
+    Returns:
+        Comprehensive strategic recommendations JSON
     """
+    logger.info(f"🧠 Generating strategic recommendations for {restaurant_name}")
+    
+    # Format competitor information
+    competitor_text = "\n".join(
+        f"- {str(summary)[:_COMPETITOR_SUMMARY_MAX_CHARS]}" for summary in competitor_summaries[:5]
+    )
+    
+    # Format screenshot evidence
+    screenshot_evidence = ""
+    if supporting_screenshots:
+        screenshot_evidence = "\n<supporting_visual_evidence>\n"
+        for i, screenshot in enumerate(supporting_screenshots[:3]):  # Limit to 3 most relevant
+            screenshot_evidence += f'<screenshot_{i+1} url="{screenshot.get("s3_url", "")}" caption="{screenshot.get("caption", "")}" analysis_focus="{screenshot.get("analysis_focus", "")}"/>\n'
+        screenshot_evidence += "</supporting_visual_evidence>\n"
+    
+    # Static instructions come first so repeated calls share a cacheable prompt prefix;
+    # per-restaurant data is appended last
+    prompt = _STRATEGIC_RECOMMENDATIONS_PROMPT + _STRATEGIC_RECOMMENDATIONS_CONTEXT_TMPL.format_map({
+        "restaurant_name": restaurant_name,
+        "target_analysis_json": _to_json(_lean_target_analysis(target_analysis)),
+        "competitor_text": competitor_text,
+        "screenshot_evidence": screenshot_evidence,
+    })
     
     try:
         payload = {
             "contents": [{"role": "user", "parts": [{"text": prompt}]}],
             "generationConfig": {
                 "temperature": 0.2,
-                "maxOutputTokens": 3000
+                "maxOutputTokens": 3500
             }
         }
         
         logger.info(f"🔗 Making strategic recommendations API request")
         
-        async with aiohttp.ClientSession() as session:
-            response_data = await make_gemini_request(session, GEMINI_MODEL_TEXT, payload, timeout=300)
-            
-            if 'candidates' in response_data and len(response_data['candidates']) > 0:
-                candidate = response_data['candidates'][0]
-                if 'content' in candidate and 'parts' in candidate['content']:
-                    raw_text = candidate['content']['parts'][0]['text']
-                    
-                    # Clean and parse JSON
-                    recommendations = clean_and_parse_json(raw_text)
-                    logger.info(f"✅ Strategic recommendations generated: {len(recommendations.get('prioritized_opportunities', []))} opportunities identified")
-                    
-                    return recommendations
-            
+        session = await _get_session()
+        response_data = await make_gemini_request(session, GEMINI_MODEL_TEXT, payload, timeout=300)
+        
+        if 'candidates' in response_data and len(response_data['candidates']) > 0:
+            candidate = response_data['candidates'][0]
+            if 'content' in candidate and 'parts' in candidate['content']:
+                raw_text = candidate['content']['parts'][0]['text']
+                
+                # Clean and parse JSON
+                recommendations = clean_and_parse_json(raw_text)
+                logger.info(f"✅ Strategic recommendations generated: {len(recommendations.get('prioritized_opportunities', []))} opportunities identified")
+                
+                return recommendations
+        
     except Exception as e:
         logger.error(f"❌ Strategic recommendations failed: {str(e)}")
         return {
@@ -829,19 +1904,7 @@ async def generate_strategic_recommendations(
             "consultation_questions": []
         }
 
-async def quality_check_analysis(analysis_content: Dict) -> Dict:
-    """
-    Stage 4: Optional QA check to polish the analysis content.
-    
-    Args:
-        analysis_content: JSON content from strategic recommendations
-    
-    Returns:
-        Polished and validated JSON content
-    """
-    logger.info("🔍 Performing quality check on analysis content")
-    
-    prompt = f"""
+_QUALITY_CHECK_PROMPT = """
     <instructions>
     Review the provided restaurant analysis content for a small business owner audience.
     Check for clarity, professional tone, realistic claims, and coherence.
@@ -849,10 +1912,6 @@ async def quality_check_analysis(analysis_content: Dict) -> Dict:
     Make minor improvements for impact while maintaining the exact JSON structure.
     </instructions>
     
-    <content_to_review>
-    {json.dumps(analysis_content, indent=2)}
-    </content_to_review>
-    
     <task>
     1. Verify that revenue claims in the executive hook are realistic (typically 10-40% for digital improvements)
     2. Ensure recommendations are specific and actionable
@@ -862,7 +1921,30 @@ async def quality_check_analysis(analysis_content: Dict) -> Dict:
     
     Return the improved content in the EXACT same JSON structure.
     </task>
+"""
+
+_QUALITY_CHECK_CONTENT_TMPL = """
+    <content_to_review>
+    {analysis_json}
+    </content_to_review>
+"""
+
+async def quality_check_analysis(analysis_content: Dict) -> Dict:
+    """
+    Stage 4: Optional QA check to polish the analysis content.
+    
+    Args:
+        analysis_content: JSON content from strategic recommendations
+    
+    Returns:
+        Polished and validated JSON content
     """
+    logger.info("🔍 Performing quality check on analysis content")
+    
+    # Static review instructions first (cacheable prefix), content under review last
+    prompt = _QUALITY_CHECK_PROMPT + _QUALITY_CHECK_CONTENT_TMPL.format_map({
+        "analysis_json": _to_json(analysis_content),
+    })
     
     try:
         payload = {
@@ -873,56 +1955,41 @@ async def quality_check_analysis(analysis_content: Dict) -> Dict:
             }
         }
         
-        async with aiohttp.ClientSession() as session:
-            response_data = await make_gemini_request(session, GEMINI_MODEL_TEXT, payload, timeout=300)
-            
-            if 'candidates' in response_data and len(response_data['candidates']) > 0:
-                candidate = response_data['candidates'][0]
-                if 'content' in candidate and 'parts' in candidate['content']:
-                    raw_text = candidate['content']['parts'][0]['text']
-                    
-                    # Clean and parse JSON
-                    polished_content = clean_and_parse_json(raw_text)
-                    logger.info("✅ Quality check completed - content polished")
-                    
-                    return polished_content
-            
+        session = await _get_session()
+        response_data = await make_gemini_request(session, GEMINI_MODEL_TEXT, payload, timeout=300)
+        
+        if 'candidates' in response_data and len(response_data['candidates']) > 0:
+            candidate = response_data['candidates'][0]
+            if 'content' in candidate and 'parts' in candidate['content']:
+                raw_text = candidate['content']['parts'][0]['text']
+                
+                # Clean and parse JSON
+                polished_content = clean_and_parse_json(raw_text)
+                logger.info("✅ Quality check completed - content polished")
+                
+                return polished_content
+        
     except Exception as e:
         logger.error(f"❌ Quality check failed, using original content: {str(e)}")
         return analysis_content  # Return original if QA fails
 
-async def evaluate_screenshot_quality(image_s3_url: str, page_type: str, restaurant_name: str) -> Dict[str, Any]:
-    """
-    Evaluate screenshot quality and relevance before including in reports.
-    
-    Args:
-        image_s3_url: S3 URL of the screenshot
-        page_type: Type of page (homepage, menu, about, contact, etc.)
-        restaurant_name: Name of restaurant for context
-    
-    Returns:
-        Quality assessment with score and recommendations
-    """
-    logger.info(f"🔍 Evaluating screenshot quality: {page_type} for {restaurant_name}")
-    
-    quality_prompt = f"""
+_SCREENSHOT_QUALITY_PROMPT = """
     <instructions>
-    You are evaluating a screenshot from {restaurant_name}'s website for inclusion in a professional business analysis report.
+    You are evaluating a screenshot from a restaurant's website for inclusion in a professional business analysis report.
     Assess the technical quality, content relevance, and suitability for client presentation.
     </instructions>
     
     <evaluation_criteria>
-    Page Type: {page_type}
-    Restaurant: {restaurant_name}
+    The page type and restaurant are given in <screenshot_context> below.
     
     Rate the screenshot on these factors (1-5 scale each):
     1. Technical Quality: Is the image clear, properly loaded, no broken elements?
-    2. Content Relevance: Does it show relevant {page_type} content clearly?
+    2. Content Relevance: Does it show relevant content for its page type clearly?
     3. Professional Appearance: Would this look good in a client report?
     4. Information Value: Does it provide useful insights for analysis?
     5. Completeness: Is the important content fully visible (not cut off)?
     
-    Special considerations for {page_type}:
+    Special considerations by page type:
     - Homepage: Should show branding, navigation, key info clearly
     - Menu: Should show actual menu items with prices if possible
     - About: Should show restaurant story, team, or location info
@@ -941,7 +2008,7 @@ async def evaluate_screenshot_quality(image_s3_url: str, page_type: str, restaur
     
     <output_format>
     Return ONLY a JSON object:
-    {{
+    {
         "overall_score": 4.2,
         "technical_quality": 5,
         "content_relevance": 4,
@@ -953,40 +2020,100 @@ async def evaluate_screenshot_quality(image_s3_url: str, page_type: str, restaur
         "recommendation": "include|exclude|retry",
         "suggested_caption": "Caption for report if including",
         "rationale": "Brief explanation of scoring and recommendation"
-    }}
+    }
     </output_format>
+"""
+
+_SCREENSHOT_QUALITY_CONTEXT_TMPL = """
+    <screenshot_context>
+    Page Type: {page_type}
+    Restaurant: {restaurant_name}
+    </screenshot_context>
+"""
+
+# Screenshot verdicts are cached by URL/content rather than by full request body, so
+# the template version goes into those keys to invalidate them when the rubric changes
+_SCREENSHOT_QUALITY_PROMPT_VERSION = _template_version(_SCREENSHOT_QUALITY_PROMPT, _SCREENSHOT_QUALITY_CONTEXT_TMPL)
+
+async def evaluate_screenshot_quality(image_s3_url: str, page_type: str, restaurant_name: str) -> Optional[Dict[str, Any]]:
+    """
+    Evaluate screenshot quality and relevance before including in reports.
+    
+    Args:
+        image_s3_url: S3 URL of the screenshot
+        page_type: Type of page (homepage, menu, about, contact, etc.)
+        restaurant_name: Name of restaurant for context
+    
+    Returns:
+        Quality assessment with score and recommendations, or None if the check
+        itself could not be completed (download or Gemini failure)
     """
+    logger.info(f"🔍 Evaluating screenshot quality: {page_type} for {restaurant_name}")
+    
+    # Screenshots are immutable once uploaded, so a verdict keyed on the URL (plus the
+    # prompt inputs) can be reused without re-downloading the image
+    cache_key = None
+    if GEMINI_CACHE_ENABLED:
+        cache_key = _prompt_key(
+            f"screenshot_quality|{_SCREENSHOT_QUALITY_PROMPT_VERSION}",
+            f"{image_s3_url}|{page_type}|{restaurant_name}".encode()
+        )
+        cached_assessment = await _read_cached_response(cache_key)
+        if cached_assessment is not None:
+            logger.info(f"♻️ Reusing cached quality assessment for {image_s3_url}")
+            return cached_assessment
+    
+    # Static rubric first (cacheable prefix), per-screenshot context last
+    quality_prompt = _SCREENSHOT_QUALITY_PROMPT + _SCREENSHOT_QUALITY_CONTEXT_TMPL.format_map({
+        "page_type": page_type,
+        "restaurant_name": restaurant_name,
+    })
     
     try:
-        # First check if we can access the image
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.head(image_s3_url, timeout=aiohttp.ClientTimeout(total=60)) as response:
-                    if response.status == 200:
-                        logger.info(f"✅ Image accessible at {image_s3_url}")
-                    else:
-                        logger.warning(f"⚠️ Image not accessible (status {response.status}): {image_s3_url}")
-                        return None
-            except asyncio.TimeoutError:
-                logger.warning(f"⚠️ Image accessibility check timed out: {image_s3_url}")
-                return None
-            except Exception as e:
-                logger.warning(f"⚠️ Image accessibility check failed: {str(e)}")
-                return None
+        # Download image for analysis; the GET status doubles as the accessibility
+        # check, so no separate HEAD round trip is needed
+        session = await _get_session()
+        try:
+            async with session.get(image_s3_url, timeout=_TIMEOUTS[120]) as response:
+                if response.status != 200:
+                    logger.warning(f"⚠️ Image not accessible (status {response.status}): {image_s3_url}")
+                    return None
+                logger.info(f"✅ Image accessible at {image_s3_url}")
+                # Stream into one growable buffer and stop as soon as the size limit
+                # is crossed instead of reading an oversized image in full
+                image_data = bytearray()
+                async for chunk in response.content.iter_chunked(65536):
+                    image_data += chunk
+                    if not check_image_size_limits(image_data):
+                        return {"overall_score": 1, "recommendation": "exclude", "rationale": "Image too large for processing"}
             
-            # Download image for analysis
-            try:
-                async with session.get(image_s3_url, timeout=aiohttp.ClientTimeout(total=120)) as response:
-                    response.raise_for_status()
-                    image_data = await response.read()
-                    
-                    if not check_image_size_limits(image_data):
-                        return {"overall_score": 1, "recommendation": "exclude", "rationale": "Image too large for processing"}
-                    
-                    image_base64 = base64.b64encode(image_data).decode()
-            except Exception as e:
-                logger.error(f"❌ Failed to download image: {str(e)}")
-                return {"overall_score": 1, "recommendation": "exclude", "rationale": f"Image download failed: {str(e)}"}
+            # Second cache level: the same image can live at several URLs (re-uploads,
+            # shared screenshots), so also look the verdict up by content hash
+            content_cache_key = None
+            if GEMINI_CACHE_ENABLED:
+                content_cache_key = _prompt_key(
+                    f"screenshot_quality_content|{_SCREENSHOT_QUALITY_PROMPT_VERSION}|{page_type}|{restaurant_name}",
+                    image_data
+                )
+                cached_assessment = await _read_cached_response(content_cache_key)
+                if cached_assessment is not None:
+                    logger.info("♻️ Reusing cached quality assessment for identical image content")
+                    if cache_key:
+                        await _write_cached_response(cache_key, cached_assessment)
+                    return cached_assessment
+            
+            image_data = await asyncio.to_thread(_downscale_for_vision, image_data)
+            image_mime_type = _sniff_image_mime(image_data)
+            # Encoding a multi-MB screenshot is CPU-bound; keep it off the event loop so
+            # concurrent downloads and Gemini calls keep progressing
+            image_base64 = await asyncio.to_thread(_encode_image_for_gemini, image_data)
+            del image_data  # Only the encoded copy is needed from here on
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ Image download timed out: {image_s3_url}")
+            return None
+        except Exception as e:
+            logger.error(f"❌ Failed to download image: {str(e)}")
+            return None
         
         # Use Gemini Vision for quality assessment
         payload = {
@@ -997,7 +2124,7 @@ async def evaluate_screenshot_quality(image_s3_url: str, page_type: str, restaur
                         {"text": quality_prompt},
                         {
                             "inlineData": {
-                                "mimeType": "image/png",
+                                "mimeType": image_mime_type,
                                 "data": image_base64
                             }
                         }
@@ -1010,53 +2137,130 @@ async def evaluate_screenshot_quality(image_s3_url: str, page_type: str, restaur
             }
         }
         
-        async with aiohttp.ClientSession() as session:
-            response_data = await make_gemini_request(session, GEMINI_MODEL_VISION, payload, timeout=300)
-            
-            # Extract text from response
-            if 'candidates' in response_data and len(response_data['candidates']) > 0:
-                candidate = response_data['candidates'][0]
-                if 'content' in candidate and 'parts' in candidate['content']:
-                    raw_text = candidate['content']['parts'][0]['text']
-                    
-                    # Clean and parse JSON
-                    quality_assessment = clean_and_parse_json(raw_text)
-                    
-                    logger.info(f"✅ Screenshot quality assessment: {quality_assessment.get('overall_score', 0)}/5 "
-                              f"({quality_assessment.get('recommendation', 'unknown')})")
-                    
-                    return quality_assessment
+        response_data = await make_gemini_request(session, GEMINI_MODEL_VISION, payload, timeout=300)
+        
+        # Extract text from response
+        if 'candidates' in response_data and len(response_data['candidates']) > 0:
+            candidate = response_data['candidates'][0]
+            if 'content' in candidate and 'parts' in candidate['content']:
+                raw_text = candidate['content']['parts'][0]['text']
+                
+                # Clean and parse JSON
+                quality_assessment = clean_and_parse_json(raw_text)
+                
+                logger.info(f"✅ Screenshot quality assessment: {quality_assessment.get('overall_score', 0)}/5 "
+                          f"({quality_assessment.get('recommendation', 'unknown')})")
+                
+                if cache_key:
+                    await _write_cached_response(cache_key, quality_assessment)
+                if content_cache_key:
+                    await _write_cached_response(content_cache_key, quality_assessment)
+                return quality_assessment
         
         logger.error("❌ Invalid response structure from quality assessment")
-        return {"overall_score": 1, "recommendation": "exclude", "rationale": "Assessment failed"}
+        return None
         
     except Exception as e:
         logger.error(f"❌ Screenshot quality assessment failed: {str(e)}")
-        return {"overall_score": 1, "recommendation": "exclude", "rationale": f"Quality check failed: {str(e)}"}
+        return None
+
+async def _filter_supporting_screenshots(
+    supporting_screenshots: List[Dict],
+    restaurant_name: str,
+    timeout: Optional[float] = None
+) -> List[Dict]:
+    """
+    Quality-check supporting screenshots concurrently and drop the ones to exclude.
+    
+    Only an explicit "exclude" verdict drops a screenshot. Screenshots without a URL,
+    whose check fails, or whose check is still running after timeout seconds are
+    kept as-is, so a Vision outage never strips the report's evidence.
+    """
+    async def _assess(screenshot: Dict) -> Optional[Dict]:
+        data = screenshot['data']
+        image_url = data.get('s3_url') or data.get('url')
+        if not image_url:
+            return screenshot
+        try:
+            assessment = await evaluate_screenshot_quality(str(image_url), screenshot['page_type'], restaurant_name)
+        except Exception as e:
+            logger.warning(f"⚠️ Screenshot quality check failed for {screenshot['page_type']}: {e}")
+            return screenshot
+        if assessment is None:
+            logger.warning(f"⚠️ Keeping unassessed {screenshot['page_type']} screenshot: quality check failed")
+            return screenshot
+        if assessment.get('recommendation') == 'exclude':
+            logger.info(f"🗑️ Excluding {screenshot['page_type']} screenshot from supporting evidence")
+            return None
+        return {
+            **screenshot,
+            's3_url': str(image_url),
+            'caption': assessment.get('suggested_caption', ''),
+            'quality_assessment': assessment
+        }
+    
+    if not supporting_screenshots:
+        return []
+    if timeout is None:
+        timeout = SCREENSHOT_FILTER_TIMEOUT
+    tasks = [asyncio.create_task(_assess(s)) for s in supporting_screenshots]
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    for task in pending:
+        task.cancel()
+    if pending:
+        logger.warning(f"⏱️ {len(pending)} screenshot quality check(s) timed out after {timeout}s; keeping them unassessed")
+        await asyncio.gather(*pending, return_exceptions=True)
+    
+    kept = []
+    for screenshot, task in zip(supporting_screenshots, tasks):
+        result = task.result() if task in done else screenshot
+        if result is not None:
+            kept.append(result)
+    return kept
 
-async def orchestrate_comprehensive_analysis(report_dict: Dict) -> Dict:
+async def orchestrate_comprehensive_analysis(report_dict: Dict, run_quality_check: bool = False) -> Dict:
     """
     Orchestrate a comprehensive analysis pipeline for restaurant data.
     
     This function coordinates multiple analysis stages:
     1. Target restaurant analysis
     2. Competitor analysis summaries  
-    3. Strategic recommendations generation
-    4. Quality assurance check
+    3. Strategic recommendations generation (includes a self-review pass)
+    4. Optional separate quality assurance check
     
     Args:
         report_dict: Complete restaurant data from aggregator
+        run_quality_check: Also run the standalone QA polish call after stage 3.
+            Off by default since stage 3's prompt already self-reviews its output.
         
     Returns:
         Comprehensive analysis results with all insights
     """
     logger.info(f"🚀 Starting comprehensive analysis orchestration for {report_dict.get('restaurant_name', 'Unknown Restaurant')}")
     
+    stage1_task = None
+    screenshot_task = None
     try:
-        # Stage 1: Analyze target restaurant in detail
-        logger.info("📊 Stage 1: Analyzing target restaurant")
-        target_analysis = await analyze_target_restaurant(report_dict)
-        logger.info("✅ Target restaurant analysis completed")
+        restaurant_name = report_dict.get('restaurant_name', 'Target Restaurant')
+        
+        # Extract screenshots for context if available
+        supporting_screenshots = []
+        screenshots = report_dict.get('screenshots', {})
+        if screenshots:
+            for page_type, screenshot_data in screenshots.items():
+                if screenshot_data and isinstance(screenshot_data, dict):
+                    supporting_screenshots.append({
+                        'page_type': page_type,
+                        'data': screenshot_data
+                    })
+        
+        # Stage 1 and the screenshot quality checks are independent I/O, so start both
+        # up front and let them overlap with competitor analysis
+        logger.info("📊 Stage 1: Analyzing target restaurant (screenshot quality checks in parallel)")
+        stage1_task = asyncio.create_task(analyze_target_restaurant(report_dict))
+        screenshot_task = asyncio.create_task(
+            _filter_supporting_screenshots(supporting_screenshots, restaurant_name)
+        )
         
         # Stage 2: Generate competitor analysis summaries
         logger.info("🔍 Stage 2: Processing competitor data")
@@ -1065,41 +2269,33 @@ async def orchestrate_comprehensive_analysis(report_dict: Dict) -> Dict:
         # Fix: Access competitors from the correct path in report_dict
         competitors_section = report_dict.get('competitors', {})
         competitors_list = competitors_section.get('competitors', [])
+        # Fan out all competitor analyses concurrently (competitors is a list, not a dict),
+        # bounded to stay within Gemini rate limits
+        valid_competitors = [c for c in competitors_list if c and isinstance(c, dict)]
         
-        if competitors_list:
-            logger.info(f"Found {len(competitors_list)} competitors to analyze")
-            # Process each competitor (competitors is a list, not a dict)
-            for i, competitor_data in enumerate(competitors_list):
-                if competitor_data and isinstance(competitor_data, dict):
-                    competitor_name = competitor_data.get('name', f'Competitor {i+1}')
-                    logger.info(f"  Analyzing competitor: {competitor_name}")
-                    try:
-                        competitor_summary = await analyze_competitor_snapshot(competitor_data)
-                        competitor_summaries.append(competitor_summary)
-                        logger.info(f"  ✅ Completed analysis for {competitor_name}")
-                    except Exception as comp_error:
-                        logger.error(f"  ❌ Failed to analyze {competitor_name}: {str(comp_error)}")
-                        # Continue with other competitors
-                        continue
+        if valid_competitors:
+            logger.info(f"Found {len(valid_competitors)} competitors to analyze")
         else:
             logger.info("No competitors found in report data")
         
+        results = await analyze_all_competitors(valid_competitors, max_concurrency=5)
+        for i, (competitor_data, result) in enumerate(zip(valid_competitors, results)):
+            competitor_name = competitor_data.get('name', f'Competitor {i+1}')
+            if isinstance(result, BaseException):
+                logger.error(f"  ❌ Failed to analyze {competitor_name}: {str(result)}")
+                # Continue with other competitors
+                continue
+            competitor_summaries.append(result)
+            logger.info(f"  ✅ Completed analysis for {competitor_name}")
+        
+        target_analysis = await stage1_task
+        logger.info("✅ Target restaurant analysis completed")
+        supporting_screenshots = await screenshot_task
+        
         logger.info(f"✅ Processed {len(competitor_summaries)} competitor analyses")
         
         # Stage 3: Generate strategic recommendations
         logger.info("🎯 Stage 3: Generating strategic recommendations")
-        restaurant_name = report_dict.get('restaurant_name', 'Target Restaurant')
-        
-        # Extract screenshots for context if available
-        supporting_screenshots = []
-        screenshots = report_dict.get('screenshots', {})
-        if screenshots:
-            for page_type, screenshot_data in screenshots.items():
-                if screenshot_data and isinstance(screenshot_data, dict):
-                    supporting_screenshots.append({
-                        'page_type': page_type,
-                        'data': screenshot_data
-                    })
         
         strategic_recommendations = await generate_strategic_recommendations(
             target_analysis=target_analysis,
@@ -1109,10 +2305,22 @@ async def orchestrate_comprehensive_analysis(report_dict: Dict) -> Dict:
         )
         logger.info("✅ Strategic recommendations generated")
         
-        # Stage 4: Quality assurance check
-        logger.info("🔍 Stage 4: Performing quality assurance")
-        polished_recommendations = await quality_check_analysis(strategic_recommendations)
-        logger.info("✅ Quality assurance completed")
+        # Stage 4: Quality assurance check (folded into stage 3's self-review unless requested)
+        polished_recommendations = strategic_recommendations
+        stages_completed = 3
+        # Polishing an error/empty shape only burns a Gemini call, so skip QA there
+        has_recommendations = bool(
+            strategic_recommendations
+            and not strategic_recommendations.get("error")
+            and strategic_recommendations.get("prioritized_opportunities")
+        )
+        if run_quality_check and not has_recommendations:
+            logger.info("⏭️ Skipping quality assurance: strategic recommendations failed or are empty")
+        elif run_quality_check:
+            logger.info("🔍 Stage 4: Performing quality assurance")
+            polished_recommendations = await quality_check_analysis(strategic_recommendations)
+            stages_completed = 4
+            logger.info("✅ Quality assurance completed")
         
         # Compile comprehensive results
         comprehensive_analysis = {
@@ -1124,7 +2332,7 @@ async def orchestrate_comprehensive_analysis(report_dict: Dict) -> Dict:
             'strategic_recommendations': polished_recommendations,
             'metadata': {
                 'total_competitors_analyzed': len(competitor_summaries),
-                'analysis_stages_completed': 4,
+                'analysis_stages_completed': stages_completed,
                 'supporting_screenshots_count': len(supporting_screenshots)
             }
         }
@@ -1135,6 +2343,10 @@ async def orchestrate_comprehensive_analysis(report_dict: Dict) -> Dict:
         return comprehensive_analysis
         
     except Exception as e:
+        # Don't leave the overlapped stage 1 / screenshot work running after a failure
+        for task in (stage1_task, screenshot_task):
+            if task is not None and not task.done():
+                task.cancel()
         logger.error(f"❌ Comprehensive analysis orchestration failed: {str(e)}")
         
         # Return error response with partial data if available
@@ -1154,496 +2366,78 @@ async def orchestrate_comprehensive_analysis(report_dict: Dict) -> Dict:
             
         return error_response
 
-class LLMAnalyzer:
-    """
-    Handles the generation of strategic report content and screenshot analysis using LLM prompts.
-    """
-    def __init__(self):
-        self.enabled = self._initialize_gemini()
-        if self.enabled:
-            # Using Gemini 1.5 Flash for potentially faster/cheaper structured output generation and vision tasks.
-            self.vision_model = genai.GenerativeModel('gemini-1.5-flash-latest')
-            self.text_model = genai.GenerativeModel('gemini-1.5-flash-latest') # Can be same or different
-            logger.info("🤖 LLMAnalyzer initialized with Gemini models (flash for text and vision).")
-        else:
-            logger.warning("⚠️ LLMAnalyzer initialized but Gemini is not available. Strategic analysis and screenshot analysis will be skipped.")
-
-    def _initialize_gemini(self) -> bool:
-        try:
-            api_key = os.getenv('GEMINI_API_KEY')
-            if not api_key:
-                logger.warning("GEMINI_API_KEY not found. LLMAnalyzer will be disabled.")
-                return False
-            genai.configure(api_key=api_key)
-            return True
-        except Exception as e:
-            logger.error(f"❌ Failed to initialize Gemini for LLMAnalyzer: {str(e)}")
-            return False
-
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10), retry=retry_if_exception_type(Exception))
-    async def _call_gemini_text_json_mode(self, prompt: str, max_tokens: int = 2048) -> Optional[Dict[str, Any]]:
-        """Helper to call Gemini text model and expect a JSON string which is then parsed."""
-        if not self.enabled:
-            logger.warning("Gemini disabled, skipping LLM text call.")
-            return None
-        try:
-            logger.debug(f"Submitting TEXT prompt to Gemini (JSON mode, max_tokens={max_tokens}):\n{prompt[:300]}...")
-            
-            response = await self.text_model.generate_content_async(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    # response_mime_type="application/json", # Use if model/SDK version fully supports clean JSON output
-                    max_output_tokens=max_tokens,
-                    temperature=0.1 # Low temp for factual/structured output
-                ),
-                safety_settings={ # Added basic safety settings
-                    HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-                    HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-                    HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-                    HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-                }
-            )
-            
-            response_text = response.text.strip()
-            logger.debug(f"Gemini TEXT response: {response_text[:300]}...")
-            
-            match = re.search(r"```json\n(.*?)\n```", response_text, re.DOTALL)
-            if match:
-                json_str = match.group(1)
-            else:
-                # If no markdown block, try to find JSON directly.
-                # Look for the first '{' and last '}' or first '[' and last ']'
-                first_brace = response_text.find('{')
-                first_bracket = response_text.find('[')
-
-                if first_brace == -1 and first_bracket == -1: # No JSON object or array start found
-                    logger.error(f"No JSON object/array found in Gemini response: {response_text}")
-                    raise json.JSONDecodeError("No JSON object/array found", response_text, 0)
-
-                if first_brace != -1 and (first_bracket == -1 or first_brace < first_bracket):
-                    # JSON object seems to be first
-                    last_brace = response_text.rfind('}')
-                    if last_brace != -1:
-                        json_str = response_text[first_brace : last_brace+1]
-                    else: # No closing brace for object
-                        raise json.JSONDecodeError("Mismatched braces for JSON object", response_text, 0)
-                elif first_bracket != -1:
-                     # JSON array seems to be first or only
-                    last_bracket = response_text.rfind(']')
-                    if last_bracket != -1:
-                        json_str = response_text[first_bracket : last_bracket+1]
-                    else: # No closing bracket for array
-                        raise json.JSONDecodeError("Mismatched brackets for JSON array", response_text, 0)
-                else: # Should not happen due to earlier check
-                     raise json.JSONDecodeError("Could not determine JSON start in vision response", response_text, 0)
-            
-            parsed_json = json.loads(json_str)
-            logger.info(f"Successfully parsed JSON from Gemini TEXT response.")
-            return parsed_json
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to decode JSON from Gemini TEXT response: {e}. Response text: {response_text}")
-            raise 
-        except Exception as e:
-            logger.error(f"Error calling Gemini TEXT model or processing response: {e}")
-            raise
+# Transient google-generativeai SDK failures worth retrying. JSON decode errors, safety
+# blocks and programming errors fail on the first attempt instead of costing two more calls.
+_SDK_TRANSIENT_ERRORS = (
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.TooManyRequests,
+    google_exceptions.InternalServerError,
+    aiohttp.ClientError,
+    asyncio.TimeoutError,
+)
 
-    async def _fetch_image_data(self, image_url: HttpUrl) -> Optional[bytes]:
-        """
-        Fetch image data from URL or local file path.
-        Enhanced to handle both real S3 URLs and local file paths.
-        """
-        url_str = str(image_url)
-        logger.info(f"📸 Fetching image data from: {url_str}")
+# LLMAnalyzer prompt bodies, built once at import. Both follow the shared restaurant data
+# prefix from _restaurant_data_prompt_prefix; the main recommendations template is filled
+# with str.format_map, so its JSON example keeps doubled braces.
+_DEEP_DIVE_PROMPT = """
+        Analyze the comprehensive restaurant data above and generate a strategic deep dive analysis.
         
-        # Check if it's a local file path
-        if url_str.startswith("file://"):
-            # Extract the local path from file:// URL and URL decode it
-            local_path = url_str.replace("file://", "")
-            # URL decode the path to handle %20 and other encoded characters
-            local_path = unquote(local_path)
-            logger.info(f"📂 Decoded local path: {local_path}")
-            
-            try:
-                path_obj = Path(local_path)
-                if path_obj.exists() and path_obj.is_file():
-                    logger.info(f"📁 Reading local screenshot: {local_path}")
-                    with open(path_obj, 'rb') as f:
-                        return f.read()
-                else:
-                    logger.warning(f"⚠️ Local screenshot not found: {local_path}")
-                    return None
-            except Exception as e:
-                logger.error(f"❌ Error reading local screenshot {local_path}: {e}")
-                return None
+        Generate a detailed strategic analysis incorporating ALL available data, focusing on:
         
-        # Check for mock/invalid URLs and skip them
-        if any(mock_indicator in url_str.lower() for mock_indicator in 
-               ["mock-restaurant-bucket", "example.com", "placeholder", "test-bucket", "fake-"]):
-            logger.warning(f"⚠️ Skipping mock/invalid URL: {url_str}")
-            return None
-            
-        # Handle real S3 or HTTP URLs
-        if url_str.startswith(("http://", "https://")):
-            try:
-                async with httpx.AsyncClient(timeout=30.0) as client:
-                    logger.info(f"🌐 Fetching remote image: {url_str}")
-                    response = await client.get(url_str)
-                    response.raise_for_status()
-                    
-                    # Check content type
-                    content_type = response.headers.get('content-type', '').lower()
-                    if not content_type.startswith('image/'):
-                        logger.warning(f"⚠️ URL returned non-image content: {content_type}")
-                        return None
-                    
-                    image_data = response.content
-                    logger.info(f"✅ Successfully fetched {len(image_data)} bytes from {url_str}")
-                    return image_data
-                    
-            except httpx.HTTPStatusError as e:
-                logger.error(f"❌ HTTP error fetching image {url_str}: {e.response.status_code} - {e.response.text}")
-                return None
-            except httpx.RequestError as e:
-                logger.error(f"❌ Request error fetching image {url_str}: {e}")
-                return None
-            except Exception as e:
-                logger.error(f"❌ Unexpected error fetching image {url_str}: {e}")
-                return None
+        1. **Digital Presence Assessment**: Website, social media, delivery platforms
+        2. **Competitive Market Position**: Based on delivery platform rankings and competitor analysis  
+        3. **Operational Strengths**: Menu variety, pricing strategy, customer engagement
+        4. **Growth Opportunities**: Gaps in delivery platforms, social media potential, technical improvements
+        5. **Strategic Recommendations**: Data-driven insights for expansion and optimization
         
-        logger.error(f"❌ Unsupported URL format: {url_str}")
-        return None
-
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10), retry=retry_if_exception_type(Exception))
-    async def analyze_screenshot_with_gemini(
-        self, 
-        image_s3_url: HttpUrl, 
-        analysis_focus: str, # e.g., "menu_impression", "social_profile_check"
-        additional_context: Optional[str] = None # Optional text context for the image
-    ) -> Optional[Dict[str, Any]]:
-        """
-        Analyzes a screenshot using Gemini Vision based on the S3 URL and analysis focus.
-        Returns a JSON summary.
-        """
-        if not self.enabled:
-            logger.warning("Gemini disabled, skipping screenshot analysis.")
-            return None
-
-        logger.info(f"📸 Starting screenshot analysis for: {image_s3_url} (Focus: {analysis_focus})")
-
-        image_bytes = await self._fetch_image_data(image_s3_url)
-        if not image_bytes:
-            return None # Error already logged by _fetch_image_data
-
-        image_part = {
-            "mime_type": "image/png", # Assuming PNG, could try to infer or require it
-            "data": base64.b64encode(image_bytes).decode()
+        Pay special attention to:
+        - Delivery platform performance (DoorDash, Uber Eats, Grubhub rankings and product listings)
+        - Social media engagement metrics and follower analysis
+        - Competitive positioning on delivery platforms
+        - Technical website health and optimization opportunities
+        - Cross-platform consistency and brand presence
+        
+        Return a comprehensive JSON analysis:
+        {
+            "digital_presence_score": {
+                "overall_score": "1-10 rating",
+                "website_quality": "assessment of technical health and user experience",
+                "social_media_strength": "analysis of social media presence and engagement",
+                "delivery_platform_presence": "assessment of delivery platform coverage and performance"
+            },
+            "competitive_positioning": {
+                "market_position": "strong/moderate/weak with justification",
+                "delivery_platform_rankings": "summary of rankings across platforms",
+                "unique_differentiators": ["diff1", "diff2", "diff3"],
+                "competitive_gaps": ["gap1", "gap2", "gap3"]
+            },
+            "key_strengths": ["strength1", "strength2", "strength3"],
+            "critical_weaknesses": ["weakness1", "weakness2", "weakness3"],
+            "growth_opportunities": {
+                "high_impact": ["opportunity1", "opportunity2"],
+                "quick_wins": ["quick1", "quick2"],
+                "long_term": ["longterm1", "longterm2"]
+            },
+            "strategic_priorities": {
+                "immediate_actions": ["action1", "action2"],
+                "6_month_goals": ["goal1", "goal2"],
+                "12_month_vision": "long-term strategic direction"
+            },
+            "data_insights": {
+                "delivery_platform_summary": "key insights from platform analysis",
+                "social_media_summary": "key insights from social analysis", 
+                "technical_summary": "key insights from technical health analysis",
+                "competitive_summary": "key insights from competitor analysis"
+            },
+            "overall_assessment": "comprehensive strategic summary incorporating all data sources"
         }
+        """
 
-        # Define prompts based on analysis_focus
-        prompt_text = ""
-        if analysis_focus == "menu_impression":
-            prompt_text = f"""
-            Analyze the provided restaurant menu screenshot.
-            Focus on:
-            1.  Overall visual impression and aesthetics (e.g., cluttered, clean, modern, dated).
-            2.  Readability of text (font choices, size, contrast).
-            3.  Any obvious design flaws or strengths.
-            4.  Presence of key information like prices, item names, descriptions.
-            {f"Additional context: {additional_context}" if additional_context else ""}
-            Return a JSON object with keys: "visual_impression", "readability_assessment", "design_notes", "information_clarity", "overall_summary".
-            """
-        elif analysis_focus == "social_profile_check":
-            prompt_text = f"""
-            This screenshot is from a Google Search result, likely showing a social media profile (e.g., Instagram, Facebook, Yelp).
-            Analyze the screenshot to:
-            1.  Identify the social media platform if visible.
-            2.  Extract the username/profile name.
-            3.  Extract follower count if visible.
-            4.  Extract a snippet of the bio or description if visible.
-            5.  Note if the profile seems official or verified.
-            {f"Additional context: {additional_context}" if additional_context else ""}
-            Return a JSON object with keys: "platform_identified", "profile_name", "follower_count", "bio_snippet", "verification_status", "confidence_score" (0-1 on how confident you are about the extracted info).
-            """
-        else:
-            logger.warning(f"Unknown analysis_focus for screenshot: {analysis_focus}. Using generic prompt.")
-            prompt_text = f"""
-            Analyze the provided image. 
-            {f"Additional context: {additional_context}" if additional_context else ""}
-            Describe its content and any notable features. Return a JSON object with a "summary" key.
-            """
-        
-        try:
-            logger.debug(f"Submitting VISION prompt to Gemini (Focus: {analysis_focus}):\n{prompt_text[:300]}...")
-            response = await self.vision_model.generate_content_async(
-                [prompt_text, image_part], # Multimodal content: text prompt + image
-                generation_config=genai.types.GenerationConfig(
-                    # response_mime_type="application/json", # Not always reliable for vision with all SDK versions/models
-                    max_output_tokens=1024,
-                    temperature=0.2 # Slightly higher temp for descriptive tasks if needed, but keep low for JSON
-                ),
-                 safety_settings={
-                    HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-                    HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-                    HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-                    HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-                }
-            )
-            response_text = response.text.strip()
-            logger.debug(f"Gemini VISION response: {response_text[:300]}...")
-
-            # JSON parsing logic similar to _call_gemini_text_json_mode
-            match = re.search(r"```json\n(.*?)\n```", response_text, re.DOTALL)
-            if match:
-                json_str = match.group(1)
-            else:
-                first_brace = response_text.find('{')
-                first_bracket = response_text.find('[')
-                if first_brace == -1 and first_bracket == -1:
-                    logger.error(f"No JSON object/array found in Gemini VISION response: {response_text}")
-                    return {"error": "No JSON found in vision response", "raw_output": response_text}
-                if first_brace != -1 and (first_bracket == -1 or first_brace < first_bracket):
-                    last_brace = response_text.rfind('}')
-                    if last_brace != -1: json_str = response_text[first_brace : last_brace+1]
-                    else: raise json.JSONDecodeError("Mismatched braces for JSON object in vision response", response_text, 0)
-                elif first_bracket != -1:
-                    last_bracket = response_text.rfind(']')
-                    if last_bracket != -1: json_str = response_text[first_bracket : last_bracket+1]
-                    else: raise json.JSONDecodeError("Mismatched brackets for JSON array in vision response", response_text, 0)
-                else: raise json.JSONDecodeError("Could not determine JSON start in vision response", response_text, 0)
-
-            parsed_json = json.loads(json_str)
-            logger.info(f"✅ Successfully parsed JSON from Gemini VISION response for focus '{analysis_focus}'.")
-            return parsed_json
-
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to decode JSON from Gemini VISION response (Focus: {analysis_focus}): {e}. Response text: {response_text}")
-            return {"error": f"JSON decode error: {e}", "raw_output": response_text}
-        except Exception as e:
-            # Catching specific Google API errors if possible, e.g., response.prompt_feedback
-            if hasattr(response, 'prompt_feedback') and response.prompt_feedback.block_reason:
-                 logger.error(f"Gemini VISION call blocked. Reason: {response.prompt_feedback.block_reason_message or response.prompt_feedback.block_reason}")
-                 return {"error": "Content blocked by API", "block_reason": str(response.prompt_feedback.block_reason)}
-
-            logger.error(f"Error calling Gemini VISION model (Focus: {analysis_focus}): {e}")
-            # Attempt to log parts of the exception that might be Google API specific errors
-            if hasattr(e, 'message'): logger.error(f"  Error details: {e.message}")
-
-            raise # Re-raise for tenacity to catch if it's a transient error
-
-    async def _generate_target_restaurant_deep_dive(self, restaurant_data: FinalRestaurantOutput) -> Optional[Dict[str, Any]]:
-        """Generate deep dive analysis for the target restaurant"""
-        logger.info(f"🧠 Generating Target Restaurant Deep Dive for: {restaurant_data.restaurant_name}")
-        
-        # Extract delivery platform analysis
-        delivery_platform_data = {}
-        if hasattr(restaurant_data, 'misc_structured_data') and restaurant_data.misc_structured_data:
-            delivery_platform_data = restaurant_data.misc_structured_data.get('delivery_platform_analysis', {})
-            
-        # Extract social media analysis
-        social_media_data = {}
-        if hasattr(restaurant_data, 'misc_structured_data') and restaurant_data.misc_structured_data:
-            social_media_data = restaurant_data.misc_structured_data.get('social_media_analysis', {})
-            
-        # Extract Stagehand comprehensive analysis
-        stagehand_data = {}
-        if hasattr(restaurant_data, 'misc_structured_data') and restaurant_data.misc_structured_data:
-            stagehand_data = restaurant_data.misc_structured_data.get('stagehand_comprehensive', {})
-            
-        # Extract technical health data
-        technical_health = {}
-        if hasattr(restaurant_data, 'misc_structured_data') and restaurant_data.misc_structured_data:
-            technical_health = restaurant_data.misc_structured_data.get('technical_health', {})
-        
-        restaurant_context = {
-            "basic_info": {
-                "name": restaurant_data.restaurant_name,
-                "description": restaurant_data.description_short or restaurant_data.description_long_ai_generated,
-                "cuisine_type": restaurant_data.primary_cuisine_type_ai,
-                "price_range": restaurant_data.price_range_ai,
-                "website_url": str(restaurant_data.website_url),
-                "menu_items_count": len(restaurant_data.menu_items) if restaurant_data.menu_items else 0,
-                "actual_menu_items": [{"name": item.name, "price": item.price, "description": item.description} for item in restaurant_data.menu_items[:10]] if restaurant_data.menu_items else []
-            },
-            "google_presence": {
-                "rating": restaurant_data.google_places_summary.get("rating") if restaurant_data.google_places_summary else None,
-                "reviews_count": restaurant_data.google_places_summary.get("reviews_count") if restaurant_data.google_places_summary else None,
-                "place_id": restaurant_data.google_places_summary.get("place_id") if restaurant_data.google_places_summary else None
-            },
-            "delivery_platform_analysis": delivery_platform_data,
-            "social_media_analysis": social_media_data,
-            "comprehensive_stagehand_data": stagehand_data,
-            "technical_health": technical_health,
-            "social_media_links": restaurant_data.social_media_links or {},
-            "competitive_data": {
-                "identified_competitors": [{"name": comp.name, "url": str(comp.url) if comp.url else None} for comp in restaurant_data.identified_competitors_basic] if restaurant_data.identified_competitors_basic else [],
-                "delivery_platform_competitors": restaurant_data.misc_structured_data.get('identified_competitors_delivery', []) if restaurant_data.misc_structured_data else []
-            }
-        }
-        
-        prompt = f"""
-        Analyze the provided comprehensive restaurant data and generate a strategic deep dive analysis.
-        This data includes delivery platform presence, social media analysis, competitive intelligence, and technical insights.
-
-        Comprehensive Restaurant Data:
-        {json.dumps(restaurant_context, indent=2)}
-        
-        Generate a detailed strategic analysis incorporating ALL available data, focusing on:
-        
-        1. **Digital Presence Assessment**: Website, social media, delivery platforms
-        2. **Competitive Market Position**: Based on delivery platform rankings and competitor analysis  
-        3. **Operational Strengths**: Menu variety, pricing strategy, customer engagement
-        4. **Growth Opportunities**: Gaps in delivery platforms, social media potential, technical improvements
-        5. **Strategic Recommendations**: Data-driven insights for expansion and optimization
-        
-        Pay special attention to:
-        - Delivery platform performance (DoorDash, Uber Eats, Grubhub rankings and product listings)
-        - Social media engagement metrics and follower analysis
-        - Competitive positioning on delivery platforms
-        - Technical website health and optimization opportunities
-        - Cross-platform consistency and brand presence
-        
-        Return a comprehensive JSON analysis:
-        {{
-            "digital_presence_score": {{
-                "overall_score": "1-10 rating",
-                "website_quality": "assessment of technical health and user experience",
-                "social_media_strength": "analysis of social media presence and engagement",
-                "delivery_platform_presence": "assessment of delivery platform coverage and performance"
-            }},
-            "competitive_positioning": {{
-                "market_position": "strong/moderate/weak with justification",
-                "delivery_platform_rankings": "summary of rankings across platforms",
-                "unique_differentiators": ["diff1", "diff2", "diff3"],
-                "competitive_gaps": ["gap1", "gap2", "gap3"]
-            }},
-            "key_strengths": ["strength1", "strength2", "strength3"],
-            "critical_weaknesses": ["weakness1", "weakness2", "weakness3"],
-            "growth_opportunities": {{
-                "high_impact": ["opportunity1", "opportunity2"],
-                "quick_wins": ["quick1", "quick2"],
-                "long_term": ["longterm1", "longterm2"]
-            }},
-            "strategic_priorities": {{
-                "immediate_actions": ["action1", "action2"],
-                "6_month_goals": ["goal1", "goal2"],
-                "12_month_vision": "long-term strategic direction"
-            }},
-            "data_insights": {{
-                "delivery_platform_summary": "key insights from platform analysis",
-                "social_media_summary": "key insights from social analysis", 
-                "technical_summary": "key insights from technical health analysis",
-                "competitive_summary": "key insights from competitor analysis"
-            }},
-            "overall_assessment": "comprehensive strategic summary incorporating all data sources"
-        }}
-        """
-        
-        return await self._call_gemini_text_json_mode(prompt, max_tokens=2048)
-
-    async def _generate_competitor_snapshot(self, competitor_data: CompetitorSummary, target_restaurant_name: str) -> Optional[Dict[str, Any]]:
-        """Prompt 2.2: Analyze each competitor in FinalRestaurantOutput.competitors."""
-        logger.info(f"🧠 Generating Competitor Snapshot for: {competitor_data.name} (vs {target_restaurant_name})")
-        
-        prompt_data = competitor_data.dict() # Pydantic model to dict
-
-        prompt = f"""
-        Analyze the provided data for "{competitor_data.name}", a competitor to "{target_restaurant_name}".
-        Based *only* on this information, identify its apparent key strengths and key weaknesses relative to a typical restaurant or from the perspective of a customer choosing between options.
-
-        Competitor Data:
-        {json.dumps(prompt_data, indent=2)}
-
-        Return a JSON object with the following keys:
-        - "competitor_name": "{competitor_data.name}"
-        - "key_strengths": [list of strings]
-        - "key_weaknesses": [list of strings]
-        """
-        analysis_result = await self._call_gemini_text_json_mode(prompt, max_tokens=512)
-        if analysis_result and "key_strengths" in analysis_result and "key_weaknesses" in analysis_result:
-            # Update the Pydantic model passed by reference (if it is) or return for caller to update
-            # For safety, let's assume the caller will handle updating the original competitor_data model
-            # The returned dict here will be used by the caller.
-            return {
-                "competitor_name": competitor_data.name, # ensure name is part of the returned dict
-                "key_strengths": analysis_result["key_strengths"],
-                "key_weaknesses": analysis_result["key_weaknesses"],
-            }
-        logger.warning(f"Could not fully analyze competitor {competitor_data.name}. Result: {analysis_result}")
-        return None
-
-
-    async def _generate_main_strategic_recommendations(
-        self, 
-        target_analysis: Dict[str, Any], 
-        competitor_analyses: List[Dict[str, Any]], 
-        restaurant_data: FinalRestaurantOutput, 
-        screenshot_analysis_results: Dict[HttpUrl, Dict[str, Any]] # Changed key from str to HttpUrl
-    ) -> Optional[LLMStrategicAnalysisOutput]:
-        """Generate strategic recommendations based on all analysis"""
-        logger.info(f"🧠 Generating Main Strategic Recommendations for: {restaurant_data.restaurant_name}")
-        
-        # Extract all the rich data sources
-        delivery_platform_data = {}
-        social_media_data = {}
-        stagehand_data = {}
-        technical_health = {}
-        delivery_competitors = []
-        
-        if hasattr(restaurant_data, 'misc_structured_data') and restaurant_data.misc_structured_data:
-            delivery_platform_data = restaurant_data.misc_structured_data.get('delivery_platform_analysis', {})
-            social_media_data = restaurant_data.misc_structured_data.get('social_media_analysis', {})
-            stagehand_data = restaurant_data.misc_structured_data.get('stagehand_comprehensive', {})
-            technical_health = restaurant_data.misc_structured_data.get('technical_health', {})
-            delivery_competitors = restaurant_data.misc_structured_data.get('identified_competitors_delivery', [])
-        
-        # Prepare comprehensive data for analysis
-        analysis_context = {
-            "target_restaurant": {
-                "name": restaurant_data.restaurant_name,
-                "description": restaurant_data.description_short or restaurant_data.description_long_ai_generated,
-                "cuisine_type": restaurant_data.primary_cuisine_type_ai,
-                "price_range": restaurant_data.price_range_ai,
-                "website_url": str(restaurant_data.website_url),
-                "google_rating": restaurant_data.google_places_summary.get("rating") if restaurant_data.google_places_summary else None,
-                "google_review_count": restaurant_data.google_places_summary.get("reviews_count") if restaurant_data.google_places_summary else None,
-                "menu_items": [{"name": item.name, "price": item.price, "description": item.description} for item in restaurant_data.menu_items[:15]] if restaurant_data.menu_items else [],
-                "social_media_links": restaurant_data.social_media_links or {},
-                "deep_dive_analysis": target_analysis
-            },
-            "delivery_platform_intelligence": {
-                "platforms_analyzed": delivery_platform_data,
-                "competitive_rankings": delivery_competitors,
-                "market_presence_summary": "Based on DoorDash, Uber Eats, Grubhub analysis"
-            },
-            "social_media_intelligence": {
-                "platform_analysis": social_media_data,
-                "engagement_metrics": "Extracted from social media analysis",
-                "competitive_social_positioning": "Based on follower counts and engagement"
-            },
-            "technical_intelligence": {
-                "website_health": technical_health,
-                "performance_metrics": technical_health.get('performance', {}),
-                "seo_optimization": technical_health.get('seoOptimized', False),
-                "mobile_responsiveness": technical_health.get('mobileResponsive', False)
-            },
-            "comprehensive_competitor_data": {
-                "local_competitors": competitor_analyses,
-                "delivery_platform_competitors": delivery_competitors,
-                "total_competitors_analyzed": len(competitor_analyses) + len(delivery_competitors)
-            },
-            "screenshot_insights": screenshot_analysis_results,
-            "data_completeness": {
-                "has_menu": bool(restaurant_data.menu_items and len(restaurant_data.menu_items) > 0),
-                "has_social_media": bool(restaurant_data.social_media_links),
-                "has_google_presence": bool(restaurant_data.google_places_summary),
-                "has_delivery_platform_data": bool(delivery_platform_data),
-                "has_technical_analysis": bool(technical_health),
-                "has_screenshots": bool(restaurant_data.website_screenshots_s3_urls)
-            }
-        }
-
-        prompt = f"""
-        Generate strategic recommendations for {restaurant_data.restaurant_name} based on comprehensive multi-source analysis.
+_MAIN_RECOMMENDATIONS_PROMPT_TMPL = _SlotTemplate("""
+        Generate strategic recommendations for {restaurant_name} based on the comprehensive restaurant data above
+        and the multi-source analysis below.
         
         You have access to rich data including:
         - Delivery platform performance (DoorDash, Uber Eats, Grubhub rankings, product listings, competitor analysis)
@@ -1652,8 +2446,8 @@ class LLMAnalyzer:
         - Local and delivery platform competitor intelligence
         - Screenshot analysis and visual brand assessment
         
-        Comprehensive Analysis Data:
-        {json.dumps(analysis_context, indent=2)}
+        Additional Analysis Data (deep dive, competitor and screenshot analyses):
+        {analysis_context_json}
         
         Create data-driven strategic recommendations that leverage ALL available intelligence sources.
         Focus on actionable opportunities with clear revenue impact estimates.
@@ -1718,151 +2512,115 @@ class LLMAnalyzer:
                 "brand_consistency_actions": "Recommendations for unified presence across all platforms"
             }},
             "analysis_metadata": {{
-                "generated_at": "{datetime.now().isoformat()}",
+                "generated_at": "Filled in after generation",
                 "analysis_duration_seconds": 0,
                 "estimated_cost_usd": 0.08,
-                "screenshots_analyzed": {len(screenshot_analysis_results)},
-                "competitors_analyzed": {len(competitor_analyses) + len(delivery_competitors)},
+                "screenshots_analyzed": {screenshots_analyzed},
+                "competitors_analyzed": {competitors_analyzed},
                 "data_sources_used": ["delivery_platforms", "social_media", "technical_health", "competitor_intelligence", "screenshot_analysis"],
-                "delivery_platforms_analyzed": {list(delivery_platform_data.keys()) if delivery_platform_data else []},
-                "social_platforms_analyzed": {list(social_media_data.keys()) if social_media_data else []}
+                "delivery_platforms_analyzed": {delivery_platforms_json},
+                "social_platforms_analyzed": {social_platforms_json}
             }}
         }}
-        """
-        
-        strategic_analysis_dict = await self._call_gemini_text_json_mode(prompt, max_tokens=3072)
-        
-        if strategic_analysis_dict:
-            try:
-                return LLMStrategicAnalysisOutput(**strategic_analysis_dict)
-            except Exception as e: 
-                logger.error(f"Failed to create LLMStrategicAnalysisOutput: {e}")
-                return None 
-        
-        return None
-
-    async def generate_strategic_report_content(
-        self, 
-        final_restaurant_data: FinalRestaurantOutput, 
-        # screenshot_analysis_results: Dict[HttpUrl, Dict[str, Any]] # Keyed by S3 URL (HttpUrl)
-        # This now will be populated by calling analyze_screenshot_with_gemini internally if screenshots exist
-    ) -> Optional[LLMStrategicAnalysisOutput]:
-        """
-        Phase B: LLM Strategic Analysis
-        Main orchestration method for generating strategic analysis
-        """
-        if not self.enabled:
-            logger.warning("🤖 LLM Analyzer is disabled (no API key)")
-            return None
+        """)
 
-        logger.info(f"📝 Starting strategic report content generation for {final_restaurant_data.restaurant_name}")
-        start_time = datetime.now()
-        
-        try:
-            # Phase B1: Screenshot Analysis (if available)
-            screenshot_analyses: Dict[HttpUrl, Dict[str, Any]] = {}
-            screenshots_analyzed = 0
-            
-            if final_restaurant_data.website_screenshots_s3_urls:
-                logger.info(f"📸 Analyzing {len(final_restaurant_data.website_screenshots_s3_urls)} screenshots...")
-                
-                for screenshot_info in final_restaurant_data.website_screenshots_s3_urls:
-                    try:
-                        # Determine analysis focus based on caption/metadata
-                        analysis_focus = "homepage_impression"  # Default
-                        if screenshot_info.caption:
-                            if "menu" in screenshot_info.caption.lower():
-                                analysis_focus = "menu_impression"
-                            elif "contact" in screenshot_info.caption.lower():
-                                analysis_focus = "contact_page_analysis"
-                        
-                        context_for_vision = f"This is for the restaurant: {final_restaurant_data.restaurant_name}."
-                        
-                        screenshot_analysis = await self.analyze_screenshot_with_gemini(
-                            screenshot_info.s3_url,
-                            analysis_focus,
-                            context_for_vision
-                        )
-                        
-                        if screenshot_analysis:
-                            screenshot_analyses[screenshot_info.s3_url] = screenshot_analysis
-                            screenshots_analyzed += 1
-                            logger.info(f"✅ Analyzed screenshot: {screenshot_info.s3_url}")
-                        else:
-                            logger.warning(f"⚠️ Failed to analyze screenshot: {screenshot_info.s3_url}")
-                            
-                    except Exception as e_screenshot:
-                        logger.error(f"❌ Error analyzing screenshot {screenshot_info.s3_url}: {str(e_screenshot)}")
-                        continue
-            
-            # Phase B2: Target Restaurant Deep Dive
-            logger.info("🧠 Generating target restaurant deep dive...")
-            target_deep_dive = await self._generate_target_restaurant_deep_dive(final_restaurant_data)
-            
-            if not target_deep_dive:
-                logger.warning("⚠️ Target restaurant deep dive failed")
-                target_deep_dive = {"analysis": "Basic analysis could not be generated"}
-            
-            # Phase B3: Competitor Analysis
-            competitor_snapshots = []
-            competitors_analyzed = 0
-            
-            if final_restaurant_data.identified_competitors_basic:
-                logger.info(f"🏢 Analyzing {len(final_restaurant_data.identified_competitors_basic)} competitors...")
-                
-                for competitor in final_restaurant_data.identified_competitors_basic:
-                    try:
-                        competitor_analysis = await self._generate_competitor_snapshot(competitor, final_restaurant_data.restaurant_name)
-                        
-                        if competitor_analysis:
-                            competitor_snapshots.append(competitor_analysis)
-                            competitors_analyzed += 1
-                            logger.info(f"✅ Analyzed competitor: {competitor.name}")
-                        else:
-                            logger.warning(f"⚠️ Failed to analyze competitor: {competitor.name}")
-                            
-                    except Exception as e_competitor:
-                        logger.error(f"❌ Error analyzing competitor {competitor.name}: {str(e_competitor)}")
-                        continue
-            
-            # Phase B4: Generate Main Strategic Recommendations
-            logger.info("🎯 Generating main strategic recommendations...")
-            llm_strategic_output = await self._generate_main_strategic_recommendations(
-                target_analysis=target_deep_dive,
-                competitor_analyses=competitor_snapshots,
-                restaurant_data=final_restaurant_data,
-                screenshot_analysis_results=screenshot_analyses
-            )
-            
-            if not llm_strategic_output:
-                logger.warning("⚠️ Main strategic recommendations failed to generate")
-                return None
-            
-            logger.info("✅ Main strategic recommendations generated successfully")
-            return llm_strategic_output
-        
-        except Exception as e:
-            logger.error(f"❌ Exception in strategic report content generation: {str(e)}")
-            return None
+# Bounds for LLMAnalyzer's in-memory image cache; screenshots can be several MB each,
+# so total size is capped as well as entry count
+_IMAGE_CACHE_MAXSIZE = 128
+_IMAGE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Screenshot downloads go through the shared aiohttp session with their own timeout
+_IMAGE_FETCH_TIMEOUT = aiohttp.ClientTimeout(total=30)
 
-    async def generate_main_strategic_recommendations(
-        self, 
-        target_deep_dive: Dict[str, Any],
-        competitor_snapshots: List[Dict[str, Any]], 
-        screenshot_analyses: Dict[str, Any],
-        target_summary: Dict[str, Any]
-    ) -> Dict[str, Any]:
-        """
-        LLMA-6: Main Comparative & Strategic Recommendation Engine (THE GRAND SUMMARY)
-        
-        This is the ultimate synthesis prompt that creates the final strategic report
-        combining all previous analyses into actionable business intelligence.
-        """
-        logger.info("🎯 Generating main strategic recommendations (LLMA-6: Grand Summary)")
-        
-        # LLMA-6: The "Holy Grail" - Main Comparative & Strategic Recommendation Engine
-        LLMA_6_MAIN_STRATEGIC_PROMPT_TEMPLATE = """You are an exceptionally insightful, empathetic, and data-driven Restaurant Growth Strategist, a true "McKinsey for Main Street Restaurants."
-Your primary objective is to analyze the comprehensive multi-source data provided for {target_restaurant_name_placeholder} and craft a compelling, actionable, 5-7 page strategic report.
+# Example LLMA-6 output whose string values describe what belongs in each field; the
+# response schema is derived from it so the decoder enforces the structure
+_LLMA6_OUTPUT_EXAMPLE = orjson.loads("""{
+  "executive_hook": {
+    "hook_statement": "Craft a compelling 2-3 sentence opening for the report. Start by identifying the single largest quantifiable gap between [This Restaurant] and its best-performing competitor based on delivery platform rankings, social media engagement, or technical performance. Calculate the potential daily revenue impact or opportunity cost with your reasoning. Then state an overall potential revenue increase percentage (e.g., '25-45%') achievable in 60-90 days by addressing the top cross-platform opportunities. Mention the number of key opportunities found across all data sources. Make it feel urgent but solvable.",
+    "biggest_opportunity_teaser": "A one-sentence teaser of the single most impactful cross-platform opportunity that will be detailed later in the report. This should create curiosity and reference specific data findings."
+  },
+  "competitive_landscape_summary": {
+    "introduction": "Start with a brief (1-2 sentence) confidence-building statement acknowledging any clear strengths or positive aspects of [This Restaurant] found in the multi-source analysis before discussing competitive aspects.",
+    "detailed_comparison_text": "Provide a detailed narrative (target 400-600 words). Compare [This Restaurant] to its top 2-3 anonymous local competitors across delivery platform presence (DoorDash/Uber Eats/Grubhub rankings), social media engagement metrics, website technical performance, Google Review presence, and unique market positioning. Use specific data from the delivery platform analysis, social media intelligence, and technical health assessment. Conclude by identifying 1-2 primary areas where [This Restaurant] is being clearly outperformed OR has a significant unexploited advantage based on the comprehensive data analysis.",
+    "key_takeaway_for_owner": "A 1-2 sentence summary of the most critical competitive insight the owner needs to grasp from this cross-platform analysis, emphasizing an actionable perspective with specific data support."
+  },
+  "top_3_prioritized_opportunities": [
+    {
+      "priority_rank": 1,
+      "opportunity_title": "Specific, actionable title using strong verbs that references the data source (e.g., 'Capture 40% More Orders Through DoorDash Optimization Based on Competitor Gap Analysis' or 'Launch Social Media Engagement Strategy to Match Top Competitor's 300% Higher Follower Count').",
+      "current_situation_and_problem": "Detailed explanation (target 200-300 words) of the current situation at [This Restaurant] related to this opportunity. Clearly explain the problem or gap using specific data from delivery platform analysis, social media intelligence, technical health assessment, or competitive analysis. Reference competitor performance metrics and quantify the problem using the enhanced data sources.",
+      "detailed_recommendation": "Outline clear, step-by-step actions (target 250-350 words) [This Restaurant] can take to seize this opportunity. Be practical, specific, and break it down into manageable phases. Reference how competitors are succeeding in this area and how to replicate/exceed their performance using the data insights.",
+      "estimated_revenue_or_profit_impact": "Provide a quantifiable impact estimate using the enhanced data sources. Reference specific delivery platform market share data, social media engagement correlation with revenue, technical conversion improvements, or competitive performance gaps. Show your reasoning using the comprehensive data available.",
+      "ai_solution_pitch": "Explain (target 100-200 words) how technology automation could significantly reduce the time, complexity, or cost of implementing this recommendation. Reference specific data insights that AI can leverage (delivery platform optimization algorithms, social media automation based on competitor analysis, technical performance monitoring). Mention which AI platform tools can specifically address the data-driven insights.",
+      "implementation_timeline": "Select one: '2-4 Weeks', '1-2 Months', '3-6 Months'",
+      "difficulty_level": "Select one: 'Easy (Quick Wins)', 'Medium (Requires Focused Effort)', 'Hard (Strategic Shift, High Reward)'",
+      "data_sources_supporting_evidence": "List the specific data sources that support this recommendation (e.g., 'delivery_platform_analysis', 'social_media_intelligence', 'technical_health_assessment', 'competitor_delivery_rankings')",
+      "visual_evidence_suggestion": {
+          "idea_for_visual": "Describe a type of visual that would effectively illustrate this opportunity or problem using the data sources.",
+          "relevant_screenshot_s3_url_from_input": "If a specific screenshot S3 URL from the input is highly relevant, state it here, otherwise null."
+      }
+    }
+  ],
+  "cross_platform_integration_strategy": {
+    "delivery_platform_optimization": "Specific recommendations based on delivery platform analysis and competitor rankings",
+    "social_media_competitive_strategy": "Strategy based on social media intelligence and engagement gap analysis", 
+    "technical_performance_enhancement": "Recommendations based on technical health assessment and conversion optimization",
+    "unified_brand_presence": "Cross-platform consistency recommendations based on comprehensive analysis",
+    "revenue_synergy_opportunities": "How optimizing across all platforms creates multiplicative revenue effects"
+  },
+  "premium_analysis_teasers": [
+    {
+      "premium_feature_title": "Select from: Advanced Delivery Platform Revenue Optimization Engine, AI-Powered Social Media Competitive Intelligence Dashboard, Cross-Platform Customer Journey Optimization Blueprint, Dynamic Pricing Strategy Based on Delivery Platform Analytics, Automated Review Response & Reputation Management Across All Platforms, Technical Performance Monitoring & Conversion Rate Optimization, Comprehensive Competitor Intelligence & Market Share Analysis",
+      "compelling_teaser_hook": "Tailor this hook to [This Restaurant]'s specific competitive situation using the enhanced data sources. Identify a question or curiosity the main analysis likely raised that this premium feature directly answers using the comprehensive data available.",
+      "value_proposition": "What specific, high-value outcome, data, or actionable strategy will this premium analysis deliver that leverages the enhanced data sources and provides deeper insights than this current freemium report?"
+    }
+  ],
+  "immediate_action_items_quick_wins": [
+    {
+      "action_item": "Specific, easy action requiring no budget, completable in under 2 hours, addressing a fixable issue identified in the enhanced data analysis. Include exact location/platform where change needs to be made and reference the specific data insight that supports this action.",
+      "rationale_and_benefit": "Why it's important and the quick, tangible benefit based on data findings and competitive analysis."
+    }
+  ],
+  "engagement_and_consultation_questions": [
+    "Question 1: Tailored to their specific situation and top weaknesses/opportunities identified in the enhanced data analysis",
+    "Question 2: Related to another key opportunity or pain point discovered through comprehensive multi-source analysis", 
+    "Question 3: More general about their current systems or biggest goals, incorporating insights from delivery platform, social media, and technical analysis"
+  ],
+  "forward_thinking_strategic_insights": {
+    "introduction": "A brief (1-2 sentence) transition: 'Beyond these immediate opportunities identified through our comprehensive analysis, successful restaurants continuously adapt across all platforms. Here are a few forward-thinking considerations for [This Restaurant] based on the enhanced data intelligence:'",
+    "untapped_potential_and_innovation_ideas": [
+        {
+            "idea_title": "Innovative Idea 1 Title based on data insights (e.g., 'Launch Cross-Platform Loyalty Program Leveraging Social Media Engagement Data')", 
+            "description_and_rationale": "Detailed explanation (200-300 words) of the concept, why it's relevant and uniquely suited for [This Restaurant] given their profile revealed in the enhanced data analysis, competitive gaps identified in delivery platform and social media intelligence, and potential first steps for exploration using the comprehensive data insights."
+        },
+        {
+            "idea_title": "Innovative Idea 2 Title incorporating multi-source analysis (e.g., 'Develop AI-Powered Menu Optimization Based on Delivery Platform Performance Data')", 
+            "description_and_rationale": "Detailed explanation (200-300 words) of second innovative concept leveraging enhanced data sources..."
+        }
+    ],
+    "long_term_vision_alignment_thoughts": [
+        {
+            "strategic_thought_title": "Long-Term Consideration 1 Title using comprehensive analysis (e.g., 'Building a Data-Driven Multi-Platform Restaurant Ecosystem')", 
+            "elaboration": "Detailed discussion (200-300 words) on a broader strategic consideration for sustained growth over 1-3 years, incorporating insights from all enhanced data sources and competitive intelligence."
+        }
+    ],
+    "consultants_core_empowerment_message": "Craft an impactful concluding paragraph (target 100-150 words) that motivates the owner of [This Restaurant] to take action on the identified opportunities. Reference the comprehensive data analysis that supports the recommendations, emphasize that growth is achievable with focused effort across all platforms, and subtly reinforce the value of ongoing partnership or premium tools that can leverage the enhanced data intelligence for continuous optimization."
+  },
+  "data_synthesis_summary": {
+    "total_data_sources_analyzed": "Number and list of all data sources used in this analysis",
+    "key_platforms_analyzed": "List of platforms analyzed (delivery platforms, social media platforms, technical systems, etc.)",
+    "competitive_intelligence_depth": "Summary of the depth and breadth of competitive analysis performed",
+    "data_confidence_score": "Assessment of data quality and confidence level (High/Medium/Low) with brief explanation"
+  }
+}""")
+
+_LLMA6_RESPONSE_SCHEMA = _gemini_schema_from_example(
+    _LLMA6_OUTPUT_EXAMPLE, nullable=("relevant_screenshot_s3_url_from_input",)
+)
+
+# LLMA-6 prompt, split so the static persona/benchmarks/schema/instructions form an
+# invariant leading prefix (cacheable by Gemini) and only the tail varies per call
+_LLMA6_STATIC_PREAMBLE = """You are an exceptionally insightful, empathetic, and data-driven Restaurant Growth Strategist, a true "McKinsey for Main Street Restaurants."
+Your primary objective is to analyze the comprehensive multi-source data provided for the target restaurant (named in the data section at the end of this prompt) and craft a compelling, actionable, 5-7 page strategic report.
 This report must empower the owner to understand their current standing, identify clear growth paths, and feel motivated to take decisive action.
 Your analysis should make the owner feel clearly understood, see achievable paths to improvement, and be compelled by the opportunities.
 The tone must be professional, supportive, factual, solutions-oriented, and empathetic. Avoid harsh criticism; frame all challenges as clear, addressable opportunities.
@@ -1906,16 +2664,7 @@ You now have access to advanced competitive intelligence including:
 - Business intelligence gathered from advanced web analysis
 - Strategic opportunities identified through data synthesis
 
-1. **Target Restaurant Deep Dive Analysis (Enhanced with All Data Sources):**
-   {target_deep_dive_json_placeholder}
-
-2. **Competitor Snapshot Analyses (Enhanced with Multi-Platform Data):**
-   {competitor_snapshots_json_array_placeholder}
-
-3. **Screenshot Interpretation Summaries (Visual Evidence):**
-   {screenshot_interpretation_summaries_json_placeholder}
-
-4. **Industry Benchmarks and Facts (Enhanced with Platform-Specific Data):**
+**Industry Benchmarks and Facts (Enhanced with Platform-Specific Data):**
    • Restaurants with optimized delivery platform presence see 25-40% increase in off-premise revenue
    • Restaurants ranking in top 3 on DoorDash/Uber Eats for their category see 2-3x more orders
    • Consistent cross-platform branding increases customer recognition by 35-50%
@@ -1929,9 +2678,6 @@ You now have access to advanced competitive intelligence including:
    • Mobile-optimized websites convert 40% better than non-optimized sites
    • Local SEO optimization can increase Google Maps visibility by 60-80%
 
-5. **Key Target Restaurant Data Points (Multi-Platform Enhanced):**
-   {key_target_restaurant_data_points_placeholder}
-
 **YOUR ENHANCED TASK: Generate Content for a 5-7 Page Strategic Report Leveraging ALL Data Sources**
 
 Based on ALL the comprehensive multi-source data provided (delivery platforms, social media intelligence, competitive delivery data, technical analysis, and Stagehand intelligence), generate the content for the report. 
@@ -1945,142 +2691,14 @@ Pay special attention to:
 - **Delivery Platform Market Share**: Use competitor delivery platform rankings to identify market capture opportunities
 - **Integrated Marketing Strategy**: Create recommendations that leverage all platforms synergistically
 
-Adhere strictly to the JSON output format defined below. Each section requires thorough elaboration to ensure substantial content.
-
-Return ONLY a valid JSON object with this exact structure:
-
-{{
-  "executive_hook": {{
-    "hook_statement": "Craft a compelling 2-3 sentence opening for the report. Start by identifying the single largest quantifiable gap between [This Restaurant] and its best-performing competitor based on delivery platform rankings, social media engagement, or technical performance. Calculate the potential daily revenue impact or opportunity cost with your reasoning. Then state an overall potential revenue increase percentage (e.g., '25-45%') achievable in 60-90 days by addressing the top cross-platform opportunities. Mention the number of key opportunities found across all data sources. Make it feel urgent but solvable.",
-    "biggest_opportunity_teaser": "A one-sentence teaser of the single most impactful cross-platform opportunity that will be detailed later in the report. This should create curiosity and reference specific data findings."
-  }},
-  "competitive_landscape_summary": {{
-    "introduction": "Start with a brief (1-2 sentence) confidence-building statement acknowledging any clear strengths or positive aspects of [This Restaurant] found in the multi-source analysis before discussing competitive aspects.",
-    "detailed_comparison_text": "Provide a detailed narrative (target 400-600 words). Compare [This Restaurant] to its top 2-3 anonymous local competitors across delivery platform presence (DoorDash/Uber Eats/Grubhub rankings), social media engagement metrics, website technical performance, Google Review presence, and unique market positioning. Use specific data from the delivery platform analysis, social media intelligence, and technical health assessment. Conclude by identifying 1-2 primary areas where [This Restaurant] is being clearly outperformed OR has a significant unexploited advantage based on the comprehensive data analysis.",
-    "key_takeaway_for_owner": "A 1-2 sentence summary of the most critical competitive insight the owner needs to grasp from this cross-platform analysis, emphasizing an actionable perspective with specific data support."
-  }},
-  "top_3_prioritized_opportunities": [
-    {{
-      "priority_rank": 1,
-      "opportunity_title": "Specific, actionable title using strong verbs that references the data source (e.g., 'Capture 40% More Orders Through DoorDash Optimization Based on Competitor Gap Analysis' or 'Launch Social Media Engagement Strategy to Match Top Competitor's 300% Higher Follower Count').",
-      "current_situation_and_problem": "Detailed explanation (target 200-300 words) of the current situation at [This Restaurant] related to this opportunity. Clearly explain the problem or gap using specific data from delivery platform analysis, social media intelligence, technical health assessment, or competitive analysis. Reference competitor performance metrics and quantify the problem using the enhanced data sources.",
-      "detailed_recommendation": "Outline clear, step-by-step actions (target 250-350 words) [This Restaurant] can take to seize this opportunity. Be practical, specific, and break it down into manageable phases. Reference how competitors are succeeding in this area and how to replicate/exceed their performance using the data insights.",
-      "estimated_revenue_or_profit_impact": "Provide a quantifiable impact estimate using the enhanced data sources. Reference specific delivery platform market share data, social media engagement correlation with revenue, technical conversion improvements, or competitive performance gaps. Show your reasoning using the comprehensive data available.",
-      "ai_solution_pitch": "Explain (target 100-200 words) how technology automation could significantly reduce the time, complexity, or cost of implementing this recommendation. Reference specific data insights that AI can leverage (delivery platform optimization algorithms, social media automation based on competitor analysis, technical performance monitoring). Mention which AI platform tools can specifically address the data-driven insights.",
-      "implementation_timeline": "Select one: '2-4 Weeks', '1-2 Months', '3-6 Months'",
-      "difficulty_level": "Select one: 'Easy (Quick Wins)', 'Medium (Requires Focused Effort)', 'Hard (Strategic Shift, High Reward)'",
-      "data_sources_supporting_evidence": "List the specific data sources that support this recommendation (e.g., 'delivery_platform_analysis', 'social_media_intelligence', 'technical_health_assessment', 'competitor_delivery_rankings')",
-      "visual_evidence_suggestion": {{
-          "idea_for_visual": "Describe a type of visual that would effectively illustrate this opportunity or problem using the data sources.",
-          "relevant_screenshot_s3_url_from_input": "If a specific screenshot S3 URL from the input is highly relevant, state it here, otherwise null."
-      }}
-    }},
-    {{
-      "priority_rank": 2,
-      "opportunity_title": "Second opportunity title incorporating data source insights",
-      "current_situation_and_problem": "Detailed explanation for opportunity 2 using enhanced data sources...",
-      "detailed_recommendation": "Step-by-step actions for opportunity 2 based on comprehensive analysis...",
-      "estimated_revenue_or_profit_impact": "Quantifiable impact estimate for opportunity 2 using specific data metrics...",
-      "ai_solution_pitch": "AI technology solution for opportunity 2 leveraging data insights...",
-      "implementation_timeline": "Timeline for opportunity 2",
-      "difficulty_level": "Difficulty level for opportunity 2",
-      "data_sources_supporting_evidence": "Specific data sources supporting opportunity 2",
-      "visual_evidence_suggestion": {{
-          "idea_for_visual": "Visual concept for opportunity 2...",
-          "relevant_screenshot_s3_url_from_input": "S3 URL or null"
-      }}
-    }},
-    {{
-      "priority_rank": 3,
-      "opportunity_title": "Third opportunity title with data-driven insights",
-      "current_situation_and_problem": "Detailed explanation for opportunity 3 using multi-source data...",
-      "detailed_recommendation": "Step-by-step actions for opportunity 3 based on comprehensive intelligence...",
-      "estimated_revenue_or_profit_impact": "Quantifiable impact estimate for opportunity 3 with data support...",
-      "ai_solution_pitch": "AI technology solution for opportunity 3 incorporating data analysis...",
-      "implementation_timeline": "Timeline for opportunity 3",
-      "difficulty_level": "Difficulty level for opportunity 3", 
-      "data_sources_supporting_evidence": "Specific data sources supporting opportunity 3",
-      "visual_evidence_suggestion": {{
-          "idea_for_visual": "Visual concept for opportunity 3...",
-          "relevant_screenshot_s3_url_from_input": "S3 URL or null"
-      }}
-    }}
-  ],
-  "cross_platform_integration_strategy": {{
-    "delivery_platform_optimization": "Specific recommendations based on delivery platform analysis and competitor rankings",
-    "social_media_competitive_strategy": "Strategy based on social media intelligence and engagement gap analysis", 
-    "technical_performance_enhancement": "Recommendations based on technical health assessment and conversion optimization",
-    "unified_brand_presence": "Cross-platform consistency recommendations based on comprehensive analysis",
-    "revenue_synergy_opportunities": "How optimizing across all platforms creates multiplicative revenue effects"
-  }},
-  "premium_analysis_teasers": [
-    {{
-      "premium_feature_title": "Select from: Advanced Delivery Platform Revenue Optimization Engine, AI-Powered Social Media Competitive Intelligence Dashboard, Cross-Platform Customer Journey Optimization Blueprint, Dynamic Pricing Strategy Based on Delivery Platform Analytics, Automated Review Response & Reputation Management Across All Platforms, Technical Performance Monitoring & Conversion Rate Optimization, Comprehensive Competitor Intelligence & Market Share Analysis",
-      "compelling_teaser_hook": "Tailor this hook to [This Restaurant]'s specific competitive situation using the enhanced data sources. Identify a question or curiosity the main analysis likely raised that this premium feature directly answers using the comprehensive data available.",
-      "value_proposition": "What specific, high-value outcome, data, or actionable strategy will this premium analysis deliver that leverages the enhanced data sources and provides deeper insights than this current freemium report?"
-    }},
-    {{
-      "premium_feature_title": "Second premium feature based on data insights...",
-      "compelling_teaser_hook": "Hook for second premium feature using enhanced data...",
-      "value_proposition": "Value proposition for second premium feature incorporating comprehensive analysis..."
-    }},
-    {{
-      "premium_feature_title": "Third premium feature leveraging multi-source data...",
-      "compelling_teaser_hook": "Hook for third premium feature with data-driven insights...",
-      "value_proposition": "Value proposition for third premium feature based on comprehensive intelligence..."
-    }}
-  ],
-  "immediate_action_items_quick_wins": [
-    {{
-      "action_item": "Specific, easy action requiring no budget, completable in under 2 hours, addressing a fixable issue identified in the enhanced data analysis. Include exact location/platform where change needs to be made and reference the specific data insight that supports this action.",
-      "rationale_and_benefit": "Why it's important and the quick, tangible benefit based on data findings and competitive analysis."
-    }},
-    {{
-      "action_item": "Second quick win action item based on data insights...",
-      "rationale_and_benefit": "Rationale for second action item using enhanced data analysis..."
-    }},
-    {{
-      "action_item": "Third quick win action item incorporating multi-source findings...",
-      "rationale_and_benefit": "Rationale for third action item with comprehensive data support..."
-    }}
-  ],
-  "engagement_and_consultation_questions": [
-    "Question 1: Tailored to their specific situation and top weaknesses/opportunities identified in the enhanced data analysis",
-    "Question 2: Related to another key opportunity or pain point discovered through comprehensive multi-source analysis", 
-    "Question 3: More general about their current systems or biggest goals, incorporating insights from delivery platform, social media, and technical analysis"
-  ],
-  "forward_thinking_strategic_insights": {{
-    "introduction": "A brief (1-2 sentence) transition: 'Beyond these immediate opportunities identified through our comprehensive analysis, successful restaurants continuously adapt across all platforms. Here are a few forward-thinking considerations for [This Restaurant] based on the enhanced data intelligence:'",
-    "untapped_potential_and_innovation_ideas": [
-        {{
-            "idea_title": "Innovative Idea 1 Title based on data insights (e.g., 'Launch Cross-Platform Loyalty Program Leveraging Social Media Engagement Data')", 
-            "description_and_rationale": "Detailed explanation (200-300 words) of the concept, why it's relevant and uniquely suited for [This Restaurant] given their profile revealed in the enhanced data analysis, competitive gaps identified in delivery platform and social media intelligence, and potential first steps for exploration using the comprehensive data insights."
-        }},
-        {{
-            "idea_title": "Innovative Idea 2 Title incorporating multi-source analysis (e.g., 'Develop AI-Powered Menu Optimization Based on Delivery Platform Performance Data')", 
-            "description_and_rationale": "Detailed explanation (200-300 words) of second innovative concept leveraging enhanced data sources..."
-        }}
-    ],
-    "long_term_vision_alignment_thoughts": [
-        {{
-            "strategic_thought_title": "Long-Term Consideration 1 Title using comprehensive analysis (e.g., 'Building a Data-Driven Multi-Platform Restaurant Ecosystem')", 
-            "elaboration": "Detailed discussion (200-300 words) on a broader strategic consideration for sustained growth over 1-3 years, incorporating insights from all enhanced data sources and competitive intelligence."
-        }}
-    ],
-    "consultants_core_empowerment_message": "Craft an impactful concluding paragraph (target 100-150 words) that motivates the owner of [This Restaurant] to take action on the identified opportunities. Reference the comprehensive data analysis that supports the recommendations, emphasize that growth is achievable with focused effort across all platforms, and subtly reinforce the value of ongoing partnership or premium tools that can leverage the enhanced data intelligence for continuous optimization."
-  }},
-  "data_synthesis_summary": {{
-    "total_data_sources_analyzed": "Number and list of all data sources used in this analysis",
-    "key_platforms_analyzed": "List of platforms analyzed (delivery platforms, social media platforms, technical systems, etc.)",
-    "competitive_intelligence_depth": "Summary of the depth and breadth of competitive analysis performed",
-    "data_confidence_score": "Assessment of data quality and confidence level (High/Medium/Low) with brief explanation"
-  }}
-}}
+Return a JSON object that follows the response schema supplied with this request. Each field's description explains exactly what to write there; every narrative field requires thorough elaboration to ensure substantial content.
 
 **Instructions for Enhanced Content Generation:**
 - **MANDATORY**: Reference and leverage ALL enhanced data sources in your analysis
 - **MANDATORY**: Use specific metrics and findings from delivery platform analysis, social media intelligence, technical health assessment, and competitive data
-- Adhere STRICTLY to the JSON output structure above
+- Adhere STRICTLY to the response schema and follow each field description
+- Produce entries for priority_rank 2 and 3 in "top_3_prioritized_opportunities" with the identical schema and level of detail as rank 1
+- Likewise produce exactly 3 entries each for "premium_analysis_teasers" (three different premium features) and "immediate_action_items_quick_wins", each following its item schema
 - Provide detailed, elaborate content for each narrative section as indicated by word count targets
 - Ground all analysis, comparisons, and recommendations in the comprehensive multi-source data provided
 - When referencing competitors, use specific performance metrics from the enhanced data analysis
@@ -2092,47 +2710,1071 @@ Return ONLY a valid JSON object with this exact structure:
 - **Critical**: More information, well-reasoned opinions using the enhanced data, and detailed explanations are better than brief or superficial statements. Depth and breadth leveraging all data sources are highly valued for making this a world-class output.
 """
 
+_LLMA6_DYNAMIC_TAIL_TMPL = _SlotTemplate("""**DATA FOR {target_restaurant_name_placeholder}:**
+
+1. **Target Restaurant Deep Dive Analysis (Enhanced with All Data Sources):**
+   {target_deep_dive_json_placeholder}
+
+2. **Competitor Snapshot Analyses (Enhanced with Multi-Platform Data):**
+   {competitor_snapshots_json_array_placeholder}
+
+3. **Screenshot Interpretation Summaries (Visual Evidence, in column form: entry i of every array belongs to screenshot_urls[i]):**
+   {screenshot_interpretation_summaries_json_placeholder}
+
+4. **Key Target Restaurant Data Points (Multi-Platform Enhanced):**
+   {key_target_restaurant_data_points_placeholder}
+""")
+
+# Identifies the prompt text plus output schema in report cache keys
+_LLMA6_PROMPT_VERSION = _template_version(
+    _LLMA6_STATIC_PREAMBLE, _LLMA6_DYNAMIC_TAIL_TMPL.template, _to_json(_LLMA6_RESPONSE_SCHEMA)
+)
+
+
+def _analysis_payload(
+    prompt: str,
+    max_tokens: int,
+    temperature: float,
+    system_instruction: Optional[str] = None,
+    response_schema: Optional[Dict[str, Any]] = None
+) -> dict:
+    """generateContent body for the LLMA-8/9 analyzer calls."""
+    generation_config = {
+        "temperature": temperature,
+        "maxOutputTokens": max_tokens,
+        "response_mime_type": "application/json"
+    }
+    if response_schema:
+        generation_config["response_schema"] = response_schema
+    payload = {
+        "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+        "generationConfig": generation_config,
+        "safetySettings": [
+            {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+            {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+            {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+            {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"}
+        ]
+    }
+    # Static instructions go in systemInstruction, so every call shares the same prefix
+    if system_instruction:
+        payload["systemInstruction"] = {"parts": [{"text": system_instruction}]}
+    return payload
+
+def _truncate(text: Optional[str], limit: int) -> str:
+    """Cut text to limit characters, marking the cut with '...'."""
+    if not text:
+        return ""
+    return text if len(text) <= limit else f"{text[:limit]}..."
+
+def _parse_schema_response(raw_text: str, function_name: str, expected_keys: List[str]) -> Optional[Dict[str, Any]]:
+    """
+    Parse a response_schema-constrained analyzer response.
+    
+    The schema makes bare JSON the normal case, so that is one orjson parse plus a key
+    check; the multi-strategy parse_llm_json_output only runs on malformed text.
+    """
+    try:
+        parsed = orjson.loads(raw_text)
+    except orjson.JSONDecodeError:
+        return parse_llm_json_output(raw_text, function_name=function_name, expected_keys=expected_keys)
+    if not isinstance(parsed, dict):
+        logger.warning(f"⚠️ {function_name} returned a JSON {type(parsed).__name__}, expected an object")
+        return None
+    missing_keys = [key for key in expected_keys if key not in parsed]
+    if missing_keys:
+        logger.warning(f"⚠️ {function_name} response is missing expected keys: {missing_keys}")
+    return parsed
+
+def _analysis_cache_key(
+    function_name: str,
+    prompt: str,
+    max_tokens: int,
+    temperature: float,
+    cache_fields: Optional[Dict[str, Any]] = None,
+    prompt_version: Optional[str] = None,
+    model: str = GEMINI_MODEL_TEXT
+) -> str:
+    """
+    Response cache key for an analyzer call.
+    
+    Keyed per calling function, so one analyzer never serves another's answer. Callers
+    that render a versioned template key on (template version, canonical data), which
+    ignores key order and formatting of the data; others on the whitespace-normalized prompt.
+    """
+    namespace = f"analysis|{function_name}|{model}|{max_tokens}|{temperature}"
+    if cache_fields is not None and prompt_version:
+        return _prompt_key(f"{namespace}|{prompt_version}", _to_json_sorted(cache_fields))
+    return _prompt_key(namespace, _WHITESPACE_RE.sub(" ", prompt).strip().encode())
+
+# LLMA-8 (operational intelligence) and LLMA-9 (content & SEO) prompts; the versions
+# key their response caches together with the data the prompt is rendered from
+_OPS_INTEL_SYSTEM_PROMPT = """You are a restaurant operations and customer-access strategist advising the owner. Using ONLY the operational data provided (business hours, contact channels, address), assess:
+
+1. Hours strategy: fit for the likely customer base and restaurant type, time periods where revenue is missed, scheduling barriers for customers.
+2. Contact effectiveness: how easily customers can reach them across channels, gaps that frustrate customers, professionalism and completeness, contact methods competitors likely offer that they lack.
+3. Customer accessibility: barriers to engaging, friction that could be reduced, gap to modern customer expectations.
+4. Missed revenue: opportunities implied by the hours and contact patterns, operational changes that would capture more business, improvements to conversion and retention.
+5. Your overall professional assessment, with 3-4 specific, actionable recommendations.
+6. Any other advice an operations consultant would give the owner.
+
+Return only a JSON object matching the response schema."""
+
+_OPS_INTEL_OUTPUT_EXAMPLE = orjson.loads("""{
+  "overall_operational_assessment": "Your concise professional judgment of their operational setup.",
+  "hours_strategy_analysis": {
+    "hours_optimization_assessment": "Analysis of current hours vs. optimal strategy",
+    "potential_missed_revenue_periods": "Time periods where they might be missing business",
+    "hours_vs_market_comparison": "How their hours compare to restaurant type standards",
+    "accessibility_convenience_issues": "Any scheduling barriers for customers"
+  },
+  "contact_effectiveness_analysis": {
+    "multi_channel_accessibility": "Assessment of how easy they are to reach",
+    "contact_gaps_identified": "Missing contact options that could frustrate customers",
+    "professionalism_completeness": "Quality of their contact information presentation",
+    "missing_contact_methods": "Contact options they should consider adding"
+  },
+  "customer_accessibility_assessment": {
+    "engagement_barriers": "Obstacles customers might face when trying to connect",
+    "convenience_improvement_areas": "Friction points that could be reduced",
+    "modern_expectations_gap": "How they compare to current customer expectations"
+  },
+  "missed_revenue_opportunities": {
+    "operational_revenue_gaps": "Revenue opportunities based on hours/contact analysis",
+    "conversion_improvement_potential": "Operational changes that could increase conversions",
+    "customer_retention_operational_factors": "How operations impact customer loyalty"
+  },
+  "operational_improvement_recommendations": [
+    {"area": "Specific operational area", "recommendation": "Detailed actionable suggestion"}
+  ],
+  "additional_operations_consultant_advice": "Any other critical operational insights or advice."
+}""")
+
+_OPS_INTEL_RESPONSE_SCHEMA = _gemini_schema_from_example(_OPS_INTEL_OUTPUT_EXAMPLE)
+
+# Only the restaurant's data varies per call; instructions and schema ride in
+# systemInstruction/response_schema, which are identical across calls
+_OPERATIONAL_INTELLIGENCE_PROMPT_TMPL = _SlotTemplate("""<operational_data>
+Business Hours: {hours_json}
+Phone Number: {phone}
+Email: {email}
+Website: {website}
+Social Media: {social_media}
+Address: {address}
+</operational_data>""")
+
+_OPERATIONAL_INTELLIGENCE_PROMPT_VERSION = _template_version(
+    _OPS_INTEL_SYSTEM_PROMPT, _OPERATIONAL_INTELLIGENCE_PROMPT_TMPL.template, _to_json(_OPS_INTEL_RESPONSE_SCHEMA)
+)
+
+_CONTENT_SEO_SYSTEM_PROMPT = """You are a restaurant digital marketing and content strategist specializing in SEO and brand storytelling, advising the owner. Using ONLY the content and SEO data provided, assess:
+
+1. Content quality: whether the messaging is compelling, clear and differentiated, how well it communicates the value proposition, whether descriptions convert visitors, which strengths to leverage.
+2. SEO: how discoverable they appear, SEO gaps, use of keywords and local SEO, improvements that would drive organic traffic.
+3. Brand story: whether the content builds an emotional connection, communicates personality and values, and is memorable; which story elements to strengthen.
+4. Content gaps and marketing opportunities: content that would better showcase their offerings, missed content marketing, better use of menu, location and unique features, content for engagement and loyalty.
+5. Your overall professional assessment, with 3-4 specific, actionable recommendations for content quality, SEO and storytelling.
+6. Any other advice a digital marketing consultant would give the owner.
+
+Return only a JSON object matching the response schema."""
+
+_CONTENT_SEO_OUTPUT_EXAMPLE = orjson.loads("""{
+  "overall_content_seo_assessment": "Your concise professional judgment of their content and SEO strategy.",
+  "content_quality_analysis": {
+    "messaging_effectiveness": "Assessment of how compelling and clear their messaging is",
+    "value_proposition_communication": "How well they communicate their unique advantages",
+    "content_engagement_potential": "Likelihood their content converts visitors to customers",
+    "leverageable_content_strengths": "Existing content assets they should amplify"
+  },
+  "seo_optimization_analysis": {
+    "online_discoverability_assessment": "How easily customers can find them online",
+    "seo_gaps_and_opportunities": "Specific SEO improvements needed",
+    "keyword_local_seo_utilization": "How well they use SEO best practices",
+    "organic_traffic_improvement_potential": "SEO changes that could drive more traffic"
+  },
+  "brand_story_analysis": {
+    "story_compelling_factor": "How engaging and memorable their brand narrative is",
+    "brand_personality_communication": "How well they express their restaurant's character",
+    "emotional_connection_potential": "Their ability to build customer relationships through content",
+    "story_strengthening_opportunities": "Narrative elements that could be enhanced"
+  },
+  "content_marketing_opportunities": {
+    "missing_content_types": "Content formats they should consider creating",
+    "underutilized_marketing_channels": "Platforms or methods they could leverage better",
+    "menu_location_feature_optimization": "How to better showcase their unique assets",
+    "engagement_loyalty_content_ideas": "Content strategies for customer retention"
+  },
+  "content_strategy_recommendations": [
+    {"focus_area": "Specific content area", "recommendation": "Detailed actionable suggestion"}
+  ],
+  "additional_digital_marketing_advice": "Any other critical content or digital marketing insights."
+}""")
+
+_CONTENT_SEO_RESPONSE_SCHEMA = _gemini_schema_from_example(_CONTENT_SEO_OUTPUT_EXAMPLE)
+
+_CONTENT_SEO_PROMPT_TMPL = _SlotTemplate("""<content_data>
+{content_summary_json}
+</content_data>""")
+
+_CONTENT_SEO_PROMPT_VERSION = _template_version(
+    _CONTENT_SEO_SYSTEM_PROMPT, _CONTENT_SEO_PROMPT_TMPL.template, _to_json(_CONTENT_SEO_RESPONSE_SCHEMA)
+)
+
+
+# Template report returned when LLMA-6 cannot produce one; built once at import time
+_FALLBACK_STRATEGIC_ANALYSIS: Dict[str, Any] = {
+    "executive_hook": {
+        "hook_statement": "While our AI analysis encountered technical difficulties, preliminary data suggests significant growth opportunities exist for this restaurant through improved digital presence and strategic positioning.",
+        "biggest_opportunity_teaser": "The most significant opportunity lies in optimizing the restaurant's online presence to capture untapped digital revenue streams."
+    },
+    "competitive_landscape_summary": {
+        "introduction": "Based on available data, this restaurant shows potential for strategic improvements in several key areas.",
+        "detailed_comparison_text": "Local market analysis indicates opportunities for differentiation and improved customer engagement through enhanced online presence and strategic messaging. While a comprehensive competitive comparison requires additional data processing, initial indicators suggest that focusing on digital optimization and customer experience enhancement could yield significant competitive advantages.",
+        "key_takeaway_for_owner": "The primary focus should be on strengthening digital presence and customer engagement capabilities to capture market opportunities."
+    },
+    "top_3_prioritized_opportunities": [
+        {
+            "priority_rank": 1,
+            "opportunity_title": "Digital Presence Enhancement",
+            "current_situation_and_problem": "Based on extracted data patterns, improving online visibility could drive significant customer acquisition.",
+            "detailed_recommendation": "1. Audit current online presence, 2. Optimize Google My Business profile, 3. Enhance website user experience",
+            "estimated_revenue_or_profit_impact": "Potential 15-25% increase in online-driven traffic within 3-6 months",
+            "ai_solution_pitch": "Our AI OrderFlow Manager and Social Spark Bot can automate online presence optimization and customer engagement.",
+            "implementation_timeline": "1-2 Months",
+            "difficulty_level": "Medium (Requires Focused Effort)",
+            "visual_evidence_suggestion": {
+                "idea_for_visual": "Before/after comparison of online presence optimization",
+                "relevant_screenshot_s3_url_from_input": None
+            }
+        },
+        {
+            "priority_rank": 2,
+            "opportunity_title": "Menu Strategy Optimization",
+            "current_situation_and_problem": "Menu presentation and pricing strategy appear to have room for optimization based on available data.",
+            "detailed_recommendation": "1. Analyze current menu performance, 2. Test pricing strategies, 3. Improve menu descriptions",
+            "estimated_revenue_or_profit_impact": "Potential 10-20% increase in average order value through strategic menu optimization",
+            "ai_solution_pitch": "Menu Optimizer Pro can analyze pricing patterns and suggest optimal menu structure and pricing.",
+            "implementation_timeline": "2-4 Weeks",
+            "difficulty_level": "Easy (Quick Wins)",
+            "visual_evidence_suggestion": {
+                "idea_for_visual": "Menu analytics dashboard showing optimization opportunities",
+                "relevant_screenshot_s3_url_from_input": None
+            }
+        },
+        {
+            "priority_rank": 3,
+            "opportunity_title": "Customer Engagement Enhancement",
+            "current_situation_and_problem": "Opportunities exist to improve customer retention and word-of-mouth marketing through enhanced engagement.",
+            "detailed_recommendation": "1. Implement customer feedback system, 2. Develop loyalty program, 3. Enhance social media presence",
+            "estimated_revenue_or_profit_impact": "Potential 20-30% improvement in customer retention and referral rates",
+            "ai_solution_pitch": "Customer Loyalty AI and Review Amplify AI can automate customer engagement and reputation management.",
+            "implementation_timeline": "1-2 Months",
+            "difficulty_level": "Medium (Requires Focused Effort)",
+            "visual_evidence_suggestion": {
+                "idea_for_visual": "Customer engagement funnel showing improvement opportunities",
+                "relevant_screenshot_s3_url_from_input": None
+            }
+        }
+    ],
+    "premium_analysis_teasers": [
+        {
+            "premium_feature_title": "Deep Dive Competitor Customer Acquisition Funnels",
+            "compelling_teaser_hook": "Discover exactly how your top competitors are attracting customers and how you can capture that same traffic.",
+            "value_proposition": "Detailed competitive intelligence that reveals specific marketing strategies and customer acquisition tactics your competitors use."
+        },
+        {
+            "premium_feature_title": "Dynamic Menu Pricing & Profitability Optimization Engine",
+            "compelling_teaser_hook": "What if you could optimize your menu pricing to maximize profit margins while maintaining customer satisfaction?",
+            "value_proposition": "AI-driven pricing analysis that identifies optimal price points for each menu item based on cost analysis and local market data."
+        },
+        {
+            "premium_feature_title": "Automated AI-Powered Review Response & Reputation Management Strategy",
+            "compelling_teaser_hook": "Never miss a customer review again and turn every piece of feedback into a business growth opportunity.",
+            "value_proposition": "Comprehensive reputation management system that monitors, responds to, and leverages customer feedback for continuous improvement."
+        }
+    ],
+    "immediate_action_items_quick_wins": [
+        {
+            "action_item": "Complete Google My Business profile optimization with current photos and information",
+            "rationale_and_benefit": "Improves local search visibility and provides customers with accurate, up-to-date information."
+        },
+        {
+            "action_item": "Implement basic website improvements for mobile responsiveness and contact clarity",
+            "rationale_and_benefit": "Ensures customers can easily find and contact the restaurant from any device."
+        },
+        {
+            "action_item": "Establish customer review response protocol and respond to recent reviews",
+            "rationale_and_benefit": "Shows commitment to customer service and can improve online reputation and search rankings."
+        }
+    ],
+    "engagement_and_consultation_questions": [
+        "What are your primary business goals for the next 12 months?",
+        "Which competitors do you consider your biggest threats and why?",
+        "What unique aspects of your restaurant do customers mention most often?"
+    ],
+    "forward_thinking_strategic_insights": {
+        "introduction": "Beyond these immediate opportunities, successful restaurants continuously adapt. Here are a few forward-thinking considerations for this restaurant:",
+        "untapped_potential_and_innovation_ideas": [
+            {
+                "idea_title": "Catering and Off-Premise Expansion",
+                "description_and_rationale": "Catering and off-premise dining opportunities may be underexplored. Many successful restaurants find that expanding into catering services can provide a significant additional revenue stream with relatively low additional overhead. This could involve developing catering packages, partnering with local businesses for corporate catering, or offering family-style take-home meal options that leverage existing kitchen capabilities while reaching new customer segments."
+            },
+            {
+                "idea_title": "Strategic Local Business Partnerships",
+                "description_and_rationale": "Strategic partnerships with local businesses could drive consistent traffic and create mutually beneficial relationships. This might include cross-promotional opportunities with nearby businesses, collaborative events, or loyalty program partnerships that help build a stronger local community presence while providing customers with added value and convenience."
+            }
+        ],
+        "long_term_vision_alignment_thoughts": [
+            {
+                "strategic_thought_title": "Building Sustainable Competitive Advantages",
+                "elaboration": "Focus on building sustainable competitive advantages through operational excellence and customer experience differentiation rather than competing solely on price. This involves developing systems and processes that consistently deliver exceptional value to customers while maintaining healthy profit margins. Consider investing in staff training, technology integration, and customer relationship management to create lasting competitive moats."
+            }
+        ],
+        "consultants_core_empowerment_message": "The opportunities identified in this analysis represent clear, actionable paths to meaningful business growth. With focused effort and strategic implementation, this restaurant can achieve significant improvements in revenue, customer satisfaction, and market position. Success lies in prioritizing the highest-impact opportunities while maintaining operational excellence in daily service delivery."
+    }
+}
+
+
+class LLMAnalyzer:
+    """
+    Handles the generation of strategic report content and screenshot analysis using LLM prompts.
+    """
+    def __init__(self):
+        self.enabled = self._initialize_gemini()
+        # LRU of fetched image bytes, so stages referencing the same screenshot read it once
+        self._image_cache: "OrderedDict[Tuple[str, Optional[float]], bytes]" = OrderedDict()
+        self._image_cache_bytes = 0
+        # Recent output token counts per analyzer function, for sizing max_tokens
+        self._token_stats: Dict[str, "deque[int]"] = defaultdict(lambda: deque(maxlen=50))
+        # Analyzer calls currently in flight, by request key
+        self._inflight: Dict[str, "asyncio.Future[Optional[str]]"] = {}
+        if self.enabled:
+            # Using Gemini 1.5 Flash for potentially faster/cheaper structured output generation and vision tasks.
+            self.vision_model = genai.GenerativeModel('gemini-1.5-flash-latest')
+            self.text_model = genai.GenerativeModel('gemini-1.5-flash-latest') # Can be same or different
+            logger.info("🤖 LLMAnalyzer initialized with Gemini models (flash for text and vision).")
+        else:
+            logger.warning("⚠️ LLMAnalyzer initialized but Gemini is not available. Strategic analysis and screenshot analysis will be skipped.")
+
+    def _initialize_gemini(self) -> bool:
+        try:
+            api_key = os.getenv('GEMINI_API_KEY')
+            if not api_key:
+                logger.warning("GEMINI_API_KEY not found. LLMAnalyzer will be disabled.")
+                return False
+            genai.configure(api_key=api_key)
+            return True
+        except Exception as e:
+            logger.error(f"❌ Failed to initialize Gemini for LLMAnalyzer: {str(e)}")
+            return False
+
+    @retry(stop=stop_after_attempt(3), wait=wait_random_exponential(multiplier=1, min=2, max=10), retry=retry_if_exception_type(_SDK_TRANSIENT_ERRORS), reraise=True)
+    async def _call_gemini_text_json_mode(self, prompt: str, max_tokens: int = 2048) -> Optional[Dict[str, Any]]:
+        """Helper to call Gemini text model and expect a JSON string which is then parsed."""
+        if not self.enabled:
+            logger.warning("Gemini disabled, skipping LLM text call.")
+            return None
+        # Report regenerations resend identical deep-dive prompts; reuse the parsed result
+        cache_key = None
+        if GEMINI_CACHE_ENABLED:
+            cache_key = _prompt_key(f"text_json|{self.text_model.model_name}|{max_tokens}", prompt.encode())
+            cached_json = await _read_cached_response(cache_key)
+            if cached_json is not None:
+                logger.info("♻️ Reusing cached Gemini TEXT response")
+                return cached_json
+        response_text = ""
+        try:
+            logger.debug(f"Submitting TEXT prompt to Gemini (JSON mode, max_tokens={max_tokens}):\n{prompt[:300]}...")
+            
+            response = await self.text_model.generate_content_async(
+                prompt,
+                generation_config=genai.types.GenerationConfig(
+                    response_mime_type="application/json", # Bare JSON output: no fences or prose to strip
+                    max_output_tokens=max_tokens,
+                    temperature=0.1 # Low temp for factual/structured output
+                ),
+                safety_settings={ # Added basic safety settings
+                    HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
+                    HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
+                    HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
+                    HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
+                }
+            )
+            
+            response_text = response.text.strip()
+            logger.debug(f"Gemini TEXT response: {response_text[:300]}...")
+            
+            parsed_json = _loads_model_json(response_text)
+            logger.info(f"Successfully parsed JSON from Gemini TEXT response.")
+            if cache_key:
+                await _write_cached_response(cache_key, parsed_json)
+            return parsed_json
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to decode JSON from Gemini TEXT response: {e}. Response text: {response_text}")
+            raise 
+        except Exception as e:
+            logger.error(f"Error calling Gemini TEXT model or processing response: {e}")
+            raise
+
+    async def _fetch_image_data(self, image_url: HttpUrl) -> Optional[bytes]:
+        """
+        Fetch image data from URL or local file path, memoized per analyzer.
+        Local files are keyed on their mtime too, so a rewritten screenshot is re-read.
+        """
+        url_str = str(image_url)
+        mtime = None
+        if url_str.startswith("file://"):
+            try:
+                mtime = os.path.getmtime(unquote(url_str.replace("file://", "")))
+            except OSError:
+                pass  # _load_image_data logs the missing file
+        cache_key = (url_str, mtime)
+        
+        image_data = self._image_cache.get(cache_key)
+        if image_data is not None:
+            self._image_cache.move_to_end(cache_key)
+            logger.info(f"♻️ Reusing cached image data for: {url_str}")
+            return image_data
+        
+        image_data = await self._load_image_data(url_str)
+        if image_data is not None:
+            # Cache the vision-sized bytes, so the resize also happens only once per image
+            image_data = await asyncio.to_thread(_downscale_for_vision, image_data)
+        if image_data is not None and len(image_data) <= _IMAGE_CACHE_MAX_BYTES:
+            self._image_cache[cache_key] = image_data
+            self._image_cache_bytes += len(image_data)
+            while len(self._image_cache) > _IMAGE_CACHE_MAXSIZE or self._image_cache_bytes > _IMAGE_CACHE_MAX_BYTES:
+                _, evicted = self._image_cache.popitem(last=False)
+                self._image_cache_bytes -= len(evicted)
+        return image_data
+
+    async def _load_image_data(self, url_str: str) -> Optional[bytes]:
+        """
+        Load image data from URL or local file path.
+        Enhanced to handle both real S3 URLs and local file paths.
+        """
+        logger.info(f"📸 Fetching image data from: {url_str}")
+        
+        # Check if it's a local file path
+        if url_str.startswith("file://"):
+            # Extract the local path from file:// URL and URL decode it
+            local_path = url_str.replace("file://", "")
+            # URL decode the path to handle %20 and other encoded characters
+            local_path = unquote(local_path)
+            logger.info(f"📂 Decoded local path: {local_path}")
+            
+            try:
+                path_obj = Path(local_path)
+                if path_obj.exists() and path_obj.is_file():
+                    logger.info(f"📁 Reading local screenshot: {local_path}")
+                    with open(path_obj, 'rb') as f:
+                        return f.read()
+                else:
+                    logger.warning(f"⚠️ Local screenshot not found: {local_path}")
+                    return None
+            except Exception as e:
+                logger.error(f"❌ Error reading local screenshot {local_path}: {e}")
+                return None
+        
+        # Check for mock/invalid URLs and skip them
+        if any(mock_indicator in url_str.lower() for mock_indicator in 
+               ["mock-restaurant-bucket", "example.com", "placeholder", "test-bucket", "fake-"]):
+            logger.warning(f"⚠️ Skipping mock/invalid URL: {url_str}")
+            return None
+            
+        # Handle real S3 or HTTP URLs
+        if url_str.startswith(("http://", "https://")):
+            try:
+                logger.info(f"🌐 Fetching remote image: {url_str}")
+                session = await _get_session()
+                async with session.get(url_str, timeout=_IMAGE_FETCH_TIMEOUT) as response:
+                    response.raise_for_status()
+                    
+                    # Check content type
+                    content_type = response.headers.get('content-type', '').lower()
+                    if not content_type.startswith('image/'):
+                        logger.warning(f"⚠️ URL returned non-image content: {content_type}")
+                        return None
+                    
+                    # Refuse declared-oversized bodies up front, then stream into one buffer
+                    # and abort as soon as an undeclared body crosses the limit
+                    if response.content_length and response.content_length > MAX_IMAGE_BYTES:
+                        logger.warning(f"⚠️ Image too large ({response.content_length} bytes): {url_str}")
+                        return None
+                    image_data = bytearray()
+                    async for chunk in response.content.iter_chunked(65536):
+                        image_data += chunk
+                        if not check_image_size_limits(image_data):
+                            return None
+                    logger.info(f"✅ Successfully fetched {len(image_data)} bytes from {url_str}")
+                    return bytes(image_data)
+                
+            except aiohttp.ClientResponseError as e:
+                logger.error(f"❌ HTTP error fetching image {url_str}: {e.status} - {e.message}")
+                return None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error(f"❌ Request error fetching image {url_str}: {e!r}")
+                return None
+            except Exception as e:
+                logger.error(f"❌ Unexpected error fetching image {url_str}: {e}")
+                return None
+        
+        logger.error(f"❌ Unsupported URL format: {url_str}")
+        return None
+
+    @retry(stop=stop_after_attempt(3), wait=wait_random_exponential(multiplier=1, min=2, max=10), retry=retry_if_exception_type(_SDK_TRANSIENT_ERRORS), reraise=True)
+    async def analyze_screenshot_with_gemini(
+        self, 
+        image_s3_url: HttpUrl, 
+        analysis_focus: str, # e.g., "menu_impression", "social_profile_check"
+        additional_context: Optional[str] = None # Optional text context for the image
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Analyzes a screenshot using Gemini Vision based on the S3 URL and analysis focus.
+        Returns a JSON summary.
+        """
+        if not self.enabled:
+            logger.warning("Gemini disabled, skipping screenshot analysis.")
+            return None
+
+        logger.info(f"📸 Starting screenshot analysis for: {image_s3_url} (Focus: {analysis_focus})")
+
+        image_bytes = await self._fetch_image_data(image_s3_url)
+        if not image_bytes:
+            return None # Error already logged by _fetch_image_data
+
+        # The SDK takes raw bytes for inline blobs, so skip the base64 round trip
+        image_part = {
+            "mime_type": _sniff_image_mime(image_bytes),
+            "data": image_bytes
+        }
+
+        # Define prompts based on analysis_focus
+        prompt_text = ""
+        if analysis_focus == "menu_impression":
+            prompt_text = f"""
+            Analyze the provided restaurant menu screenshot.
+            Focus on:
+            1.  Overall visual impression and aesthetics (e.g., cluttered, clean, modern, dated).
+            2.  Readability of text (font choices, size, contrast).
+            3.  Any obvious design flaws or strengths.
+            4.  Presence of key information like prices, item names, descriptions.
+            {f"Additional context: {additional_context}" if additional_context else ""}
+            Return a JSON object with keys: "visual_impression", "readability_assessment", "design_notes", "information_clarity", "overall_summary".
+            """
+        elif analysis_focus == "social_profile_check":
+            prompt_text = f"""
+            This screenshot is from a Google Search result, likely showing a social media profile (e.g., Instagram, Facebook, Yelp).
+            Analyze the screenshot to:
+            1.  Identify the social media platform if visible.
+            2.  Extract the username/profile name.
+            3.  Extract follower count if visible.
+            4.  Extract a snippet of the bio or description if visible.
+            5.  Note if the profile seems official or verified.
+            {f"Additional context: {additional_context}" if additional_context else ""}
+            Return a JSON object with keys: "platform_identified", "profile_name", "follower_count", "bio_snippet", "verification_status", "confidence_score" (0-1 on how confident you are about the extracted info).
+            """
+        else:
+            logger.warning(f"Unknown analysis_focus for screenshot: {analysis_focus}. Using generic prompt.")
+            prompt_text = f"""
+            Analyze the provided image. 
+            {f"Additional context: {additional_context}" if additional_context else ""}
+            Describe its content and any notable features. Return a JSON object with a "summary" key.
+            """
+        
+        # The same screenshots recur across report runs and retries; key the result on the
+        # image content plus the exact prompt, so a changed prompt or image misses
+        cache_key = None
+        if GEMINI_CACHE_ENABLED:
+            cache_key = _prompt_key(
+                f"vision_analysis|{self.vision_model.model_name}|{_template_version(prompt_text)}",
+                image_bytes
+            )
+            cached_analysis = await _read_cached_response(cache_key)
+            if cached_analysis is not None:
+                logger.info(f"♻️ Reusing cached VISION analysis for {image_s3_url} (Focus: {analysis_focus})")
+                return cached_analysis
+        
+        # Bound before the call so the handlers below can't hit an UnboundLocalError
+        # (which would mask a transient error from the retry policy)
+        response = None
+        response_text = ""
+        try:
+            logger.debug(f"Submitting VISION prompt to Gemini (Focus: {analysis_focus}):\n{prompt_text[:300]}...")
+            response = await self.vision_model.generate_content_async(
+                [prompt_text, image_part], # Multimodal content: text prompt + image
+                generation_config=genai.types.GenerationConfig(
+                    response_mime_type="application/json", # _loads_model_json still tolerates fenced output
+                    max_output_tokens=1024,
+                    temperature=0.2 # Slightly higher temp for descriptive tasks if needed, but keep low for JSON
+                ),
+                 safety_settings={
+                    HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
+                    HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
+                    HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
+                    HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
+                }
+            )
+            response_text = response.text.strip()
+            logger.debug(f"Gemini VISION response: {response_text[:300]}...")
+
+            parsed_json = _loads_model_json(response_text)
+            logger.info(f"✅ Successfully parsed JSON from Gemini VISION response for focus '{analysis_focus}'.")
+            if cache_key:
+                await _write_cached_response(cache_key, parsed_json)
+            return parsed_json
+
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to decode JSON from Gemini VISION response (Focus: {analysis_focus}): {e}. Response text: {response_text}")
+            return {"error": f"JSON decode error: {e}", "raw_output": response_text}
+        except Exception as e:
+            # Catching specific Google API errors if possible, e.g., response.prompt_feedback
+            if response is not None and getattr(response, 'prompt_feedback', None) and response.prompt_feedback.block_reason:
+                 logger.error(f"Gemini VISION call blocked. Reason: {response.prompt_feedback.block_reason_message or response.prompt_feedback.block_reason}")
+                 return {"error": "Content blocked by API", "block_reason": str(response.prompt_feedback.block_reason)}
+
+            logger.error(f"Error calling Gemini VISION model (Focus: {analysis_focus}): {e}")
+            # Attempt to log parts of the exception that might be Google API specific errors
+            if hasattr(e, 'message'): logger.error(f"  Error details: {e.message}")
+
+            raise # Re-raised; tenacity retries it only if it's a transient error
+
+    def _build_restaurant_context(self, restaurant_data: FinalRestaurantOutput) -> Dict[str, Any]:
+        """
+        Collect the restaurant fields shared by the deep-dive and main recommendations prompts.
+        Built once per report so misc_structured_data and menu_items are only walked once.
+        """
+        misc = getattr(restaurant_data, 'misc_structured_data', None) or {}
+        places = restaurant_data.google_places_summary or {}
+        menu_items = restaurant_data.menu_items or []
+        return {
+            "basic_info": {
+                "name": restaurant_data.restaurant_name,
+                "description": restaurant_data.description_short or restaurant_data.description_long_ai_generated,
+                "cuisine_type": restaurant_data.primary_cuisine_type_ai,
+                "price_range": restaurant_data.price_range_ai,
+                "website_url": str(restaurant_data.website_url),
+            },
+            "menu_items_count": len(menu_items),
+            # Longest slice any prompt uses; callers cut it down further
+            "menu_items": [{"name": item.name, "price": item.price, "description": item.description} for item in menu_items[:15]],
+            "google_rating": places.get("rating"),
+            "google_review_count": places.get("reviews_count"),
+            "google_place_id": places.get("place_id"),
+            "delivery_platform_analysis": misc.get('delivery_platform_analysis', {}),
+            "social_media_analysis": misc.get('social_media_analysis', {}),
+            "stagehand_comprehensive": misc.get('stagehand_comprehensive', {}),
+            "technical_health": misc.get('technical_health', {}),
+            "delivery_competitors": misc.get('identified_competitors_delivery', []),
+            "social_media_links": restaurant_data.social_media_links or {},
+            "identified_competitors": [{"name": comp.name, "url": str(comp.url) if comp.url else None} for comp in restaurant_data.identified_competitors_basic or []],
+        }
+
+    def _restaurant_data_prompt_prefix(self, context: Dict[str, Any]) -> str:
+        """
+        Render the restaurant data block that opens both the deep-dive and the main
+        recommendations prompts. Sending it once as an identical leading prefix lets
+        Gemini reuse its prompt-prefix cache for the second call instead of the data
+        being re-sent in a differently shaped blob.
+        """
+        restaurant_context = {
+            "basic_info": {
+                **context["basic_info"],
+                "menu_items_count": context["menu_items_count"],
+                "actual_menu_items": context["menu_items"]
+            },
+            "google_presence": {
+                "rating": context["google_rating"],
+                "reviews_count": context["google_review_count"],
+                "place_id": context["google_place_id"]
+            },
+            "delivery_platform_analysis": context["delivery_platform_analysis"],
+            "social_media_analysis": context["social_media_analysis"],
+            "comprehensive_stagehand_data": context["stagehand_comprehensive"],
+            "technical_health": context["technical_health"],
+            "social_media_links": context["social_media_links"],
+            "competitive_data": {
+                "identified_competitors": context["identified_competitors"],
+                "delivery_platform_competitors": context["delivery_competitors"]
+            }
+        }
+        # misc_structured_data blobs (delivery, social, Stagehand) can run to hundreds of KB;
+        # cap strings and lists before they reach the prompt
+        restaurant_json = _to_json(_compress_for_prompt(_drop_empty(restaurant_context)))
+        logger.info(f"📦 Restaurant data for prompt: {len(restaurant_json)} chars")
+        return f"""
+        Comprehensive Restaurant Data (delivery platform presence, social media analysis, competitive intelligence, technical insights):
+        {restaurant_json}
+        """
+
+    async def _generate_target_restaurant_deep_dive(
+        self,
+        restaurant_data: FinalRestaurantOutput,
+        context: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Generate deep dive analysis for the target restaurant"""
+        logger.info(f"🧠 Generating Target Restaurant Deep Dive for: {restaurant_data.restaurant_name}")
+        
+        if context is None:
+            context = self._build_restaurant_context(restaurant_data)
+        
+        prompt = self._restaurant_data_prompt_prefix(context) + _DEEP_DIVE_PROMPT
+        
+        return await self._call_gemini_text_json_mode(prompt, max_tokens=2048)
+
+    async def _generate_all_competitor_snapshots(
+        self,
+        competitors: List[CompetitorSummary],
+        target_restaurant_name: str
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Analyze all competitors in one Gemini call, amortizing per-request overhead.
+        Returns one entry per competitor in input order; None where the batch had no
+        usable result, so the caller can fall back to _generate_competitor_snapshot.
+        """
+        logger.info(f"🧠 Generating {len(competitors)} Competitor Snapshots in one call (vs {target_restaurant_name})")
+        
+        # Indexed rather than matched by name, since competitor names can repeat
+        competitors_json = _to_json([
+            {"competitor_index": i, **competitor.model_dump(mode="json", exclude_none=True)}
+            for i, competitor in enumerate(competitors)
+        ])
+        prompt = f"""
+        Analyze each of the following competitors to "{target_restaurant_name}".
+        Based *only* on the information given for each, identify its apparent key strengths and key weaknesses relative to a typical restaurant or from the perspective of a customer choosing between options.
+
+        Competitors Data:
+        {competitors_json}
+
+        Return a JSON array with one object per competitor, each with the following keys:
+        - "competitor_index": the competitor_index from the input
+        - "competitor_name": the competitor's name
+        - "key_strengths": [list of strings]
+        - "key_weaknesses": [list of strings]
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(competitors)
+        try:
+            analysis_result = await self._call_gemini_text_json_mode(prompt, max_tokens=min(512 * len(competitors), 8192))
+        except Exception as e:
+            logger.warning(f"⚠️ Batched competitor snapshots failed, falling back to per-competitor calls: {e}")
+            return results
+        
+        for entry in analysis_result if isinstance(analysis_result, list) else []:
+            if not isinstance(entry, dict) or "key_strengths" not in entry or "key_weaknesses" not in entry:
+                continue
+            index = entry.get("competitor_index")
+            if isinstance(index, int) and 0 <= index < len(competitors) and results[index] is None:
+                results[index] = {
+                    "competitor_name": competitors[index].name,
+                    "key_strengths": entry["key_strengths"],
+                    "key_weaknesses": entry["key_weaknesses"],
+                }
+        return results
+
+    async def _generate_competitor_snapshot(self, competitor_data: CompetitorSummary, target_restaurant_name: str) -> Optional[Dict[str, Any]]:
+        """Prompt 2.2: Analyze each competitor in FinalRestaurantOutput.competitors."""
+        logger.info(f"🧠 Generating Competitor Snapshot for: {competitor_data.name} (vs {target_restaurant_name})")
+        
+        # Serialize straight to compact JSON, leaving out unset (None) fields
+        prompt_json = competitor_data.model_dump_json(exclude_none=True)
+
+        # Everything before the competitor data is identical for every competitor of this
+        # target, so the per-competitor calls in a run share a cacheable prompt prefix
+        prompt = f"""
+        Analyze the provided data for a competitor to "{target_restaurant_name}".
+        Based *only* on this information, identify its apparent key strengths and key weaknesses relative to a typical restaurant or from the perspective of a customer choosing between options.
+
+        Return a JSON object with the following keys:
+        - "competitor_name": the competitor's name from the data
+        - "key_strengths": [list of strings]
+        - "key_weaknesses": [list of strings]
+
+        Competitor Data:
+        {prompt_json}
+        """
+        analysis_result = await self._call_gemini_text_json_mode(prompt, max_tokens=512)
+        if analysis_result and "key_strengths" in analysis_result and "key_weaknesses" in analysis_result:
+            # Update the Pydantic model passed by reference (if it is) or return for caller to update
+            # For safety, let's assume the caller will handle updating the original competitor_data model
+            # The returned dict here will be used by the caller.
+            return {
+                "competitor_name": competitor_data.name, # ensure name is part of the returned dict
+                "key_strengths": analysis_result["key_strengths"],
+                "key_weaknesses": analysis_result["key_weaknesses"],
+            }
+        logger.warning(f"Could not fully analyze competitor {competitor_data.name}. Result: {analysis_result}")
+        return None
+
+
+    async def _generate_main_strategic_recommendations(
+        self, 
+        target_analysis: Dict[str, Any], 
+        competitor_analyses: List[Dict[str, Any]], 
+        restaurant_data: FinalRestaurantOutput, 
+        screenshot_analysis_results: Dict[HttpUrl, Dict[str, Any]], # Changed key from str to HttpUrl
+        context: Optional[Dict[str, Any]] = None
+    ) -> Optional[LLMStrategicAnalysisOutput]:
+        """Generate strategic recommendations based on all analysis"""
+        logger.info(f"🧠 Generating Main Strategic Recommendations for: {restaurant_data.restaurant_name}")
+        
+        if context is None:
+            context = self._build_restaurant_context(restaurant_data)
+        
+        # The restaurant data itself goes in the shared prefix; this block only adds what
+        # the deep dive didn't see
+        analysis_context = {
+            "deep_dive_analysis": target_analysis,
+            "local_competitor_analyses": competitor_analyses,
+            "total_competitors_analyzed": len(competitor_analyses) + len(context["delivery_competitors"]),
+            "screenshot_insights": screenshot_analysis_results,
+            "data_completeness": {
+                "has_menu": context["menu_items_count"] > 0,
+                "has_social_media": bool(restaurant_data.social_media_links),
+                "has_google_presence": bool(restaurant_data.google_places_summary),
+                "has_delivery_platform_data": bool(context["delivery_platform_analysis"]),
+                "has_technical_analysis": bool(context["technical_health"]),
+                "has_screenshots": bool(restaurant_data.website_screenshots_s3_urls)
+            }
+        }
+
+        prompt = self._restaurant_data_prompt_prefix(context) + _MAIN_RECOMMENDATIONS_PROMPT_TMPL.format_map({
+            "restaurant_name": restaurant_data.restaurant_name,
+            "analysis_context_json": _to_json(analysis_context),
+            "screenshots_analyzed": len(screenshot_analysis_results),
+            "competitors_analyzed": analysis_context["total_competitors_analyzed"],
+            "delivery_platforms_json": _to_json(list(context["delivery_platform_analysis"])),
+            "social_platforms_json": _to_json(list(context["social_media_analysis"])),
+        })
+        
+        # The timestamp is stamped here rather than sent in the prompt, which would make
+        # every prompt unique and the text-JSON cache unable to ever hit
+        strategic_analysis_dict = await self._call_gemini_text_json_mode(prompt, max_tokens=3072)
+        
+        if strategic_analysis_dict:
+            metadata = strategic_analysis_dict.get("analysis_metadata")
+            if not isinstance(metadata, dict):
+                metadata = strategic_analysis_dict["analysis_metadata"] = {}
+            metadata["generated_at"] = datetime.now().isoformat()
+            try:
+                return LLMStrategicAnalysisOutput(**strategic_analysis_dict)
+            except Exception as e: 
+                logger.error(f"Failed to create LLMStrategicAnalysisOutput: {e}")
+                return None 
+        
+        return None
+
+    async def generate_strategic_report_content(
+        self, 
+        final_restaurant_data: FinalRestaurantOutput, 
+        # screenshot_analysis_results: Dict[HttpUrl, Dict[str, Any]] # Keyed by S3 URL (HttpUrl)
+        # This now will be populated by calling analyze_screenshot_with_gemini internally if screenshots exist
+    ) -> Optional[LLMStrategicAnalysisOutput]:
+        """
+        Phase B: LLM Strategic Analysis
+        Main orchestration method for generating strategic analysis
+        """
+        if not self.enabled:
+            logger.warning("🤖 LLM Analyzer is disabled (no API key)")
+            return None
+
+        logger.info(f"📝 Starting strategic report content generation for {final_restaurant_data.restaurant_name}")
+        start_time = datetime.now()
+        
+        try:
+            # Shared by the deep dive and the main recommendations prompt
+            restaurant_context = self._build_restaurant_context(final_restaurant_data)
+            
+            # Phase B1: Screenshot Analysis (if available)
+            async def _analyze_screenshots() -> Dict[HttpUrl, Dict[str, Any]]:
+                screenshot_analyses: Dict[HttpUrl, Dict[str, Any]] = {}
+                screenshot_infos = final_restaurant_data.website_screenshots_s3_urls
+                if not screenshot_infos:
+                    return screenshot_analyses
+                
+                logger.info(f"📸 Analyzing {len(screenshot_infos)} screenshots...")
+                
+                # Bound in-flight vision calls so large screenshot sets stay within rate limits
+                semaphore = asyncio.Semaphore(8)
+                
+                async def _analyze_one_screenshot(screenshot_info) -> Optional[Dict[str, Any]]:
+                    # Determine analysis focus based on caption/metadata
+                    caption = (screenshot_info.caption or "").lower()
+                    analysis_focus = next(
+                        (focus for keyword, focus in _SCREENSHOT_FOCUS_KEYWORDS.items() if keyword in caption),
+                        "homepage_impression"
+                    )
+                    
+                    context_for_vision = f"This is for the restaurant: {final_restaurant_data.restaurant_name}."
+                    
+                    async with semaphore:
+                        return await self.analyze_screenshot_with_gemini(
+                            screenshot_info.s3_url,
+                            analysis_focus,
+                            context_for_vision
+                        )
+                
+                # Screenshots are independent, so fetch and analyze them concurrently
+                # over the shared session
+                results = await asyncio.gather(
+                    *(_analyze_one_screenshot(info) for info in screenshot_infos),
+                    return_exceptions=True
+                )
+                for screenshot_info, screenshot_analysis in zip(screenshot_infos, results):
+                    if isinstance(screenshot_analysis, BaseException):
+                        logger.error(f"❌ Error analyzing screenshot {screenshot_info.s3_url}: {str(screenshot_analysis)}")
+                    elif screenshot_analysis:
+                        screenshot_analyses[screenshot_info.s3_url] = screenshot_analysis
+                        logger.info(f"✅ Analyzed screenshot: {screenshot_info.s3_url}")
+                    else:
+                        logger.warning(f"⚠️ Failed to analyze screenshot: {screenshot_info.s3_url}")
+                return screenshot_analyses
+            
+            # Phase B2: Target Restaurant Deep Dive
+            async def _deep_dive() -> Dict[str, Any]:
+                logger.info("🧠 Generating target restaurant deep dive...")
+                target_deep_dive = await self._generate_target_restaurant_deep_dive(final_restaurant_data, restaurant_context)
+                if not target_deep_dive:
+                    logger.warning("⚠️ Target restaurant deep dive failed")
+                    target_deep_dive = {"analysis": "Basic analysis could not be generated"}
+                return target_deep_dive
+            
+            # Phase B3: Competitor Analysis
+            async def _analyze_competitors() -> List[Dict[str, Any]]:
+                competitor_snapshots: List[Dict[str, Any]] = []
+                competitors = final_restaurant_data.identified_competitors_basic
+                if not competitors:
+                    return competitor_snapshots
+                
+                logger.info(f"🏢 Analyzing {len(competitors)} competitors...")
+                target_restaurant_name = final_restaurant_data.restaurant_name or "the target restaurant"
+                
+                # One batched call covers every competitor when the model answers fully
+                results: List[Any] = [None] * len(competitors)
+                if len(competitors) > 1:
+                    results = await self._generate_all_competitor_snapshots(competitors, target_restaurant_name)
+                
+                # Anything the batch missed gets its own call; overlap those, capped to stay within quota
+                competitor_semaphore = asyncio.Semaphore(4)
+                
+                async def _snapshot_one_competitor(competitor: CompetitorSummary) -> Optional[Dict[str, Any]]:
+                    async with competitor_semaphore:
+                        return await self._generate_competitor_snapshot(competitor, target_restaurant_name)
+                
+                missing = [i for i, result in enumerate(results) if result is None]
+                fallback_results = await asyncio.gather(
+                    *(_snapshot_one_competitor(competitors[i]) for i in missing),
+                    return_exceptions=True
+                )
+                for i, result in zip(missing, fallback_results):
+                    results[i] = result
+                for competitor, competitor_analysis in zip(competitors, results):
+                    if isinstance(competitor_analysis, BaseException):
+                        logger.error(f"❌ Error analyzing competitor {competitor.name}: {str(competitor_analysis)}")
+                    elif competitor_analysis:
+                        competitor_snapshots.append(competitor_analysis)
+                        logger.info(f"✅ Analyzed competitor: {competitor.name}")
+                    else:
+                        logger.warning(f"⚠️ Failed to analyze competitor: {competitor.name}")
+                return competitor_snapshots
+            
+            # B1-B3 only depend on the scraped data, not on each other, so run them
+            # concurrently; B4 is the only phase that needs all three results
+            screenshot_analyses, target_deep_dive, competitor_snapshots = await asyncio.gather(
+                _analyze_screenshots(),
+                _deep_dive(),
+                _analyze_competitors()
+            )
+            
+            # Phase B4: Generate Main Strategic Recommendations
+            logger.info("🎯 Generating main strategic recommendations...")
+            llm_strategic_output = await self._generate_main_strategic_recommendations(
+                target_analysis=target_deep_dive,
+                competitor_analyses=competitor_snapshots,
+                restaurant_data=final_restaurant_data,
+                screenshot_analysis_results=screenshot_analyses,
+                context=restaurant_context
+            )
+            
+            if not llm_strategic_output:
+                logger.warning("⚠️ Main strategic recommendations failed to generate")
+                return None
+            
+            logger.info("✅ Main strategic recommendations generated successfully")
+            return llm_strategic_output
+        
+        except Exception as e:
+            logger.error(f"❌ Exception in strategic report content generation: {str(e)}")
+            return None
+
+    async def generate_main_strategic_recommendations(
+        self, 
+        target_deep_dive: Dict[str, Any],
+        competitor_snapshots: List[Dict[str, Any]], 
+        screenshot_analyses: Dict[str, Any],
+        target_summary: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        LLMA-6: Main Comparative & Strategic Recommendation Engine (THE GRAND SUMMARY)
+        
+        This is the ultimate synthesis prompt that creates the final strategic report
+        combining all previous analyses into actionable business intelligence.
+        """
+        logger.info("🎯 Generating main strategic recommendations (LLMA-6: Grand Summary)")
+        
+        # Nothing to synthesize: skip the long Gemini call and return the template report
+        if not target_deep_dive and not competitor_snapshots and not screenshot_analyses:
+            logger.warning("⚠️ LLMA-6 has no deep dive, competitors or screenshots, returning fallback analysis")
+            return self._create_fallback_strategic_analysis()
+        # With only the deep dive to work from, the lighter model is enough
+        model = GEMINI_MODEL_TEXT if competitor_snapshots or screenshot_analyses else GEMINI_MODEL_TEXT_LITE
+        
         # Extract restaurant name for placeholder
         target_restaurant_name_placeholder = target_summary.get('name', '[This Restaurant]')
         
-        # Prepare JSON string inputs for the prompt
-        target_deep_dive_json_str = json.dumps(target_deep_dive, indent=2)
-        competitor_snapshots_json_array_str = json.dumps(competitor_snapshots, indent=2)
-        
-        # Prepare screenshot summaries
-        screenshot_summaries_json_str = "{}"
+        # Serialize each prompt input exactly once, as compact JSON with sorted keys: the same
+        # bytes fill the prompt and fingerprint the report cache, and key order differences
+        # between runs don't produce a cache miss. Indentation would roughly double the token
+        # count of these blocks without helping the model.
+        target_deep_dive_json = _to_json_sorted(target_deep_dive)
+        competitor_snapshots_json = _to_json_sorted(competitor_snapshots)
+        screenshot_summaries_json = b"{}"
         if screenshot_analyses:
-            screenshot_summaries_json_str = json.dumps(screenshot_analyses, indent=2)
-        
-        # Prepare key target restaurant data
-        key_target_data = {
-            "name": target_summary.get('name', 'Unknown Restaurant'),
-            "url": target_summary.get('website', 'Not available'),
-            "menu_item_count": len(target_summary.get('menu_items', [])),
-            "google_rating": target_summary.get('google_rating', 'Not available'),
-            "google_review_count": target_summary.get('total_reviews', 'Not available'),
-            "primary_cuisine_types": target_summary.get('cuisine_types', ['Not specified']),
-            "screenshots_available_count": len(screenshot_analyses) if screenshot_analyses else 0
-        }
-        key_target_restaurant_data_points_json_str = json.dumps(key_target_data, indent=2)
-        
-        # Populate the main prompt template
-        prompt = LLMA_6_MAIN_STRATEGIC_PROMPT_TEMPLATE.format(
-            target_restaurant_name_placeholder=target_restaurant_name_placeholder,
-            target_deep_dive_json_placeholder=target_deep_dive_json_str,
-            competitor_snapshots_json_array_placeholder=competitor_snapshots_json_array_str,
-            screenshot_interpretation_summaries_json_placeholder=screenshot_summaries_json_str,
-            key_target_restaurant_data_points_placeholder=key_target_restaurant_data_points_json_str
+            ordered_screenshots = dict(sorted(screenshot_analyses.items(), key=lambda item: str(item[0])))
+            screenshot_summaries_json = _to_json_sorted(_rows_to_columns(ordered_screenshots, "screenshot_urls"))
+        key_target_data_json = _to_json_sorted(
+            _key_target_data(target_summary, len(screenshot_analyses) if screenshot_analyses else 0)
         )
         
+        report_cache_key = None
+        if GEMINI_CACHE_ENABLED:
+            report_cache_key = _prompt_key(
+                f"llma6|{model}|{_LLMA6_PROMPT_VERSION}",
+                b"\x1e".join((target_deep_dive_json, competitor_snapshots_json, screenshot_summaries_json, key_target_data_json))
+            )
+            cached_report = await _read_cached_response(report_cache_key, ttl=GEMINI_REPORT_CACHE_TTL_SECONDS)
+            if cached_report is not None:
+                logger.info(f"♻️ LLMA-6 report cache hit ({report_cache_key})")
+                return cached_report
+        
+        # Populate the per-call tail; the static preamble is sent as-is ahead of it
+        prompt_tail = _LLMA6_DYNAMIC_TAIL_TMPL.format_map({
+            "target_restaurant_name_placeholder": target_restaurant_name_placeholder,
+            "target_deep_dive_json_placeholder": target_deep_dive_json.decode(),
+            "competitor_snapshots_json_array_placeholder": competitor_snapshots_json.decode(),
+            "screenshot_interpretation_summaries_json_placeholder": screenshot_summaries_json.decode(),
+            "key_target_restaurant_data_points_placeholder": key_target_data_json.decode(),
+        })
+        
         try:
             # Call Gemini with enhanced generation config for strategic analysis
             payload = {
-                "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+                "contents": [{"role": "user", "parts": [{"text": _LLMA6_STATIC_PREAMBLE}, {"text": prompt_tail}]}],
                 "generationConfig": {
                     "temperature": 0.2,  # Slightly higher for creative strategic thinking
                     "maxOutputTokens": 8192,  # High token limit for comprehensive analysis
-                    "response_mime_type": "application/json"  # Request JSON output format
+                    "response_mime_type": "application/json",  # Request JSON output format
+                    # Constrained decoding against the report schema (kept out of the prompt text)
+                    "response_schema": _LLMA6_RESPONSE_SCHEMA
                 },
                 "safetySettings": [
                     {
@@ -2154,176 +3796,216 @@ Return ONLY a valid JSON object with this exact structure:
                 ]
             }
             
-            logger.info(f"🔗 Making LLMA-6 strategic recommendations API request")
+            logger.info(f"🔗 Making LLMA-6 strategic recommendations API request ({model})")
+            
+            # Shared module session: keeps the TLS connection to the Gemini API warm across calls
+            session = await _get_session()
+            cached_content_name = await get_cached_content_name(session, model, _LLMA6_STATIC_PREAMBLE)
+            if cached_content_name:
+                payload["cachedContent"] = cached_content_name
+                payload["contents"] = [{"role": "user", "parts": [{"text": prompt_tail}]}]
             
-            async with aiohttp.ClientSession() as session:
-                response_data = await make_gemini_request(session, GEMINI_MODEL_TEXT, payload, timeout=300)
+            expected_keys = [
+                "executive_hook", "competitive_landscape_summary", "top_3_prioritized_opportunities",
+                "premium_analysis_teasers", "immediate_action_items_quick_wins", 
+                "engagement_and_consultation_questions", "forward_thinking_strategic_insights"
+            ]
+            
+            parsed_result = None
+            # Sections are parsed as they stream in, so a truncated or malformed
+            # response still yields every section that completed; keep the most
+            # complete attempt's sections for salvage
+            best_stream = _TopLevelMemberStream()
+            for attempt in range(2):
+                member_stream = _TopLevelMemberStream()
+                try:
+                    # The grand summary is the longest call in the pipeline, so hedge its tail latency
+                    response_data = await make_hedged_gemini_request(
+                        session, model, payload, timeout=300, member_stream=member_stream
+                    )
+                except Exception as e:
+                    # Sections that streamed in before the failure can still be salvaged below
+                    logger.error(f"❌ LLMA-6 request failed: {str(e)}")
+                    response_data = None
+                if len(member_stream.members) > len(best_stream.members):
+                    best_stream = member_stream
+                if response_data is None:
+                    break
                 
                 if response_data.get("error"):
                     logger.error(f"❌ LLMA-6 API error: {response_data['error']}")
                     return self._create_fallback_strategic_analysis()
                 
-                # Extract and parse response using robust JSON parsing
-                if 'candidates' in response_data and len(response_data['candidates']) > 0:
-                    candidate = response_data['candidates'][0]
-                    if 'content' in candidate and 'parts' in candidate['content']:
-                        raw_text = candidate['content']['parts'][0]['text']
-                        
-                        # Use robust JSON parsing utilities
-                        expected_keys = [
-                            "executive_hook", "competitive_landscape_summary", "top_3_prioritized_opportunities",
-                            "premium_analysis_teasers", "immediate_action_items_quick_wins", 
-                            "engagement_and_consultation_questions", "forward_thinking_strategic_insights"
-                        ]
-                        
-                        parsed_result = parse_llm_json_output(
+                candidates = response_data.get("candidates") or [{}]
+                parts = candidates[0].get("content", {}).get("parts") or [{}]
+                raw_text = parts[0].get("text", "")
+                
+                # The response schema makes the output plain JSON, so parse it strictly
+                try:
+                    parsed_result = orjson.loads(raw_text)
+                except orjson.JSONDecodeError as e:
+                    logger.warning(f"⚠️ LLMA-6 response is not valid JSON ({len(raw_text)} chars): {e}")
+                    if GEMINI_LENIENT_JSON_PARSE:
+                        # Diagnostics only: the recovery parser's fallbacks scan the text
+                        # repeatedly, so keep that work off the event loop
+                        parsed_result = await asyncio.to_thread(
+                            parse_llm_json_output,
                             raw_text,
                             function_name="generate_main_strategic_recommendations",
                             expected_keys=expected_keys
                         )
-                        
-                        if not parsed_result:
-                            logger.error("❌ Failed to parse LLMA-6 strategic recommendations JSON")
-                            return self._create_fallback_strategic_analysis()
-                        
-                        # Validate structure
-                        if not validate_json_structure(parsed_result, expected_keys, "generate_main_strategic_recommendations"):
-                            logger.warning("⚠️ LLMA-6 strategic recommendations missing some expected keys, proceeding with available data")
-                        
-                        # Log successful generation
-                        logger.info("✅ Successfully generated main strategic recommendations")
-                        logger.info(f"📊 Generated {len(parsed_result.get('top_3_prioritized_opportunities', []))} growth opportunities")
-                        logger.info(f"📊 Generated {len(parsed_result.get('immediate_action_items_quick_wins', []))} immediate action items")
-                        
-                        return parsed_result
-                
+                if isinstance(parsed_result, dict) and parsed_result:
+                    break
+                parsed_result = None
+                if attempt == 0:
+                    logger.warning("🔁 Retrying LLMA-6 once at temperature 0.0")
+                    payload["generationConfig"] = {**payload["generationConfig"], "temperature": 0.0}
+            
+            if not parsed_result and best_stream.members:
+                logger.warning(f"⚠️ LLMA-6 JSON incomplete, using {len(best_stream.members)} sections parsed from the stream")
+                parsed_result = dict(best_stream.members)
+            
+            if not parsed_result:
+                logger.error("❌ Failed to parse LLMA-6 strategic recommendations JSON")
+                return self._create_fallback_strategic_analysis()
+            
+            # Validate structure
+            if not validate_json_structure(parsed_result, expected_keys, "generate_main_strategic_recommendations"):
+                logger.warning("⚠️ LLMA-6 strategic recommendations missing some expected keys, proceeding with available data")
+            
+            # Log successful generation
+            logger.info("✅ Successfully generated main strategic recommendations")
+            logger.info(f"📊 Generated {len(parsed_result.get('top_3_prioritized_opportunities', []))} growth opportunities")
+            logger.info(f"📊 Generated {len(parsed_result.get('immediate_action_items_quick_wins', []))} immediate action items")
+            
+            if report_cache_key:
+                await _write_cached_response(report_cache_key, parsed_result)
+            return parsed_result
+            
         except Exception as e:
             logger.error(f"❌ Exception in LLMA-6 main strategic recommendations generation: {str(e)}")
             return self._create_fallback_strategic_analysis()
 
     def _create_fallback_strategic_analysis(self) -> Dict[str, Any]:
         """Create fallback strategic analysis if main generation fails"""
+        # Fresh tree per call so callers can annotate the report without touching the template
+        return copy.deepcopy(_FALLBACK_STRATEGIC_ANALYSIS)
+
+    async def run_all_analyses(
+        self,
+        restaurant_data: Dict[str, Any],
+        target_deep_dive: Dict[str, Any],
+        competitor_snapshots: List[Dict[str, Any]],
+        screenshot_analyses: Dict[str, Any]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Run LLMA-6, LLMA-8 and LLMA-9 concurrently.
+
+        The three analyses read disjoint inputs and produce disjoint sections, so the
+        wall-clock cost is the slowest call rather than the sum. A failure in one
+        analysis degrades only its own section.
+        """
+        logger.info("🚀 Running LLMA-6/8/9 analyses concurrently")
+        strategic, operational, content_seo = await asyncio.gather(
+            self.generate_main_strategic_recommendations(
+                target_deep_dive, competitor_snapshots, screenshot_analyses, restaurant_data
+            ),
+            self.analyze_operational_intelligence(restaurant_data),
+            self.analyze_content_and_seo_strategy(restaurant_data),
+            return_exceptions=True
+        )
+
+        if isinstance(strategic, BaseException):
+            logger.error(f"❌ LLMA-6 failed during concurrent run: {strategic}")
+            strategic = self._create_fallback_strategic_analysis()
+        if isinstance(operational, BaseException):
+            logger.error(f"❌ LLMA-8 failed during concurrent run: {operational}")
+            operational = {}
+        if isinstance(content_seo, BaseException):
+            logger.error(f"❌ LLMA-9 failed during concurrent run: {content_seo}")
+            content_seo = {}
+
         return {
-            "executive_hook": {
-                "hook_statement": "While our AI analysis encountered technical difficulties, preliminary data suggests significant growth opportunities exist for this restaurant through improved digital presence and strategic positioning.",
-                "biggest_opportunity_teaser": "The most significant opportunity lies in optimizing the restaurant's online presence to capture untapped digital revenue streams."
-            },
-            "competitive_landscape_summary": {
-                "introduction": "Based on available data, this restaurant shows potential for strategic improvements in several key areas.",
-                "detailed_comparison_text": "Local market analysis indicates opportunities for differentiation and improved customer engagement through enhanced online presence and strategic messaging. While a comprehensive competitive comparison requires additional data processing, initial indicators suggest that focusing on digital optimization and customer experience enhancement could yield significant competitive advantages.",
-                "key_takeaway_for_owner": "The primary focus should be on strengthening digital presence and customer engagement capabilities to capture market opportunities."
-            },
-            "top_3_prioritized_opportunities": [
-                {
-                    "priority_rank": 1,
-                    "opportunity_title": "Digital Presence Enhancement",
-                    "current_situation_and_problem": "Based on extracted data patterns, improving online visibility could drive significant customer acquisition.",
-                    "detailed_recommendation": "1. Audit current online presence, 2. Optimize Google My Business profile, 3. Enhance website user experience",
-                    "estimated_revenue_or_profit_impact": "Potential 15-25% increase in online-driven traffic within 3-6 months",
-                    "ai_solution_pitch": "Our AI OrderFlow Manager and Social Spark Bot can automate online presence optimization and customer engagement.",
-                    "implementation_timeline": "1-2 Months",
-                    "difficulty_level": "Medium (Requires Focused Effort)",
-                    "visual_evidence_suggestion": {
-                        "idea_for_visual": "Before/after comparison of online presence optimization",
-                        "relevant_screenshot_s3_url_from_input": None
-                    }
-                },
-                {
-                    "priority_rank": 2,
-                    "opportunity_title": "Menu Strategy Optimization",
-                    "current_situation_and_problem": "Menu presentation and pricing strategy appear to have room for optimization based on available data.",
-                    "detailed_recommendation": "1. Analyze current menu performance, 2. Test pricing strategies, 3. Improve menu descriptions",
-                    "estimated_revenue_or_profit_impact": "Potential 10-20% increase in average order value through strategic menu optimization",
-                    "ai_solution_pitch": "Menu Optimizer Pro can analyze pricing patterns and suggest optimal menu structure and pricing.",
-                    "implementation_timeline": "2-4 Weeks",
-                    "difficulty_level": "Easy (Quick Wins)",
-                    "visual_evidence_suggestion": {
-                        "idea_for_visual": "Menu analytics dashboard showing optimization opportunities",
-                        "relevant_screenshot_s3_url_from_input": None
-                    }
-                },
-                {
-                    "priority_rank": 3,
-                    "opportunity_title": "Customer Engagement Enhancement",
-                    "current_situation_and_problem": "Opportunities exist to improve customer retention and word-of-mouth marketing through enhanced engagement.",
-                    "detailed_recommendation": "1. Implement customer feedback system, 2. Develop loyalty program, 3. Enhance social media presence",
-                    "estimated_revenue_or_profit_impact": "Potential 20-30% improvement in customer retention and referral rates",
-                    "ai_solution_pitch": "Customer Loyalty AI and Review Amplify AI can automate customer engagement and reputation management.",
-                    "implementation_timeline": "1-2 Months",
-                    "difficulty_level": "Medium (Requires Focused Effort)",
-                    "visual_evidence_suggestion": {
-                        "idea_for_visual": "Customer engagement funnel showing improvement opportunities",
-                        "relevant_screenshot_s3_url_from_input": None
-                    }
-                }
-            ],
-            "premium_analysis_teasers": [
-                {
-                    "premium_feature_title": "Deep Dive Competitor Customer Acquisition Funnels",
-                    "compelling_teaser_hook": "Discover exactly how your top competitors are attracting customers and how you can capture that same traffic.",
-                    "value_proposition": "Detailed competitive intelligence that reveals specific marketing strategies and customer acquisition tactics your competitors use."
-                },
-                {
-                    "premium_feature_title": "Dynamic Menu Pricing & Profitability Optimization Engine",
-                    "compelling_teaser_hook": "What if you could optimize your menu pricing to maximize profit margins while maintaining customer satisfaction?",
-                    "value_proposition": "AI-driven pricing analysis that identifies optimal price points for each menu item based on cost analysis and local market data."
-                },
-                {
-                    "premium_feature_title": "Automated AI-Powered Review Response & Reputation Management Strategy",
-                    "compelling_teaser_hook": "Never miss a customer review again and turn every piece of feedback into a business growth opportunity.",
-                    "value_proposition": "Comprehensive reputation management system that monitors, responds to, and leverages customer feedback for continuous improvement."
-                }
-            ],
-            "immediate_action_items_quick_wins": [
-                {
-                    "action_item": "Complete Google My Business profile optimization with current photos and information",
-                    "rationale_and_benefit": "Improves local search visibility and provides customers with accurate, up-to-date information."
-                },
-                {
-                    "action_item": "Implement basic website improvements for mobile responsiveness and contact clarity",
-                    "rationale_and_benefit": "Ensures customers can easily find and contact the restaurant from any device."
-                },
-                {
-                    "action_item": "Establish customer review response protocol and respond to recent reviews",
-                    "rationale_and_benefit": "Shows commitment to customer service and can improve online reputation and search rankings."
-                }
-            ],
-            "engagement_and_consultation_questions": [
-                "What are your primary business goals for the next 12 months?",
-                "Which competitors do you consider your biggest threats and why?",
-                "What unique aspects of your restaurant do customers mention most often?"
-            ],
-            "forward_thinking_strategic_insights": {
-                "introduction": "Beyond these immediate opportunities, successful restaurants continuously adapt. Here are a few forward-thinking considerations for this restaurant:",
-                "untapped_potential_and_innovation_ideas": [
-                    {
-                        "idea_title": "Catering and Off-Premise Expansion",
-                        "description_and_rationale": "Catering and off-premise dining opportunities may be underexplored. Many successful restaurants find that expanding into catering services can provide a significant additional revenue stream with relatively low additional overhead. This could involve developing catering packages, partnering with local businesses for corporate catering, or offering family-style take-home meal options that leverage existing kitchen capabilities while reaching new customer segments."
-                    },
-                    {
-                        "idea_title": "Strategic Local Business Partnerships",
-                        "description_and_rationale": "Strategic partnerships with local businesses could drive consistent traffic and create mutually beneficial relationships. This might include cross-promotional opportunities with nearby businesses, collaborative events, or loyalty program partnerships that help build a stronger local community presence while providing customers with added value and convenience."
-                    }
-                ],
-                "long_term_vision_alignment_thoughts": [
-                    {
-                        "strategic_thought_title": "Building Sustainable Competitive Advantages",
-                        "elaboration": "Focus on building sustainable competitive advantages through operational excellence and customer experience differentiation rather than competing solely on price. This involves developing systems and processes that consistently deliver exceptional value to customers while maintaining healthy profit margins. Consider investing in staff training, technology integration, and customer relationship management to create lasting competitive moats."
-                    }
-                ],
-                "consultants_core_empowerment_message": "The opportunities identified in this analysis represent clear, actionable paths to meaningful business growth. With focused effort and strategic implementation, this restaurant can achieve significant improvements in revenue, customer satisfaction, and market position. Success lies in prioritizing the highest-impact opportunities while maintaining operational excellence in daily service delivery."
-            }
+            "strategic_recommendations": strategic,
+            "operational_intelligence": operational,
+            "content_and_seo_strategy": content_seo,
         }
 
-    async def analyze_operational_intelligence(self, restaurant_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def analyze_restaurants_in_batch(self, restaurants: List[Dict[str, Any]]) -> List[Dict[str, Dict[str, Any]]]:
         """
-        LLMA-8: Contact & Hours Intelligence Analysis
-        
-        Analyzes business hours, contact methods, and accessibility patterns
-        for operational optimization insights.
+        LLMA-8/9 for a queue of restaurants, via one discounted Gemini batch job.
+
+        With GEMINI_BATCH_ANALYSES enabled, uncached requests are submitted as a batch and
+        the responses land in the analyzer response cache under the keys _call_gemini_async
+        reads, so the per-restaurant analyzers below find them there. Anything the batch
+        did not produce in time is requested in real time.
         """
-        logger.info("🕒 Analyzing operational intelligence (LLMA-8)")
-        
+        if GEMINI_BATCH_ANALYSES and GEMINI_CACHE_ENABLED and self.enabled and restaurants:
+            try:
+                await self._prefill_analyses_from_batch(restaurants)
+            except Exception as e:
+                logger.warning(f"⚠️ Batch LLMA-8/9 analysis failed, using real-time requests: {e}")
+
+        semaphore = asyncio.Semaphore(4)
+
+        async def _analyze_one(restaurant_data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+            async with semaphore:
+                operational, content_seo = await asyncio.gather(
+                    self.analyze_operational_intelligence(restaurant_data),
+                    self.analyze_content_and_seo_strategy(restaurant_data)
+                )
+            return {"operational_intelligence": operational, "content_and_seo_strategy": content_seo}
+
+        return await asyncio.gather(*(_analyze_one(r) for r in restaurants))
+
+    async def _prefill_analyses_from_batch(self, restaurants: List[Dict[str, Any]]) -> None:
+        """Submit uncached LLMA-8/9 requests as one batch job and cache the responses."""
+        analyses = (
+            ("analyze_operational_intelligence", self._operational_intelligence_request, _OPERATIONAL_INTELLIGENCE_PROMPT_VERSION,
+             _OPS_INTEL_SYSTEM_PROMPT, _OPS_INTEL_RESPONSE_SCHEMA),
+            ("analyze_content_and_seo_strategy", self._content_seo_request, _CONTENT_SEO_PROMPT_VERSION,
+             _CONTENT_SEO_SYSTEM_PROMPT, _CONTENT_SEO_RESPONSE_SCHEMA),
+        )
+        # A batch job runs against one model, so requests are grouped by their routed tier
+        batches: Dict[str, Tuple[List[str], List[dict]]] = defaultdict(lambda: ([], []))
+        seen = set()
+        for restaurant_data in restaurants:
+            for function_name, build_request, prompt_version, system_instruction, response_schema in analyses:
+                prompt, cache_fields, model = build_request(restaurant_data)
+                # Same max_tokens/temperature as the analyzers, so the keys match theirs
+                cache_key = _analysis_cache_key(function_name, prompt, 2048, 0.1, cache_fields, prompt_version, model)
+                if cache_key in seen or await _read_cached_response(cache_key, ttl=GEMINI_ANALYSIS_CACHE_TTL_SECONDS):
+                    continue
+                seen.add(cache_key)
+                batches[model][0].append(cache_key)
+                batches[model][1].append(_analysis_payload(prompt, 2048, 0.1, system_instruction, response_schema))
+        if not batches:
+            return
+
+        session = await _get_session()
+        models = list(batches)
+        all_responses = await asyncio.gather(*(
+            make_gemini_batch_request(session, model, batches[model][1], display_name="restaurant-analyses")
+            for model in models
+        ))
+        produced = 0
+        for model, responses in zip(models, all_responses):
+            if responses is None:
+                continue
+            for cache_key, response_data in zip(batches[model][0], responses):
+                # Truncated or blocked answers are left for the real-time path to request again
+                if not _is_complete_response(response_data):
+                    continue
+                candidates = (response_data or {}).get("candidates") or [{}]
+                parts = candidates[0].get("content", {}).get("parts") or [{}]
+                raw_text = parts[0].get("text")
+                if raw_text:
+                    await _write_cached_response(cache_key, {"text": raw_text})
+                    produced += 1
+        logger.info(f"✅ Batch produced {produced}/{len(seen)} LLMA-8/9 analyses")
+
+    def _operational_intelligence_request(self, restaurant_data: Dict[str, Any]) -> Tuple[str, Dict[str, Any], str]:
+        """LLMA-8 prompt, the fields that key its cached response, and the model to use."""
         # Extract relevant operational data
         hours = restaurant_data.get('hours', {})
         phone = restaurant_data.get('phone')
@@ -2332,108 +4014,86 @@ Return ONLY a valid JSON object with this exact structure:
         social_media = restaurant_data.get('social_media', [])
         address = restaurant_data.get('address')
         
-        prompt = f"""You are an expert Restaurant Operations and Customer Access Strategist. Your goal is to help a restaurant owner optimize their operational setup for maximum customer convenience and revenue generation.
-
-Analyze the provided contact information, business hours, and accessibility data for [This Restaurant].
-
-<operational_data>
-Business Hours: {json.dumps(hours, indent=2) if hours else 'Not available'}
-Phone Number: {phone or 'Not available'}
-Email: {email or 'Not available'}  
-Website: {website or 'Not available'}
-Social Media: {social_media if social_media else 'Not available'}
-Address: {address or 'Not available'}
-</operational_data>
-
-Based SOLELY on the operational data provided, provide a detailed analysis focusing on:
-
-1. **Hours Strategy Assessment (Detailed):**
-   - Are their operating hours optimized for their likely customer base and market segment?
-   - Do they appear to be missing potential revenue opportunities during specific time periods?
-   - How do their hours compare to typical patterns for their restaurant type?
-   - Are there any accessibility or convenience issues with their current schedule?
-
-2. **Contact Method Effectiveness (Detailed):**
-   - How easy is it for customers to reach them through multiple channels?
-   - Are there gaps in their contact options that could frustrate potential customers?
-   - Is their contact information professional and complete?
-   - What contact methods might they be missing that competitors likely have?
-
-3. **Customer Accessibility & Convenience (Detailed):**
-   - Based on available information, what barriers might exist for customers trying to engage?
-   - Are there convenience factors that could be improved to reduce customer friction?
-   - How does their accessibility compare to modern customer expectations?
-
-4. **Missed Revenue Opportunities (Detailed):**
-   - Based on hours and contact patterns, what revenue opportunities might they be missing?
-   - Are there operational adjustments that could capture more business?
-   - What specific improvements could increase customer conversion and retention?
-
-5. **Overall Assessment & Improvement Opinions:**
-   - What is your overall professional assessment of their operational accessibility and customer convenience?
-   - Provide 3-4 specific, actionable recommendations to improve their operational setup for better customer experience and revenue generation.
+        operational_fields = {
+            "hours": hours, "phone": phone, "email": email,
+            "website": website, "social_media": social_media, "address": address,
+        }
+        prompt = _OPERATIONAL_INTELLIGENCE_PROMPT_TMPL.format_map({
+            "hours_json": _to_json(hours) if hours else 'Not available',
+            "phone": phone or 'Not available',
+            "email": email or 'Not available',
+            "website": website or 'Not available',
+            "social_media": _to_json(social_media) if social_media else 'Not available',
+            "address": address or 'Not available',
+        })
+        # With at most one populated field the analysis is mostly generic advice,
+        # which the lighter model handles as well
+        populated = sum(1 for value in operational_fields.values() if value)
+        model = GEMINI_MODEL_TEXT if populated > 1 else GEMINI_MODEL_TEXT_LITE
+        return prompt, operational_fields, model
 
-6. **Anything Else an Operations Consultant Would Tell the Owner?**
-   - Based on this operational data, are there any other critical insights or advice a professional operations consultant would offer?
+    def _content_seo_request(self, restaurant_data: Dict[str, Any]) -> Tuple[str, Dict[str, Any], str]:
+        """LLMA-9 prompt, the content summary that keys its cached response, and the model to use."""
+        # Extract relevant content data
+        website = restaurant_data.get('website')
+        description = restaurant_data.get('description', '')
+        about_text = restaurant_data.get('about_text', '')
+        tagline = restaurant_data.get('tagline', '')
+        menu_items = restaurant_data.get('menu_items', [])
+        social_media = restaurant_data.get('social_media', [])
+        seo_data = restaurant_data.get('seo_data', {})
+        
+        # Prepare content summary
+        content_summary = {
+            'website_url': website,
+            'description_text': _truncate(description, 500),
+            'about_text': _truncate(about_text, 500),
+            'tagline': tagline,
+            'menu_items_count': len(menu_items),
+            'social_media_presence': len(social_media),
+            'seo_elements': seo_data
+        }
 
-Return your analysis ONLY as a valid JSON object with the following exact structure:
+        prompt = _CONTENT_SEO_PROMPT_TMPL.format_map({"content_summary_json": _to_json(content_summary)})
+        # Without any copy or menu there is no content to critique in depth
+        model = GEMINI_MODEL_TEXT if description or about_text or tagline or menu_items else GEMINI_MODEL_TEXT_LITE
+        return prompt, content_summary, model
 
-{{
-  "overall_operational_assessment": "Your concise professional judgment of their operational setup.",
-  "hours_strategy_analysis": {{
-    "hours_optimization_assessment": "Analysis of current hours vs. optimal strategy",
-    "potential_missed_revenue_periods": "Time periods where they might be missing business",
-    "hours_vs_market_comparison": "How their hours compare to restaurant type standards",
-    "accessibility_convenience_issues": "Any scheduling barriers for customers"
-  }},
-  "contact_effectiveness_analysis": {{
-    "multi_channel_accessibility": "Assessment of how easy they are to reach",
-    "contact_gaps_identified": "Missing contact options that could frustrate customers", 
-    "professionalism_completeness": "Quality of their contact information presentation",
-    "missing_contact_methods": "Contact options they should consider adding"
-  }},
-  "customer_accessibility_assessment": {{
-    "engagement_barriers": "Obstacles customers might face when trying to connect",
-    "convenience_improvement_areas": "Friction points that could be reduced",
-    "modern_expectations_gap": "How they compare to current customer expectations"
-  }},
-  "missed_revenue_opportunities": {{
-    "operational_revenue_gaps": "Revenue opportunities based on hours/contact analysis",
-    "conversion_improvement_potential": "Operational changes that could increase conversions",
-    "customer_retention_operational_factors": "How operations impact customer loyalty"
-  }},
-  "operational_improvement_recommendations": [
-    {{"area": "Specific operational area", "recommendation": "Detailed actionable suggestion"}},
-    {{"area": "Specific operational area", "recommendation": "Detailed actionable suggestion"}},
-    {{"area": "Specific operational area", "recommendation": "Detailed actionable suggestion"}}
-  ],
-  "additional_operations_consultant_advice": "Any other critical operational insights or advice."
-}}"""
+    async def analyze_operational_intelligence(self, restaurant_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        LLMA-8: Contact & Hours Intelligence Analysis
+        
+        Analyzes business hours, contact methods, and accessibility patterns
+        for operational optimization insights.
+        """
+        logger.info("🕒 Analyzing operational intelligence (LLMA-8)")
+        prompt, operational_fields, model = self._operational_intelligence_request(restaurant_data)
 
         try:
             raw_response = await self._call_gemini_async(
                 prompt,
                 max_tokens=2048,
                 temperature=0.1,
-                function_name="analyze_operational_intelligence"
+                function_name="analyze_operational_intelligence",
+                cache_fields=operational_fields,
+                prompt_version=_OPERATIONAL_INTELLIGENCE_PROMPT_VERSION,
+                system_instruction=_OPS_INTEL_SYSTEM_PROMPT,
+                response_schema=_OPS_INTEL_RESPONSE_SCHEMA,
+                model=model
             )
             
             if not raw_response:
                 logger.error("❌ No response from Gemini for operational intelligence analysis")
                 return {}
             
-            # Parse using robust JSON utilities
+            # Schema-constrained output: strict parse, lenient recovery only if malformed
             expected_keys = [
                 "overall_operational_assessment", "hours_strategy_analysis", 
                 "contact_effectiveness_analysis", "customer_accessibility_assessment",
                 "missed_revenue_opportunities", "operational_improvement_recommendations"
             ]
             
-            parsed_result = parse_llm_json_output(
-                raw_response,
-                function_name="analyze_operational_intelligence",
-                expected_keys=expected_keys
-            )
+            parsed_result = _parse_schema_response(raw_response, "analyze_operational_intelligence", expected_keys)
             
             if parsed_result:
                 logger.info("✅ Successfully analyzed operational intelligence")
@@ -2454,128 +4114,33 @@ Return your analysis ONLY as a valid JSON object with the following exact struct
         and content marketing optimization insights.
         """
         logger.info("📝 Analyzing content and SEO strategy (LLMA-9)")
-        
-        # Extract relevant content data
-        website = restaurant_data.get('website')
-        description = restaurant_data.get('description', '')
-        about_text = restaurant_data.get('about_text', '')
-        tagline = restaurant_data.get('tagline', '')
-        menu_items = restaurant_data.get('menu_items', [])
-        social_media = restaurant_data.get('social_media', [])
-        seo_data = restaurant_data.get('seo_data', {})
-        
-        # Prepare content summary
-        content_summary = {
-            'website_url': website,
-            'description_text': description[:500] + '...' if len(description) > 500 else description,
-            'about_text': about_text[:500] + '...' if len(about_text) > 500 else about_text,
-            'tagline': tagline,
-            'menu_items_count': len(menu_items),
-            'social_media_presence': len(social_media),
-            'seo_elements': seo_data
-        }
-
-        prompt = f"""You are an expert Restaurant Digital Marketing and Content Strategist specializing in SEO optimization and compelling brand storytelling. Your goal is to help a restaurant owner enhance their online content strategy for better discoverability and customer engagement.
-
-Analyze the provided website content, descriptions, and online presence for [This Restaurant].
-
-<content_data>
-{json.dumps(content_summary, indent=2)}
-</content_data>
-
-Based SOLELY on the content and SEO data provided, provide a detailed analysis focusing on:
-
-1. **Content Quality Assessment (Detailed):**
-   - Is their messaging compelling, clear, and differentiated?
-   - How effectively do they communicate their unique value proposition?
-   - Are their descriptions engaging and likely to convert visitors to customers?
-   - What content strengths can they leverage further?
-
-2. **SEO Optimization Level (Detailed):**
-   - Based on available data, how discoverable do they appear to be online?
-   - Are there obvious SEO gaps or opportunities for improved search visibility?
-   - How well do they utilize keywords and local SEO principles?
-   - What SEO improvements could drive more organic traffic?
-
-3. **Brand Story Effectiveness (Detailed):**
-   - Does their content tell a compelling restaurant story that builds emotional connection?
-   - Are they effectively communicating their brand personality and values?
-   - How memorable and distinctive is their brand narrative?
-   - What story elements could be strengthened or better highlighted?
-
-4. **Content Gaps & Marketing Opportunities (Detailed):**
-   - What types of content could better showcase their offerings and attract customers?
-   - Are there content marketing opportunities they're missing?
-   - How could they better leverage their menu, location, or unique features in content?
-   - What content could improve customer engagement and loyalty?
-
-5. **Overall Assessment & Content Strategy Recommendations:**
-   - What is your overall professional assessment of their content and SEO strategy?
-   - Provide 3-4 specific, actionable recommendations to improve their content quality, SEO performance, and brand storytelling.
-
-6. **Anything Else a Digital Marketing Consultant Would Tell the Owner?**
-   - Based on this content analysis, are there any other critical insights or advanced strategies a professional digital marketing consultant would recommend?
-
-Return your analysis ONLY as a valid JSON object with the following exact structure:
-
-{{
-  "overall_content_seo_assessment": "Your concise professional judgment of their content and SEO strategy.",
-  "content_quality_analysis": {{
-    "messaging_effectiveness": "Assessment of how compelling and clear their messaging is",
-    "value_proposition_communication": "How well they communicate their unique advantages",
-    "content_engagement_potential": "Likelihood their content converts visitors to customers",
-    "leverageable_content_strengths": "Existing content assets they should amplify"
-  }},
-  "seo_optimization_analysis": {{
-    "online_discoverability_assessment": "How easily customers can find them online",
-    "seo_gaps_and_opportunities": "Specific SEO improvements needed",
-    "keyword_local_seo_utilization": "How well they use SEO best practices",
-    "organic_traffic_improvement_potential": "SEO changes that could drive more traffic"
-  }},
-  "brand_story_analysis": {{
-    "story_compelling_factor": "How engaging and memorable their brand narrative is",
-    "brand_personality_communication": "How well they express their restaurant's character",
-    "emotional_connection_potential": "Their ability to build customer relationships through content",
-    "story_strengthening_opportunities": "Narrative elements that could be enhanced"
-  }},
-  "content_marketing_opportunities": {{
-    "missing_content_types": "Content formats they should consider creating",
-    "underutilized_marketing_channels": "Platforms or methods they could leverage better",
-    "menu_location_feature_optimization": "How to better showcase their unique assets",
-    "engagement_loyalty_content_ideas": "Content strategies for customer retention"
-  }},
-  "content_strategy_recommendations": [
-    {{"focus_area": "Specific content area", "recommendation": "Detailed actionable suggestion"}},
-    {{"focus_area": "Specific content area", "recommendation": "Detailed actionable suggestion"}},
-    {{"focus_area": "Specific content area", "recommendation": "Detailed actionable suggestion"}}
-  ],
-  "additional_digital_marketing_advice": "Any other critical content or digital marketing insights."
-}}"""
+        prompt, content_summary, model = self._content_seo_request(restaurant_data)
 
         try:
             raw_response = await self._call_gemini_async(
                 prompt,
                 max_tokens=2048,
                 temperature=0.1,
-                function_name="analyze_content_and_seo_strategy"
+                function_name="analyze_content_and_seo_strategy",
+                cache_fields=content_summary,
+                prompt_version=_CONTENT_SEO_PROMPT_VERSION,
+                system_instruction=_CONTENT_SEO_SYSTEM_PROMPT,
+                response_schema=_CONTENT_SEO_RESPONSE_SCHEMA,
+                model=model
             )
             
             if not raw_response:
                 logger.error("❌ No response from Gemini for content and SEO analysis")
                 return {}
             
-            # Parse using robust JSON utilities
+            # Schema-constrained output: strict parse, lenient recovery only if malformed
             expected_keys = [
                 "overall_content_seo_assessment", "content_quality_analysis",
                 "seo_optimization_analysis", "brand_story_analysis", 
                 "content_marketing_opportunities", "content_strategy_recommendations"
             ]
             
-            parsed_result = parse_llm_json_output(
-                raw_response,
-                function_name="analyze_content_and_seo_strategy",
-                expected_keys=expected_keys
-            )
+            parsed_result = _parse_schema_response(raw_response, "analyze_content_and_seo_strategy", expected_keys)
             
             if parsed_result:
                 logger.info("✅ Successfully analyzed content and SEO strategy")
@@ -2588,13 +4153,28 @@ Return your analysis ONLY as a valid JSON object with the following exact struct
             logger.error(f"❌ Exception in content and SEO analysis: {str(e)}")
             return {}
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10), retry=retry_if_exception_type(Exception))
+    def _output_token_budget(self, function_name: str, max_tokens: int) -> int:
+        """max_tokens, raised to 1.2x the p95 of this function's recent output lengths."""
+        samples = sorted(self._token_stats[function_name])
+        if not samples:
+            return max_tokens
+        p95 = samples[int(0.95 * (len(samples) - 1))]
+        return max(max_tokens, min(int(p95 * 1.2), GEMINI_MAX_OUTPUT_TOKENS_CEILING))
+
+    # No retry decorator here: make_gemini_request already retries 429/5xx, connection
+    # errors and timeouts with jittered, Retry-After-aware backoff under the shared rate
+    # limiter. Retrying again at this level multiplied that budget and retried 4xx too.
     async def _call_gemini_async(
         self,
         prompt: str,
         max_tokens: int = 2048,
         temperature: float = 0.1,
-        function_name: str = "llm_call"
+        function_name: str = "llm_call",
+        cache_fields: Optional[Dict[str, Any]] = None,
+        prompt_version: Optional[str] = None,
+        system_instruction: Optional[str] = None,
+        response_schema: Optional[Dict[str, Any]] = None,
+        model: str = GEMINI_MODEL_TEXT
     ) -> Optional[str]:
         """
         Helper method to call Gemini with standardized configuration and robust error handling.
@@ -2604,6 +4184,13 @@ Return your analysis ONLY as a valid JSON object with the following exact struct
             max_tokens: Maximum output tokens
             temperature: Temperature for response generation
             function_name: Name of calling function for logging
+            cache_fields: The variable data the prompt was rendered from; with
+                prompt_version, keys the response cache instead of the prompt text
+            prompt_version: Version of the template the prompt was rendered from
+                (covering any system instruction and schema)
+            system_instruction: Static instructions sent as the systemInstruction
+            response_schema: Gemini response schema constraining the JSON output
+            model: Gemini model to call (GEMINI_MODEL_TEXT_LITE for sparse inputs)
             
         Returns:
             Raw text response from Gemini or None if failed
@@ -2611,44 +4198,110 @@ Return your analysis ONLY as a valid JSON object with the following exact struct
         if not self.enabled:
             logger.warning(f"Gemini disabled, skipping {function_name}")
             return None
+        
+        # One key both for the response cache and for joining an in-flight request
+        request_key = _analysis_cache_key(function_name, prompt, max_tokens, temperature, cache_fields, prompt_version, model)
+        cache_key = request_key if GEMINI_CACHE_ENABLED else None
+        if cache_key:
+            cached = await _read_cached_response(cache_key, ttl=GEMINI_ANALYSIS_CACHE_TTL_SECONDS)
+            if cached is not None and cached.get("text"):
+                logger.info(f"♻️ Reusing cached {function_name} response ({cache_key})")
+                return cached["text"]
+        
+        # Single-flight: concurrent callers for the same request share one API call.
+        # No await between the lookup and the insert, so this needs no lock.
+        request = self._inflight.get(request_key)
+        if request is None:
+            request = asyncio.ensure_future(self._request_gemini_text(
+                prompt, max_tokens, temperature, function_name, cache_key, system_instruction, response_schema, model
+            ))
+            self._inflight[request_key] = request
             
+            def _end_flight(task: asyncio.Task) -> None:
+                self._inflight.pop(request_key, None)
+                # Retrieve the exception so it isn't reported as never retrieved when
+                # every caller was cancelled before the request failed
+                if not task.cancelled():
+                    task.exception()
+            
+            request.add_done_callback(_end_flight)
+        else:
+            logger.info(f"🔁 Joining in-flight {function_name} request ({request_key})")
+        # Shielded so one caller being cancelled doesn't cancel the call the others await
+        return await asyncio.shield(request)
+    
+    async def _request_gemini_text(
+        self,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        function_name: str,
+        cache_key: Optional[str],
+        system_instruction: Optional[str],
+        response_schema: Optional[Dict[str, Any]],
+        model: str
+    ) -> Optional[str]:
+        """The Gemini call behind _call_gemini_async; caches the raw text under cache_key."""
         try:
-            logger.info(f"🔗 Making Gemini API call for {function_name}")
+            logger.info(f"🔗 Making Gemini API call for {function_name} ({model})")
             logger.debug(f"📝 Prompt length: {len(prompt)} characters")
             
-            payload = {
-                "contents": [{"role": "user", "parts": [{"text": prompt}]}],
-                "generationConfig": {
-                    "temperature": temperature,
-                    "maxOutputTokens": max_tokens,
-                    "response_mime_type": "application/json"
-                },
-                "safetySettings": [
-                    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-                    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-                    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-                    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"}
-                ]
-            }
+            # Cache keys stay on the requested budget; only the request is sized up
+            payload = _analysis_payload(
+                prompt, self._output_token_budget(function_name, max_tokens), temperature,
+                system_instruction, response_schema
+            )
             
-            async with aiohttp.ClientSession() as session:
-                response_data = await make_gemini_request(session, GEMINI_MODEL_TEXT, payload, timeout=300)
-                
-                if response_data.get("error"):
-                    logger.error(f"❌ {function_name} API error: {response_data['error']}")
-                    return None
-                
-                # Extract response text
-                if 'candidates' in response_data and len(response_data['candidates']) > 0:
-                    candidate = response_data['candidates'][0]
-                    if 'content' in candidate and 'parts' in candidate['content']:
-                        raw_text = candidate['content']['parts'][0]['text']
-                        logger.info(f"✅ {function_name} API call successful")
-                        logger.debug(f"📄 Response length: {len(raw_text)} characters")
-                        return raw_text
-                
-                logger.error(f"❌ Invalid response structure from {function_name}")
+            # Shared keep-alive session: no per-call TCP/TLS handshake, and concurrent
+            # analyzers draw from one connection pool
+            session = await _get_session()
+            # Sections are parsed as they stream in, overlapping the parse with the
+            # download; they also survive a response that is cut off or stalls
+            member_stream = _TopLevelMemberStream()
+            try:
+                response_data = await make_gemini_request(session, model, payload, timeout=300, member_stream=member_stream)
+            except Exception as e:
+                if not member_stream.members:
+                    raise
+                logger.warning(
+                    f"⚠️ {function_name} stream failed ({e}); using {len(member_stream.members)} "
+                    f"sections received: {', '.join(member_stream.members)}"
+                )
+                return orjson.dumps(member_stream.members).decode()
+            
+            if response_data.get("error"):
+                logger.error(f"❌ {function_name} API error: {response_data['error']}")
                 return None
+            
+            # Extract response text
+            if 'candidates' in response_data and len(response_data['candidates']) > 0:
+                candidate = response_data['candidates'][0]
+                if 'content' in candidate and 'parts' in candidate['content']:
+                    raw_text = candidate['content']['parts'][0]['text']
+                    output_tokens = response_data.get('usageMetadata', {}).get('candidatesTokenCount')
+                    if output_tokens:
+                        self._token_stats[function_name].append(output_tokens)
+                    
+                    # A response cut off at the token limit is invalid JSON; keep the sections
+                    # that completed rather than discarding the paid-for call. Neither this
+                    # cache nor make_gemini_request's stores non-STOP responses, so the next
+                    # call requests the full answer again, with a larger budget.
+                    if candidate.get('finishReason') == 'MAX_TOKENS':
+                        salvaged = member_stream.members
+                        logger.warning(
+                            f"⚠️ {function_name} hit the output token limit; salvaged "
+                            f"{len(salvaged)} sections: {', '.join(salvaged) or 'none'}"
+                        )
+                        return orjson.dumps(salvaged).decode() if salvaged else raw_text
+                    
+                    logger.info(f"✅ {function_name} API call successful")
+                    logger.debug(f"📄 Response length: {len(raw_text)} characters")
+                    if cache_key and raw_text and _is_complete_response(response_data):
+                        await _write_cached_response(cache_key, {"text": raw_text})
+                    return raw_text
+            
+            logger.error(f"❌ Invalid response structure from {function_name}")
+            return None
                 
         except Exception as e:
             logger.error(f"❌ Exception in {function_name}: {str(e)}")
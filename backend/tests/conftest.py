@@ -0,0 +1,23 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Unit tests import the package directly from the backend directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from restaurant_consultant import llm_analyzer_module  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def isolated_gemini_cache(tmp_path, monkeypatch):
+    """Point the on-disk Gemini response cache at a per-test directory."""
+    monkeypatch.setattr(llm_analyzer_module, "GEMINI_CACHE_DIR", tmp_path / "gemini_cache")
+    return tmp_path / "gemini_cache"
+
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    """An enabled LLMAnalyzer; configuring the SDK makes no network calls."""
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+    return llm_analyzer_module.LLMAnalyzer()
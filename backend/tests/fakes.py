@@ -0,0 +1,80 @@
+"""Minimal stand-ins for the aiohttp session used by the Gemini REST helpers."""
+import asyncio
+from typing import Any, List, Optional
+
+import orjson
+
+
+def sse_lines(chunks: List[dict], split_data: bool = False) -> List[bytes]:
+    """Encode chunks as SSE events; split_data pretty-prints each one over several data: lines."""
+    lines: List[bytes] = []
+    for chunk in chunks:
+        if split_data:
+            body = orjson.dumps(chunk, option=orjson.OPT_INDENT_2)
+            lines += [b"data: " + part + b"\n" for part in body.split(b"\n")]
+        else:
+            lines.append(b"data: " + orjson.dumps(chunk) + b"\n")
+        lines.append(b"\n")
+    return lines
+
+
+def text_chunks(*texts: str, finish_reason: Optional[str] = "STOP") -> List[dict]:
+    """streamGenerateContent chunks carrying texts, the last one with finish_reason."""
+    chunks = [{"candidates": [{"content": {"parts": [{"text": text}]}}]} for text in texts]
+    if finish_reason:
+        chunks[-1]["candidates"][0]["finishReason"] = finish_reason
+    return chunks
+
+
+class _FakeContent:
+    def __init__(self, lines: List[bytes]):
+        self._lines = lines
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for line in self._lines:
+            # An exception among the lines breaks the stream off at that point
+            if isinstance(line, BaseException):
+                raise line
+            yield line
+
+
+class _FakeResponse:
+    def __init__(self, outcome: Any, delay: float):
+        self._outcome = outcome
+        self._delay = delay
+        self.content = _FakeContent(outcome if isinstance(outcome, list) else [])
+
+    async def __aenter__(self):
+        if self._delay:
+            await asyncio.sleep(self._delay)
+        if isinstance(self._outcome, BaseException):
+            raise self._outcome
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def raise_for_status(self) -> None:
+        pass
+
+
+class FakeGeminiSession:
+    """Serves one scripted outcome per POST: a list of SSE lines, or an exception to raise.
+
+    A list of lines may end in an exception to fail the response mid-stream.
+
+    delays optionally holds, per POST, how long the response takes to arrive.
+    """
+
+    def __init__(self, *outcomes: Any, delays: Optional[List[float]] = None):
+        self.outcomes = list(outcomes)
+        self.delays = list(delays or [])
+        self.posts = 0
+
+    def post(self, url: str, **kwargs) -> _FakeResponse:
+        self.posts += 1
+        delay = self.delays.pop(0) if self.delays else 0.0
+        return _FakeResponse(self.outcomes.pop(0), delay)
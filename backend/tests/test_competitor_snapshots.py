@@ -0,0 +1,18 @@
+import asyncio
+
+from restaurant_consultant import llm_analyzer_module
+from restaurant_consultant.llm_analyzer_module import analyze_all_competitors
+
+
+def test_response_without_candidates_yields_a_placeholder_summary(monkeypatch):
+    async def fake_request(session, model, payload, timeout):
+        return {"candidates": []}
+
+    async def fake_session():
+        return None
+    monkeypatch.setattr(llm_analyzer_module, "make_gemini_request", fake_request)
+    monkeypatch.setattr(llm_analyzer_module, "_get_session", fake_session)
+
+    results = asyncio.run(analyze_all_competitors([{"name": "Pho 88"}]))
+
+    assert results == ["Pho 88 - Analysis unavailable due to processing error."]
@@ -0,0 +1,43 @@
+import asyncio
+
+from restaurant_consultant import llm_analyzer_module
+from restaurant_consultant.llm_analyzer_module import get_cached_content_name
+
+
+def test_concurrent_callers_share_one_create_per_prefix(monkeypatch):
+    creates = []
+
+    async def fake_create(session, model, prefix_text, key):
+        creates.append(prefix_text)
+        await asyncio.sleep(0.01)
+        return f"cachedContents/{prefix_text}"
+    monkeypatch.setattr(llm_analyzer_module, "GEMINI_CONTEXT_CACHE", True)
+    monkeypatch.setattr(llm_analyzer_module, "_create_cached_content", fake_create)
+
+    async def run():
+        return await asyncio.gather(
+            get_cached_content_name(None, "gemini-test", "a"),
+            get_cached_content_name(None, "gemini-test", "a"),
+            get_cached_content_name(None, "gemini-test", "b"),
+        )
+
+    assert asyncio.run(run()) == ["cachedContents/a", "cachedContents/a", "cachedContents/b"]
+    assert sorted(creates) == ["a", "b"]
+
+
+def test_slow_create_does_not_block_other_prefixes(monkeypatch):
+    async def fake_create(session, model, prefix_text, key):
+        await asyncio.sleep(5 if prefix_text == "slow" else 0)
+        return prefix_text
+    monkeypatch.setattr(llm_analyzer_module, "GEMINI_CONTEXT_CACHE", True)
+    monkeypatch.setattr(llm_analyzer_module, "_create_cached_content", fake_create)
+
+    async def run():
+        slow = asyncio.ensure_future(get_cached_content_name(None, "gemini-test", "slow"))
+        await asyncio.sleep(0)
+        fast = await asyncio.wait_for(get_cached_content_name(None, "gemini-test", "fast"), timeout=1)
+        slow.cancel()
+        await asyncio.gather(slow, return_exceptions=True)
+        return fast
+
+    assert asyncio.run(run()) == "fast"
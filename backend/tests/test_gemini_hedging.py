@@ -0,0 +1,65 @@
+import asyncio
+
+import aiohttp
+import pytest
+
+from fakes import FakeGeminiSession, sse_lines, text_chunks
+from restaurant_consultant.llm_analyzer_module import _TopLevelMemberStream, make_hedged_gemini_request
+
+PAYLOAD = {"contents": [{"role": "user", "parts": [{"text": "Summarize the report."}]}]}
+
+
+def _bad_request() -> aiohttp.ClientResponseError:
+    # 4xx is not retried by make_gemini_request, so each attempt is a single POST
+    return aiohttp.ClientResponseError(None, (), status=400, message="bad request")
+
+
+async def _hedged(session, **kwargs):
+    result = await make_hedged_gemini_request(session, "gemini-test", PAYLOAD, hedge_after=0.05, **kwargs)
+    # Every attempt has finished (or been cancelled) by the time the call returns
+    assert asyncio.all_tasks() == {asyncio.current_task()}
+    return result
+
+
+def test_slow_request_is_hedged_and_the_duplicate_wins():
+    session = FakeGeminiSession(
+        sse_lines(text_chunks('{"slow": true}')),
+        sse_lines(text_chunks('{"fast": true}')),
+        delays=[5.0, 0.0],
+    )
+    member_stream = _TopLevelMemberStream()
+
+    result = asyncio.run(_hedged(session, member_stream=member_stream))
+
+    assert session.posts == 2
+    assert result["candidates"][0]["content"]["parts"][0]["text"] == '{"fast": true}'
+    assert member_stream.members == {"fast": True}
+
+
+def test_fast_request_is_not_hedged():
+    session = FakeGeminiSession(sse_lines(text_chunks('{"fast": true}')))
+
+    asyncio.run(_hedged(session))
+
+    assert session.posts == 1
+
+
+def test_error_is_raised_when_every_attempt_fails():
+    session = FakeGeminiSession(_bad_request(), _bad_request(), delays=[0.1, 0.0])
+
+    with pytest.raises(aiohttp.ClientResponseError):
+        asyncio.run(_hedged(session))
+    assert session.posts == 2
+
+
+def test_partial_stream_is_handed_back_when_every_attempt_fails():
+    session = FakeGeminiSession(
+        sse_lines(text_chunks('{"a": 1, "b": 2, "c', finish_reason=None)) + [_bad_request()],
+        _bad_request(),
+        delays=[0.1, 0.0],
+    )
+    member_stream = _TopLevelMemberStream()
+
+    with pytest.raises(aiohttp.ClientResponseError):
+        asyncio.run(_hedged(session, member_stream=member_stream))
+    assert member_stream.members == {"a": 1, "b": 2}
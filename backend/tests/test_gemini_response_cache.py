@@ -0,0 +1,84 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from fakes import FakeGeminiSession, sse_lines, text_chunks
+from restaurant_consultant import llm_analyzer_module
+from restaurant_consultant.llm_analyzer_module import make_gemini_request
+
+PAYLOAD = {"contents": [{"role": "user", "parts": [{"text": "Describe the menu."}]}]}
+
+
+def _request(session):
+    return asyncio.run(make_gemini_request(session, "gemini-test", PAYLOAD))
+
+
+def test_complete_response_is_served_from_cache():
+    session = FakeGeminiSession(sse_lines(text_chunks('{"a": 1}')))
+
+    first = _request(session)
+    second = _request(session)
+
+    assert session.posts == 1
+    assert second == first
+    assert second["candidates"][0]["finishReason"] == "STOP"
+
+
+@pytest.mark.parametrize("finish_reason", ["MAX_TOKENS", "SAFETY", "RECITATION"])
+def test_incomplete_finish_is_not_cached(finish_reason):
+    session = FakeGeminiSession(
+        sse_lines(text_chunks('{"a": 1, "b": "cut', finish_reason=finish_reason)),
+        sse_lines(text_chunks('{"a": 1}')),
+    )
+
+    first = _request(session)
+    second = _request(session)
+
+    assert first["candidates"][0]["finishReason"] == finish_reason
+    assert second["candidates"][0]["finishReason"] == "STOP"
+    assert session.posts == 2
+    # The complete answer is cached in place of the incomplete one
+    _request(session)
+    assert session.posts == 2
+
+
+def _age(path, seconds):
+    stamp = time.time() - seconds
+    os.utime(path, (stamp, stamp))
+
+
+def test_write_prunes_expired_entries_and_stale_temp_files(isolated_gemini_cache, monkeypatch):
+    monkeypatch.setattr(llm_analyzer_module, "_last_cache_prune", 0.0)
+    isolated_gemini_cache.mkdir(parents=True)
+    expired = isolated_gemini_cache / "expired.json"
+    expired.write_bytes(b"{}")
+    _age(expired, 365 * 86400)
+    stale_tmp = isolated_gemini_cache / "orphan.abc.tmp"
+    stale_tmp.write_bytes(b"{")
+    _age(stale_tmp, 2 * 3600)
+
+    asyncio.run(llm_analyzer_module._write_cached_response("fresh", {"a": 1}))
+
+    assert sorted(p.name for p in isolated_gemini_cache.iterdir()) == ["fresh.json"]
+
+
+def test_write_evicts_oldest_entries_over_the_size_cap(isolated_gemini_cache, monkeypatch):
+    monkeypatch.setattr(llm_analyzer_module, "_last_cache_prune", 0.0)
+    monkeypatch.setattr(llm_analyzer_module, "GEMINI_CACHE_MAX_BYTES", 250)
+    isolated_gemini_cache.mkdir(parents=True)
+    for age, name in enumerate(["newer", "older"], start=1):
+        entry = isolated_gemini_cache / f"{name}.json"
+        entry.write_bytes(b"x" * 100)
+        _age(entry, age * 60)
+
+    asyncio.run(llm_analyzer_module._write_cached_response("fresh", {"a": "y" * 90}))
+
+    assert sorted(p.name for p in isolated_gemini_cache.iterdir()) == ["fresh.json", "newer.json"]
+
+
+def test_unserializable_response_is_not_cached_and_does_not_raise(isolated_gemini_cache):
+    asyncio.run(llm_analyzer_module._write_cached_response("bad", {"value": object()}))
+
+    assert not list(isolated_gemini_cache.iterdir())
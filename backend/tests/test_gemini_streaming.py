@@ -0,0 +1,47 @@
+import asyncio
+
+from fakes import FakeGeminiSession, sse_lines, text_chunks
+from restaurant_consultant.llm_analyzer_module import _TopLevelMemberStream, make_gemini_request
+
+PAYLOAD = {"contents": [{"role": "user", "parts": [{"text": "Describe the menu."}]}]}
+
+
+def _request(session, **kwargs):
+    return asyncio.run(make_gemini_request(session, "gemini-test", PAYLOAD, **kwargs))
+
+
+def _text(response_data):
+    return response_data["candidates"][0]["content"]["parts"][0]["text"]
+
+
+def test_events_spanning_several_data_lines_are_joined():
+    session = FakeGeminiSession(sse_lines(text_chunks('{"a": ', '1}'), split_data=True))
+
+    response_data = _request(session)
+
+    assert _text(response_data) == '{"a": 1}'
+    assert response_data["candidates"][0]["finishReason"] == "STOP"
+
+
+def test_final_event_without_trailing_blank_line_is_parsed():
+    lines = sse_lines(text_chunks('{"a": ', '1}'))
+    assert lines.pop() == b"\n"
+    session = FakeGeminiSession(lines)
+
+    assert _text(_request(session)) == '{"a": 1}'
+
+
+def test_crlf_line_endings_and_comments_are_ignored():
+    lines = [line.replace(b"\n", b"\r\n") for line in sse_lines(text_chunks('{"a": 1}'))]
+    session = FakeGeminiSession([b": keep-alive\r\n", b"\r\n"] + lines)
+
+    assert _text(_request(session)) == '{"a": 1}'
+
+
+def test_member_stream_is_fed_while_streaming():
+    session = FakeGeminiSession(sse_lines(text_chunks('{"first": {"x": 1}, ', '"second": [2]}')))
+    member_stream = _TopLevelMemberStream()
+
+    _request(session, member_stream=member_stream)
+
+    assert member_stream.members == {"first": {"x": 1}, "second": [2]}
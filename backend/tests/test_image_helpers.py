@@ -0,0 +1,70 @@
+import io
+
+import pytest
+from PIL import Image
+
+from restaurant_consultant.llm_analyzer_module import VISION_MAX_WIDTH, _downscale_for_vision, _sniff_image_mime
+
+
+def _encode(fmt):
+    buffer = io.BytesIO()
+    Image.new("RGB", (2, 2)).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("fmt, mime_type", [
+    ("PNG", "image/png"),
+    ("JPEG", "image/jpeg"),
+    ("GIF", "image/gif"),
+    ("WEBP", "image/webp"),
+])
+def test_encoded_images_are_recognized(fmt, mime_type):
+    assert _sniff_image_mime(_encode(fmt)) == mime_type
+
+
+@pytest.mark.parametrize("brand, mime_type", [
+    (b"heic", "image/heic"),
+    (b"hevc", "image/heic"),
+    (b"mif1", "image/heif"),
+])
+def test_iso_bmff_brands_are_recognized(brand, mime_type):
+    header = b"\x00\x00\x00\x18ftyp" + brand + b"\x00\x00\x00\x00"
+
+    assert _sniff_image_mime(header) == mime_type
+
+
+def test_bytearray_input_is_accepted():
+    assert _sniff_image_mime(bytearray(_encode("JPEG"))) == "image/jpeg"
+
+
+@pytest.mark.parametrize("data", [b"", b"not an image", b"\x00\x00\x00\x18ftypisom"])
+def test_unknown_data_falls_back_to_the_default(data):
+    assert _sniff_image_mime(data) == "image/png"
+    assert _sniff_image_mime(data, default="application/octet-stream") == "application/octet-stream"
+
+
+def _decode(data):
+    return Image.open(io.BytesIO(data))
+
+
+def test_narrow_screenshots_are_not_downscaled():
+    data = _encode("PNG")
+
+    assert _downscale_for_vision(data) is data
+
+
+def test_tall_screenshots_keep_their_aspect_ratio():
+    buffer = io.BytesIO()
+    Image.new("RGB", (VISION_MAX_WIDTH * 2, 8000)).save(buffer, "PNG")
+
+    with _decode(_downscale_for_vision(buffer.getvalue())) as img:
+        assert img.format == "JPEG"
+        assert img.size == (VISION_MAX_WIDTH, 4000)
+
+
+def test_transparent_areas_are_flattened_onto_white():
+    buffer = io.BytesIO()
+    Image.new("RGBA", (VISION_MAX_WIDTH * 2, 100), (0, 0, 0, 0)).save(buffer, "PNG")
+
+    with _decode(_downscale_for_vision(buffer.getvalue())) as img:
+        assert all(channel > 250 for channel in img.getpixel((10, 10)))
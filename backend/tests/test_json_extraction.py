@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+from restaurant_consultant.llm_analyzer_module import _extract_json_span, _loads_model_json, clean_and_parse_json
+
+
+def test_first_balanced_object_is_extracted_from_prose():
+    text = 'Here you go: {"a": {"b": [1, 2]}} and {"c": 3} for later.'
+
+    assert _extract_json_span(text) == '{"a": {"b": [1, 2]}}'
+
+
+def test_brackets_inside_strings_do_not_change_depth():
+    text = 'x {"a": "} ] {", "b": "quote \\" }"} y'
+
+    assert _extract_json_span(text) == '{"a": "} ] {", "b": "quote \\" }"}'
+
+
+def test_unbalanced_json_returns_everything_from_the_opener():
+    assert _extract_json_span('prefix [{"a": 1}, {"b"') == '[{"a": 1}, {"b"'
+
+
+def test_bracketed_prose_before_the_object_is_skipped():
+    text = '[Note] Output follows: {"a": [1, 2]}'
+
+    assert _extract_json_span(text) == '{"a": [1, 2]}'
+
+
+def test_text_without_an_opener_is_returned_unchanged():
+    assert _extract_json_span("no json here") == "no json here"
+
+
+@pytest.mark.parametrize("response_text", [
+    '{"a": 1}',
+    'Sure!\n```json\n{"a": 1}\n```',
+    'The answer is {"a": 1}. Hope that helps.',
+    '[Analysis] The answer is {"a": 1}.',
+])
+def test_model_json_is_recovered(response_text):
+    assert _loads_model_json(response_text) == {"a": 1}
+
+
+def test_model_response_without_json_raises():
+    with pytest.raises(json.JSONDecodeError):
+        _loads_model_json("I could not find anything.")
+
+
+def test_clean_and_parse_json_strips_fences():
+    assert clean_and_parse_json('```json\n[{"name": "Pho"}]\n```') == [{"name": "Pho"}]
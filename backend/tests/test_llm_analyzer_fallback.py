@@ -0,0 +1,12 @@
+from restaurant_consultant.llm_analyzer_module import _FALLBACK_STRATEGIC_ANALYSIS
+
+
+def test_fallback_analysis_is_a_fresh_copy_each_call(analyzer):
+    first = analyzer._create_fallback_strategic_analysis()
+    first["executive_hook"]["hook_statement"] = "Annotated by a caller"
+    first["analysis_metadata"] = {"generated_at": "now"}
+
+    second = analyzer._create_fallback_strategic_analysis()
+
+    assert second == _FALLBACK_STRATEGIC_ANALYSIS
+    assert second["executive_hook"]["hook_statement"] != "Annotated by a caller"
@@ -0,0 +1,62 @@
+import asyncio
+
+from google.api_core import exceptions as google_exceptions
+from tenacity import wait_none
+
+from restaurant_consultant.llm_analyzer_module import LLMAnalyzer
+
+PNG_BYTES = b"\x89PNG\r\n\x1a\n" + b"\x00" * 32
+
+
+class _FakeResponse:
+    text = '{"summary": "ok"}'
+
+
+class _FlakyVisionModel:
+    """Raises the given errors in turn, then answers."""
+
+    model_name = "models/fake-vision"
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def generate_content_async(self, *args, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return _FakeResponse()
+
+
+def _analyze(analyzer):
+    # Same retry policy, without the backoff sleeps
+    analyze = LLMAnalyzer.analyze_screenshot_with_gemini.retry_with(wait=wait_none())
+    return asyncio.run(analyze(analyzer, "https://cdn.example.com/home.png", "homepage_impression"))
+
+
+def test_screenshot_analysis_retries_transient_sdk_errors(analyzer, monkeypatch):
+    async def fetch(image_url):
+        return PNG_BYTES
+    monkeypatch.setattr(analyzer, "_fetch_image_data", fetch)
+    analyzer.vision_model = _FlakyVisionModel([
+        google_exceptions.ServiceUnavailable("overloaded"),
+        google_exceptions.ServiceUnavailable("overloaded"),
+    ])
+
+    assert _analyze(analyzer) == {"summary": "ok"}
+    assert analyzer.vision_model.calls == 3
+
+
+def test_screenshot_analysis_does_not_retry_permanent_errors(analyzer, monkeypatch):
+    async def fetch(image_url):
+        return PNG_BYTES
+    monkeypatch.setattr(analyzer, "_fetch_image_data", fetch)
+    analyzer.vision_model = _FlakyVisionModel([google_exceptions.InvalidArgument("bad request")])
+
+    try:
+        _analyze(analyzer)
+    except google_exceptions.InvalidArgument:
+        pass
+    else:
+        raise AssertionError("InvalidArgument should propagate")
+    assert analyzer.vision_model.calls == 1
@@ -0,0 +1,48 @@
+import asyncio
+
+from restaurant_consultant import llm_analyzer_module
+
+
+def _truncated(member_stream, text):
+    member_stream.feed(text)
+    return {"candidates": [{"content": {"parts": [{"text": text}]}, "finishReason": "MAX_TOKENS"}]}
+
+
+def test_salvage_keeps_the_attempt_with_most_sections(analyzer, monkeypatch):
+    texts = [
+        '{"executive_hook": {"hook_statement": "a"}, "competitive_landscape_summary": "b", "premium',
+        '{"executive_hook": {"hook_statement": "c"}, "compet',
+    ]
+
+    async def fake_request(session, model, payload, timeout, member_stream=None):
+        return _truncated(member_stream, texts.pop(0))
+
+    async def fake_session():
+        return None
+    monkeypatch.setattr(llm_analyzer_module, "make_hedged_gemini_request", fake_request)
+    monkeypatch.setattr(llm_analyzer_module, "_get_session", fake_session)
+
+    result = asyncio.run(analyzer.generate_main_strategic_recommendations(
+        {"summary": "deep dive"}, [], {}, {"name": "Pho 99"}
+    ))
+
+    assert not texts
+    assert result["executive_hook"] == {"hook_statement": "a"}
+    assert result["competitive_landscape_summary"] == "b"
+
+
+def test_salvage_runs_after_a_failed_request(analyzer, monkeypatch):
+    async def fake_request(session, model, payload, timeout, member_stream=None):
+        member_stream.feed('{"executive_hook": {"hook_statement": "a"}, "compet')
+        raise RuntimeError("connection reset")
+
+    async def fake_session():
+        return None
+    monkeypatch.setattr(llm_analyzer_module, "make_hedged_gemini_request", fake_request)
+    monkeypatch.setattr(llm_analyzer_module, "_get_session", fake_session)
+
+    result = asyncio.run(analyzer.generate_main_strategic_recommendations(
+        {"summary": "deep dive"}, [], {}, {"name": "Pho 99"}
+    ))
+
+    assert result["executive_hook"] == {"hook_statement": "a"}
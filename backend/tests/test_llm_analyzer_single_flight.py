@@ -0,0 +1,71 @@
+import asyncio
+import gc
+
+import aiohttp
+import pytest
+
+from fakes import FakeGeminiSession, sse_lines, text_chunks
+from restaurant_consultant import llm_analyzer_module
+
+ANSWER = '{"overall": "Solid hours"}'
+
+
+def _use_session(monkeypatch, session):
+    async def get_session():
+        return session
+    monkeypatch.setattr(llm_analyzer_module, "_get_session", get_session)
+
+
+def _call(analyzer, phone="555-0100"):
+    return analyzer._call_gemini_async(
+        "operational data", function_name="analyze_operational_intelligence",
+        cache_fields={"phone": phone}, prompt_version="test"
+    )
+
+
+@pytest.mark.parametrize("cache_enabled", [True, False])
+def test_concurrent_identical_calls_share_one_request(analyzer, monkeypatch, cache_enabled):
+    monkeypatch.setattr(llm_analyzer_module, "GEMINI_CACHE_ENABLED", cache_enabled)
+    session = FakeGeminiSession(sse_lines(text_chunks(ANSWER)), delays=[0.05])
+    _use_session(monkeypatch, session)
+
+    async def run():
+        return await asyncio.gather(_call(analyzer), _call(analyzer))
+
+    assert asyncio.run(run()) == [ANSWER, ANSWER]
+    assert session.posts == 1
+    assert analyzer._inflight == {}
+
+
+def test_different_calls_do_not_share_a_request(analyzer, monkeypatch):
+    session = FakeGeminiSession(sse_lines(text_chunks(ANSWER)), sse_lines(text_chunks(ANSWER)), delays=[0.05, 0.05])
+    _use_session(monkeypatch, session)
+
+    async def run():
+        return await asyncio.gather(_call(analyzer), _call(analyzer, phone="555-0199"))
+
+    asyncio.run(run())
+    assert session.posts == 2
+
+
+def test_failure_after_every_caller_is_cancelled_is_retrieved(analyzer, monkeypatch):
+    failure = aiohttp.ClientResponseError(None, (), status=400, message="bad request")
+    session = FakeGeminiSession(failure, delays=[0.05])
+    _use_session(monkeypatch, session)
+    unhandled = []
+
+    async def run():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: unhandled.append(context))
+        caller = asyncio.ensure_future(_call(analyzer))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        # The shared request keeps running, fails, and leaves the in-flight table
+        while analyzer._inflight:
+            await asyncio.sleep(0.01)
+        gc.collect()
+
+    asyncio.run(run())
+    assert session.posts == 1
+    assert unhandled == []
@@ -0,0 +1,31 @@
+import asyncio
+
+from restaurant_consultant.models import FinalRestaurantOutput
+
+
+class _FakeResponse:
+    text = '{"executive_hook": {"hook_statement": "Strong local following"}, "analysis_metadata": {"generated_at": "model value"}}'
+
+
+def test_main_recommendations_prompt_is_cacheable(analyzer, monkeypatch):
+    calls = []
+
+    async def generate(prompt, **kwargs):
+        calls.append(prompt)
+        return _FakeResponse()
+    monkeypatch.setattr(analyzer.text_model, "generate_content_async", generate)
+    restaurant = FinalRestaurantOutput(website_url="https://example.com", restaurant_name="Pho 99")
+    context = analyzer._build_restaurant_context(restaurant)
+
+    def generate_recommendations():
+        return asyncio.run(analyzer._generate_main_strategic_recommendations({}, [], restaurant, {}, context))
+
+    first = generate_recommendations()
+    second = generate_recommendations()
+
+    # No per-call timestamp in the prompt, so the second run is a text-JSON cache hit
+    assert len(calls) == 1
+    assert second.executive_hook == first.executive_hook
+    # generated_at is stamped locally after each call, not taken from the model
+    for result in (first, second):
+        assert result.analysis_metadata["generated_at"] != "model value"
@@ -0,0 +1,63 @@
+import asyncio
+
+import orjson
+
+from fakes import FakeGeminiSession, sse_lines, text_chunks
+from restaurant_consultant import llm_analyzer_module
+
+TRUNCATED = ['{"overall": "Solid hours", ', '"hours": {"gaps": "late evenings"}, ', '"recommendations": [{"area": "pho']
+COMPLETE = '{"overall": "Solid hours", "hours": {"gaps": "late evenings"}, "recommendations": []}'
+
+
+def _use_session(monkeypatch, session):
+    async def get_session():
+        return session
+    monkeypatch.setattr(llm_analyzer_module, "_get_session", get_session)
+
+
+def _call(analyzer):
+    return asyncio.run(analyzer._call_gemini_async(
+        "operational data", function_name="analyze_operational_intelligence",
+        cache_fields={"phone": "555-0100"}, prompt_version="test"
+    ))
+
+
+def test_truncated_response_returns_completed_sections_and_is_not_cached(analyzer, monkeypatch):
+    truncated = text_chunks(*TRUNCATED, finish_reason="MAX_TOKENS")
+    truncated[-1]["usageMetadata"] = {"candidatesTokenCount": 2048}
+    session = FakeGeminiSession(sse_lines(truncated), sse_lines(text_chunks(COMPLETE)))
+    _use_session(monkeypatch, session)
+
+    salvaged = orjson.loads(_call(analyzer))
+    assert salvaged == {"overall": "Solid hours", "hours": {"gaps": "late evenings"}}
+
+    # Neither the analyzer cache nor the request cache kept the truncated answer
+    assert _call(analyzer) == COMPLETE
+    assert session.posts == 2
+    assert _call(analyzer) == COMPLETE
+    assert session.posts == 2
+
+
+def test_truncation_raises_the_output_budget(analyzer):
+    assert analyzer._output_token_budget("analyze_x", 2048) == 2048
+    analyzer._token_stats["analyze_x"].append(2048)
+    assert analyzer._output_token_budget("analyze_x", 2048) == int(2048 * 1.2)
+    analyzer._token_stats["analyze_x"].extend([8000] * 10)
+    assert analyzer._output_token_budget("analyze_x", 2048) == llm_analyzer_module.GEMINI_MAX_OUTPUT_TOKENS_CEILING
+
+
+def test_batch_prefill_skips_incomplete_answers(analyzer, monkeypatch):
+    async def fake_batch(session, model, payloads, **kwargs):
+        finishes = ["STOP", "MAX_TOKENS"]
+        return [
+            {"candidates": [{"content": {"parts": [{"text": '{"a": 1}'}]}, "finishReason": finish}]}
+            for finish, _ in zip(finishes, payloads)
+        ]
+    _use_session(monkeypatch, FakeGeminiSession())
+    monkeypatch.setattr(llm_analyzer_module, "make_gemini_batch_request", fake_batch)
+    restaurant = {"phone": "555-0100", "website": "https://example.com", "description": "Family pho shop"}
+
+    asyncio.run(analyzer._prefill_analyses_from_batch([restaurant]))
+
+    cached = list(llm_analyzer_module.GEMINI_CACHE_DIR.glob("*.json"))
+    assert len(cached) == 1
@@ -0,0 +1,59 @@
+from restaurant_consultant.llm_analyzer_module import _TopLevelMemberStream
+
+
+def _feed_all(stream, *deltas):
+    completed = []
+    for delta in deltas:
+        completed.append(stream.feed(delta))
+    return completed
+
+
+def test_members_are_returned_as_soon_as_they_close():
+    stream = _TopLevelMemberStream()
+
+    completed = _feed_all(stream, '{"a": {"x": [1, ', '2]}, "b"', ': "two", "c": 3', '}')
+
+    assert completed == [[], [("a", {"x": [1, 2]})], [("b", "two")], [("c", 3)]]
+    assert stream.members == {"a": {"x": [1, 2]}, "b": "two", "c": 3}
+
+
+def test_structural_characters_inside_strings_are_ignored():
+    stream = _TopLevelMemberStream()
+
+    _feed_all(stream, '{"a": "x, }] {\\"q\\": [", "b": "\\\\"}')
+
+    assert stream.members == {"a": 'x, }] {"q": [', "b": "\\"}
+
+
+def test_text_outside_the_object_is_skipped():
+    stream = _TopLevelMemberStream()
+
+    _feed_all(stream, '```json\n{"a": 1}\n```\n{"b": 2}')
+
+    assert stream.members == {"a": 1}
+
+
+def test_truncated_stream_keeps_completed_members_only():
+    stream = _TopLevelMemberStream()
+
+    _feed_all(stream, '{"a": 1, "b": {"c": "unfinish')
+
+    assert stream.members == {"a": 1}
+
+
+def test_unparseable_member_is_skipped():
+    stream = _TopLevelMemberStream()
+
+    _feed_all(stream, '{"a": tru, "b": 2}')
+
+    assert stream.members == {"b": 2}
+
+
+def test_reset_discards_partial_state():
+    stream = _TopLevelMemberStream()
+    _feed_all(stream, '{"a": 1, "b": "par')
+
+    stream.reset()
+    _feed_all(stream, '{"c": 3}')
+
+    assert stream.members == {"c": 3}
@@ -0,0 +1,70 @@
+import asyncio
+import re
+
+import pytest
+
+from restaurant_consultant import llm_analyzer_module
+
+MENU_JSON = '[{"name": "Pho", "description": null, "price": "$12"}]'
+
+
+@pytest.fixture
+def menu_prompt_input(monkeypatch):
+    """Run extract_menu_with_gemini on html and return the preprocessed content it sent."""
+    prompts = []
+
+    async def fake_session():
+        return None
+
+    async def fake_request(session, model, payload, **kwargs):
+        prompts.append(payload["contents"][0]["parts"][0]["text"])
+        return {"candidates": [{"content": {"parts": [{"text": MENU_JSON}]}, "finishReason": "STOP"}]}
+
+    monkeypatch.setattr(llm_analyzer_module, "_get_session", fake_session)
+    monkeypatch.setattr(llm_analyzer_module, "make_gemini_request", fake_request)
+
+    def run(html):
+        assert asyncio.run(llm_analyzer_module.extract_menu_with_gemini(html)) == [
+            {"name": "Pho", "description": None, "price": "$12"}
+        ]
+        return re.search(r"<input_html>\s*(.*?)\s*</input_html>", prompts.pop(), re.DOTALL).group(1)
+
+    return run
+
+
+def test_menu_containers_are_extracted_once(menu_prompt_input):
+    html = """<html><head><style>.menu { color: red }</style><script>var price = "$99";</script></head>
+    <body>
+      <nav class="menu-nav">Home About</nav>
+      <div class="menu-section"><h2>Soups</h2><div class="dish">Pho   Tai</div></div>
+      <div id="mobile-menu"><h2>Soups</h2><div class="dish">Pho   Tai</div></div>
+    </body></html>"""
+
+    content = menu_prompt_input(html)
+
+    # Nested matches and the mobile duplicate collapse into a single block
+    assert content == "Soups\nPho Tai"
+
+
+def test_price_lines_are_added_to_menu_blocks(menu_prompt_input):
+    html = """<html><body><div class="food"><p>Spring rolls</p></div>
+    <p>Salad bowl $9</p><p>Lemonade $3.50 large</p></body></html>"""
+
+    content = menu_prompt_input(html).split("\n")
+
+    assert content[0] == "Spring rolls"
+    assert "Salad bowl $9" in content
+    assert "$3.50 large" in content
+
+
+def test_fallback_keeps_food_lines_with_prices(menu_prompt_input):
+    # Prices without a leading digit after $ miss the indicator pattern, so the line scan runs
+    html = "<html><body><p>Grilled chicken plate $ 14</p><p>Call us at 555-0100 today</p></body></html>"
+
+    assert menu_prompt_input(html) == "Grilled chicken plate $ 14"
+
+
+def test_page_without_menu_content_falls_back_to_visible_text(menu_prompt_input):
+    html = "<html><body><footer>Copyright</footer><p>Welcome to our family restaurant</p></body></html>"
+
+    assert menu_prompt_input(html) == "Welcome to our family restaurant"
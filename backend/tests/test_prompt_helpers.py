@@ -0,0 +1,78 @@
+import pytest
+
+from restaurant_consultant.llm_analyzer_module import (
+    _LLMA6_RESPONSE_SCHEMA,
+    _SlotTemplate,
+    _gemini_schema_from_example,
+    _rows_to_columns,
+)
+
+
+def test_rows_become_columns_in_row_order():
+    rows = {
+        "https://a.example/menu": {"focus": "menu", "score": 8},
+        "https://a.example/home": {"focus": "home", "score": 6},
+    }
+
+    assert _rows_to_columns(rows, "screenshot_urls") == {
+        "screenshot_urls": ["https://a.example/menu", "https://a.example/home"],
+        "focus": ["menu", "home"],
+        "score": [8, 6],
+    }
+
+
+def test_missing_fields_are_filled_with_none():
+    rows = {"a": {"x": 1}, "b": {"y": 2}}
+
+    assert _rows_to_columns(rows, "key") == {"key": ["a", "b"], "x": [1, None], "y": [None, 2]}
+
+
+def test_no_rows_gives_an_empty_key_column():
+    assert _rows_to_columns({}, "key") == {"key": []}
+
+
+@pytest.mark.parametrize("template", [
+    "Hello {name}, you are {age}.",
+    '{{"name": "{name}", "nested": {{"age": {age}}}}}',
+    "{name}{age}",
+    "No slots, just {{braces}}",
+    "",
+])
+def test_slot_template_renders_like_str_format(template):
+    values = {"name": "Pho 99", "age": 12}
+
+    assert _SlotTemplate(template).format_map(values) == template.format_map(values)
+
+
+def test_slot_template_rejects_format_specs():
+    with pytest.raises(ValueError):
+        _SlotTemplate("{price:.2f}")
+
+
+def test_slot_template_requires_every_slot():
+    with pytest.raises(KeyError):
+        _SlotTemplate("{name} {age}").format_map({"name": "Pho 99"})
+
+
+def test_schema_marks_only_the_named_fields_nullable():
+    example = {
+        "summary": "Never null: one sentence",
+        "items": [{"url": "Screenshot URL, otherwise null", "score": 3}],
+    }
+
+    schema = _gemini_schema_from_example(example, nullable=("url",))
+
+    assert "nullable" not in schema["properties"]["summary"]
+    item = schema["properties"]["items"]["items"]
+    assert item["properties"]["url"] == {
+        "type": "STRING", "description": "Screenshot URL, otherwise null", "nullable": True
+    }
+    assert item["properties"]["score"] == {"type": "INTEGER"}
+    assert item["required"] == item["propertyOrdering"] == ["url", "score"]
+
+
+def test_llma6_schema_allows_a_missing_screenshot_url():
+    opportunity = _LLMA6_RESPONSE_SCHEMA["properties"]["top_3_prioritized_opportunities"]["items"]
+    evidence = opportunity["properties"]["visual_evidence_suggestion"]["properties"]
+
+    assert evidence["relevant_screenshot_s3_url_from_input"]["nullable"] is True
@@ -0,0 +1,52 @@
+import asyncio
+
+from restaurant_consultant import llm_analyzer_module
+from restaurant_consultant.llm_analyzer_module import _filter_supporting_screenshots
+
+
+def _screenshot(page_type: str) -> dict:
+    return {"page_type": page_type, "data": {"s3_url": f"https://s3.example/{page_type}.png"}}
+
+
+def _filter(monkeypatch, verdicts: dict, **kwargs) -> list:
+    async def fake_evaluate(image_url, page_type, restaurant_name):
+        verdict = verdicts[page_type]
+        if isinstance(verdict, BaseException):
+            raise verdict
+        if verdict == "hang":
+            await asyncio.sleep(60)
+        return verdict
+
+    monkeypatch.setattr(llm_analyzer_module, "evaluate_screenshot_quality", fake_evaluate)
+    screenshots = [_screenshot(page_type) for page_type in verdicts]
+    return asyncio.run(_filter_supporting_screenshots(screenshots, "Test Bistro", **kwargs))
+
+
+def test_only_exclude_verdicts_drop_screenshots(monkeypatch):
+    kept = _filter(monkeypatch, {
+        "homepage": {"recommendation": "include", "suggested_caption": "Homepage"},
+        "menu": {"recommendation": "exclude"},
+    })
+
+    assert [s["page_type"] for s in kept] == ["homepage"]
+    assert kept[0]["caption"] == "Homepage"
+
+
+def test_failed_checks_keep_the_screenshot(monkeypatch):
+    kept = _filter(monkeypatch, {
+        "homepage": None,
+        "menu": RuntimeError("Vision unavailable"),
+    })
+
+    assert [s["page_type"] for s in kept] == ["homepage", "menu"]
+    assert all("quality_assessment" not in s for s in kept)
+
+
+def test_checks_past_the_timeout_keep_the_screenshot(monkeypatch):
+    kept = _filter(monkeypatch, {
+        "homepage": "hang",
+        "menu": {"recommendation": "exclude"},
+    }, timeout=0.05)
+
+    assert [s["page_type"] for s in kept] == ["homepage"]
+    assert "quality_assessment" not in kept[0]
@@ -0,0 +1,47 @@
+from restaurant_consultant.llm_analyzer_module import _StreamedResponse
+
+
+def test_text_deltas_are_concatenated_under_the_final_candidate():
+    streamed = _StreamedResponse()
+    assert streamed.add({"candidates": [{"content": {"parts": [{"text": "Hello, "}]}}]}) == "Hello, "
+    assert streamed.add({
+        "candidates": [{"content": {"parts": [{"text": "world"}]}, "finishReason": "STOP", "index": 0}],
+        "usageMetadata": {"totalTokenCount": 7},
+        "modelVersion": "gemini-test",
+    }) == "world"
+
+    assert streamed.result() == {
+        "usageMetadata": {"totalTokenCount": 7},
+        "modelVersion": "gemini-test",
+        "candidates": [{
+            "finishReason": "STOP",
+            "index": 0,
+            "content": {"role": "model", "parts": [{"text": "Hello, world"}]},
+        }],
+    }
+
+
+def test_metadata_keeps_the_latest_value():
+    streamed = _StreamedResponse()
+    streamed.add({"usageMetadata": {"totalTokenCount": 3}})
+    streamed.add({"usageMetadata": {"totalTokenCount": 9}})
+
+    assert streamed.result() == {"usageMetadata": {"totalTokenCount": 9}}
+
+
+def test_chunk_without_text_contributes_no_delta():
+    streamed = _StreamedResponse()
+    assert streamed.add({"candidates": [{"finishReason": "SAFETY"}]}) == ""
+
+    # A candidate with no text has no content rather than an empty part
+    assert streamed.result() == {"candidates": [{"finishReason": "SAFETY"}]}
+
+
+def test_only_the_first_candidate_is_kept():
+    streamed = _StreamedResponse()
+    streamed.add({"candidates": [
+        {"content": {"parts": [{"text": "first"}]}},
+        {"content": {"parts": [{"text": "second"}]}},
+    ]})
+
+    assert streamed.result()["candidates"] == [{"content": {"role": "model", "parts": [{"text": "first"}]}}]
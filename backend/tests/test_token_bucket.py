@@ -0,0 +1,114 @@
+import asyncio
+import types
+
+import pytest
+
+from restaurant_consultant import llm_analyzer_module
+from restaurant_consultant.llm_analyzer_module import TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A fake monotonic clock that asyncio.sleep advances instantly; records each sleep."""
+    state = types.SimpleNamespace(now=1000.0, sleeps=[])
+    real_sleep = asyncio.sleep
+
+    async def fake_sleep(seconds):
+        state.sleeps.append(seconds)
+        state.now += seconds
+        await real_sleep(0)
+
+    monkeypatch.setattr(llm_analyzer_module, "time", types.SimpleNamespace(monotonic=lambda: state.now))
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+    return state
+
+
+def test_requests_within_budget_do_not_wait(clock):
+    bucket = TokenBucket(requests_per_minute=3, tokens_per_minute=300)
+
+    async def run():
+        for _ in range(3):
+            await bucket.acquire(100)
+
+    asyncio.run(run())
+    assert clock.sleeps == []
+
+
+def test_request_budget_waits_for_refill(clock):
+    bucket = TokenBucket(requests_per_minute=2, tokens_per_minute=10_000)
+
+    async def run():
+        for _ in range(3):
+            await bucket.acquire(1)
+
+    asyncio.run(run())
+    # One request refills every 30s at 2 rpm
+    assert clock.sleeps == [pytest.approx(30)]
+
+
+def test_token_budget_waits_for_refill(clock):
+    bucket = TokenBucket(requests_per_minute=100, tokens_per_minute=600)
+
+    async def run():
+        await bucket.acquire(600)
+        await bucket.acquire(60)
+
+    asyncio.run(run())
+    # 60 tokens refill in 6s at 600 tpm
+    assert clock.sleeps == [pytest.approx(6)]
+
+
+def test_oversized_request_is_capped_at_the_budget(clock):
+    bucket = TokenBucket(requests_per_minute=100, tokens_per_minute=600)
+
+    asyncio.run(bucket.acquire(10_000))
+    assert clock.sleeps == []
+
+
+def test_waiters_are_served_in_arrival_order(clock):
+    bucket = TokenBucket(requests_per_minute=1, tokens_per_minute=10_000)
+    order = []
+
+    async def take(name):
+        await bucket.acquire(1)
+        order.append(name)
+
+    async def run():
+        await asyncio.gather(*(take(name) for name in "abc"))
+
+    asyncio.run(run())
+    assert order == ["a", "b", "c"]
+
+
+@pytest.mark.parametrize("requests_per_minute, tokens_per_minute", [(0, 0), (-1, 0)])
+def test_zero_budgets_disable_the_limiter(clock, requests_per_minute, tokens_per_minute):
+    bucket = TokenBucket(requests_per_minute=requests_per_minute, tokens_per_minute=tokens_per_minute)
+
+    async def run():
+        for _ in range(5):
+            await bucket.acquire(10_000)
+
+    asyncio.run(run())
+    assert clock.sleeps == []
+
+
+def test_zero_token_budget_still_limits_requests(clock):
+    bucket = TokenBucket(requests_per_minute=2, tokens_per_minute=0)
+
+    async def run():
+        for _ in range(3):
+            await bucket.acquire(10_000)
+
+    asyncio.run(run())
+    assert clock.sleeps == [pytest.approx(30)]
+
+
+def test_zero_request_budget_still_limits_tokens(clock):
+    bucket = TokenBucket(requests_per_minute=0, tokens_per_minute=600)
+
+    async def run():
+        await bucket.acquire(600)
+        await bucket.acquire(60)
+
+    asyncio.run(run())
+    assert clock.sleeps == [pytest.approx(6)]